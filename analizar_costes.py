@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Gasto en Vertex por hora y día, coste por lead y proyección de los tiers del Cost Guard
+
+Ejemplos:
+  python analizar_costes.py --freshness 1d
+  python analizar_costes.py --cache --tier1 3 --tier2 10
+  python analizar_costes.py --bundle cloud_run_logs_diagnostico.ndjson.gz --json
+"""
+import argparse
+import json
+import sys
+from datetime import timedelta
+
+from diagnostico.costes import CHARS_BODY, CHARS_SALIDA, CostGuardAnalizador
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.motor import Motor
+
+
+def dolares(valor):
+    return "-" if valor is None else f"${valor:.4f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrucción del gasto en Vertex y proyección del Cost Guard")
+    anadir_argumentos_fuente(parser, freshness="1d")
+    parser.add_argument("--tier1", type=float, help="Límite TIER 1 en $/h (por defecto el de config.js)")
+    parser.add_argument("--tier2", type=float, help="Límite TIER 2 en $/h (por defecto el de config.js)")
+    parser.add_argument("--chars-body", type=int, default=CHARS_BODY["clasificacion"],
+                        help="Caracteres de body supuestos por clasificación")
+    parser.add_argument("--chars-salida", type=int, default=CHARS_SALIDA, help="Caracteres de respuesta por llamada")
+    parser.add_argument("--ventana", type=int, default=15, help="Minutos para calcular la velocidad de gasto")
+    parser.add_argument("--horas", type=int, default=24, help="Horas a mostrar en la tabla")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resumen en JSON")
+    args = parser.parse_args()
+
+    limites = {tier: valor for tier, valor in (("tier1", args.tier1), ("tier2", args.tier2)) if valor is not None}
+    motor = Motor(ensamblar=True)
+    costes = motor.registrar(CostGuardAnalizador(
+        limites=limites,
+        chars_body={**CHARS_BODY, "clasificacion": args.chars_body},
+        chars_salida=args.chars_salida,
+        ventana=timedelta(minutes=args.ventana),
+    ))
+    try:
+        motor.ejecutar(entradas_fuente(args))
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    resumen = costes.resumen()
+
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return 0
+
+    g = resumen["global"]
+    print("=== GASTO EN VERTEX (COST GUARD) ===\n")
+    print(f"✓ {motor.fragmentos} logs leídos ({motor.total} eventos)")
+    print(f"Límites: TIER 1 ${resumen['limites']['tier1']:.2f}/h, TIER 2 ${resumen['limites']['tier2']:.2f}/h")
+    print(f"Llamadas: {g['clasificacion']} clasificación, {g['bajo_consumo']} bajo consumo, {g['resumen']} resumen "
+          f"({g['descartes_rapidos']} descartes sin llamada)")
+    print(f"Gasto estimado: {dolares(g['coste'])}"
+          + "".join(f"  [{modelo}: {dolares(coste)}]" for modelo, coste in resumen["por_modelo"].items()))
+    if resumen["calibracion"] is not None:
+        print(f"Calibración con {len(resumen['anclas'])} importes del Cost Guard: ×{resumen['calibracion']:.2f}")
+    else:
+        print("ℹ Sin TIER TRIGGERED ni SKIP en la ventana: gasto sin calibrar")
+    print(f"Coste por lead: {dolares(resumen['coste_por_lead'])} (Airtable, {g['leads_airtable']}), "
+          f"{dolares(resumen['coste_por_lead_salesforce'])} (Salesforce, {g['leads_salesforce']})")
+
+    print(f"\n=== POR HORA (UTC, últimas {args.horas}) ===")
+    print(f"{'Hora':<14} {'llamadas':>8} {'estimado':>10} {'guard':>10} {'leads':>6} {'skips':>6} {'tiers':>6}")
+    for clave, h in list(resumen["por_hora"].items())[-args.horas:]:
+        llamadas = h["clasificacion"] + h["bajo_consumo"] + h["resumen"]
+        tiers = ",".join(t[-1] for t in ("tier1", "tier2") if h[t]) or "-"
+        print(f"{clave:<14} {llamadas:>8} {dolares(h['coste']):>10} {dolares(h['contador_guard']):>10} "
+              f"{h['leads_airtable']:>6} {h['skips']:>6} {tiers:>6}")
+
+    if len(resumen["por_dia"]) > 1 or resumen["dias"]:
+        print("\n=== POR DÍA (UTC) ===")
+        for dia, d in resumen["por_dia"].items():
+            print(f"{dia}  {d['llamadas']:>6} llamadas  {dolares(d['coste']):>10}  {d['leads_airtable']:>5} leads  "
+                  f"tier1 en {d['horas_tier1']} h, tier2 en {d['horas_tier2']} h")
+
+    proyeccion = resumen["proyeccion"]
+    if proyeccion:
+        print(f"\n=== PROYECCIÓN HORA {proyeccion['hora']} ===")
+        print(f"Gastado: {dolares(proyeccion['gastado'])}  velocidad: {dolares(proyeccion['velocidad_por_minuto'])}/min  "
+              f"previsto al final de la hora: {dolares(proyeccion['previsto_fin_hora'])}")
+        for tier, p in proyeccion["tiers"].items():
+            minuto = f" (minuto {p['minuto']:.0f})" if p["minuto"] is not None else ""
+            print(f"  {tier.upper()} ${p['limite']:.2f}: {p['estado']}{minuto}")
+        print("Clasificaciones por hora que caben en cada tier: "
+              + ", ".join(f"{tier.upper()} {n}" for tier, n in resumen["capacidad"].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
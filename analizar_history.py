@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Desfase, estancamientos y regresiones del historyId de Gmail (cuenta principal y SENDER)
+
+Ejemplos:
+  python analizar_history.py --freshness 6h
+  python analizar_history.py --cache --intervalo 5 --umbral 15
+  python analizar_history.py --bundle cloud_run_logs_diagnostico.ndjson.gz --json
+"""
+import argparse
+import json
+import sys
+from datetime import timedelta
+
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.history import HistoryAnalizador, diagnostico
+from diagnostico.motor import Motor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serie temporal del desfase del historyId de Gmail")
+    anadir_argumentos_fuente(parser)
+    parser.add_argument("--intervalo", type=int, default=1, help="Minutos por punto de la serie")
+    parser.add_argument("--umbral", type=int, default=10, help="Minutos sin avanzar para considerar estancamiento")
+    parser.add_argument("--puntos", type=int, default=30, help="Últimos puntos de la serie a mostrar")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resumen en JSON")
+    args = parser.parse_args()
+
+    motor = Motor(ensamblar=True)
+    history = motor.registrar(HistoryAnalizador(intervalo=timedelta(minutes=args.intervalo),
+                                                umbral_estancamiento=timedelta(minutes=args.umbral)))
+    try:
+        motor.ejecutar(entradas_fuente(args))
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    resumen = history.resumen()
+
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return 0
+
+    print("=== HISTORYID: NOTIFICADO VS GUARDADO ===\n")
+    print(f"✓ {motor.fragmentos} logs leídos ({motor.total} eventos, {history.total} de historyId)\n")
+    for nombre, cuenta in resumen["cuentas"].items():
+        if not cuenta["serie"]:
+            continue
+        print(f"--- Cuenta {nombre} ---")
+        print(f"{'Intervalo':<26} {'notif':>6} {'avances':>8} {'notificado':>11} {'guardado':>11} {'desfase':>8}")
+        for punto in cuenta["serie"][-args.puntos:]:
+            marcas = ("  ESTANCADO" if punto["estancado"] else "") + ("  REGRESIÓN" if punto["regresion"] else "")
+            desfase = "-" if punto["desfase_max"] is None else punto["desfase_max"]
+            print(f"{punto['intervalo']:<26} {punto['notificaciones']:>6} {punto['avances']:>8} "
+                  f"{str(punto['notificado']):>11} {str(punto['guardado']):>11} {desfase:>8}{marcas}")
+        print()
+
+    print("=== DIAGNÓSTICO ===")
+    for linea in diagnostico(resumen):
+        print(linea)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Errores agrupados por plantilla: cuántas veces, desde cuándo y un ejemplo de cada uno
+
+Los IDs, fechas, emails y números de cada mensaje se sustituyen por
+marcadores, así que un fallo recurrente (invalid_grant, 422 de Airtable...)
+ocupa una sola fila en lugar de tapar al resto.
+
+Ejemplos:
+  python analizar_huellas.py --freshness 1h
+  python analizar_huellas.py --cache --freshness 1d --top 10 --ejemplos
+  python analizar_huellas.py --bundle cloud_run_logs_diagnostico.ndjson.gz --json
+"""
+import argparse
+import json
+import sys
+
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.huellas import HuellasAnalizador
+from diagnostico.motor import Motor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agrupa los errores de Cloud Run por plantilla y los ordena por frecuencia")
+    anadir_argumentos_fuente(parser, freshness="1h")
+    parser.add_argument("--top", type=int, default=20, help="Plantillas a mostrar")
+    parser.add_argument("--solo-severidad", action="store_true",
+                        help="Solo entradas con severidad ERROR o superior (no las que mencionan 'error')")
+    parser.add_argument("--ejemplos", action="store_true", help="Mostrar un mensaje real de cada plantilla")
+    parser.add_argument("--ancho", type=int, default=110, help="Caracteres de plantilla por fila")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resumen en JSON")
+    args = parser.parse_args()
+
+    motor = Motor(ensamblar=True)
+    huellas = motor.registrar(HuellasAnalizador(solo_severidad=args.solo_severidad))
+    try:
+        motor.ejecutar(entradas_fuente(args))
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    resumen = huellas.resumen(args.top)
+
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return 0
+
+    print("=== ERRORES AGRUPADOS POR PLANTILLA ===\n")
+    print(f"✓ {motor.fragmentos} logs leídos ({motor.total} eventos)")
+    print(f"{huellas.total} errores en {resumen['huellas']} plantillas distintas\n")
+    if not resumen["ranking"]:
+        print("✓ No se encontraron errores")
+        return 0
+
+    print(f"{'#':>3} {'veces':>6} {'%':>5} {'primera':<19} {'última':<19} {'inst':>4} {'huella':<12} plantilla")
+    for i, h in enumerate(resumen["ranking"], 1):
+        print(f"{i:>3} {h['total']:>6} {100 * h['total'] / huellas.total:>4.0f}% {(h['primera'] or '-')[:19]:<19} "
+              f"{(h['ultima'] or '-')[:19]:<19} {h['instancias']:>4} {h['huella']:<12} {h['plantilla'][:args.ancho]}")
+        if h["origen"]:
+            print(f"{'':>76}↳ {h['origen']}")
+        if args.ejemplos:
+            print(f"{'':>76}ej.: {h['ejemplo'][:args.ancho]!r}")
+    if resumen["sin_huella"]:
+        print(f"\n⚠ {resumen['sin_huella']} errores sin agrupar (límite de {huellas.max_huellas} plantillas)")
+    restantes = resumen["huellas"] - len(resumen["ranking"])
+    if restantes > 0:
+        print(f"\n… y {restantes} plantillas más (usa --top o --json)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
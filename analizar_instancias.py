@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Vida de las instancias de Cloud Run, arranques en frío y su efecto en la latencia del procesamiento
+
+Ejemplos:
+  python analizar_instancias.py --freshness 1d
+  python analizar_instancias.py --cache --ventana-frio 300 --percentil 99
+  python analizar_instancias.py --bundle cloud_run_logs_diagnostico.ndjson.gz --json
+"""
+import argparse
+import json
+import sys
+
+from diagnostico.estadistica import resumen_distribucion
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.instancias import MARGEN_INFERIDO, PERCENTIL_PICO, VENTANA_FRIO, InstanciasAnalizador
+from diagnostico.motor import Motor
+
+
+def segundos(valor):
+    return "-" if valor is None else f"{valor:.2f}s"
+
+
+def duracion(valor):
+    horas, resto = divmod(int(valor), 3600)
+    return f"{horas}h{resto // 60:02d}m" if horas else f"{resto // 60}m{resto % 60:02d}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ciclo de vida y arranques en frío de las instancias de Cloud Run")
+    anadir_argumentos_fuente(parser, freshness="1d")
+    parser.add_argument("--ventana-frio", type=float, default=VENTANA_FRIO,
+                        help="Segundos tras el arranque en los que un mensaje cuenta como procesado en frío")
+    parser.add_argument("--percentil", type=float, default=PERCENTIL_PICO,
+                        help="Percentil de latencia a partir del cual un mensaje es un pico")
+    parser.add_argument("--margen", type=float, default=MARGEN_INFERIDO,
+                        help="Segundos desde el inicio de la ventana tras los que una instancia nueva "
+                             "se da por arrancada")
+    parser.add_argument("--instancias", type=int, default=20, help="Instancias a mostrar en la tabla")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resumen en JSON")
+    args = parser.parse_args()
+
+    motor = Motor(ensamblar=True)
+    analizador = motor.registrar(InstanciasAnalizador(ventana_frio=args.ventana_frio, percentil_pico=args.percentil,
+                                                      margen_inferido=args.margen))
+    try:
+        motor.ejecutar(entradas_fuente(args))
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    resumen = analizador.resumen()
+
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return 0
+
+    instancias = resumen["instancias"]
+    print("=== INSTANCIAS DE CLOUD RUN ===\n")
+    print(f"✓ {motor.fragmentos} logs leídos ({motor.total} eventos)")
+    if not instancias:
+        print("ℹ Ninguna entrada con labels.instanceId en la ventana")
+        return 0
+    senales = {}
+    for arranque in resumen["arranques"]:
+        senales[arranque["senal"]] = senales.get(arranque["senal"], 0) + 1
+    print(f"Instancias: {len(instancias)}, arranques: {len(resumen['arranques'])}"
+          + (f" ({', '.join(f'{n} {senal}' for senal, n in senales.items())})" if senales else ""))
+    vivas, activas = resumen["vivas"], resumen["activas"]
+    print(f"Vivas a la vez: media {vivas['media']:.1f}, p95 {vivas['p95']}, máx {vivas['max']}  "
+          f"(con actividad: media {activas['media']:.1f}, máx {activas['max']})")
+    if resumen["proporcion_ociosa"] is not None:
+        print(f"Minutos-instancia: {resumen['minutos_instancia']}, {resumen['minutos_instancia_activos']} con "
+              f"actividad ({100 * resumen['proporcion_ociosa']:.0f}% sin ninguna entrada)")
+    print(f"Peticiones simultáneas en una instancia: máx {resumen['concurrencia_max']}")
+    frio = resumen["primera_peticion_frio"]
+    if frio["n"]:
+        todas = resumen_distribucion(i["latencia_peticion"]["p50"] for i in instancias.values()
+                                     if i["latencia_peticion"]["n"])
+        print(f"Primera petición tras un arranque: p50 {segundos(frio['p50'])}, máx {segundos(frio['max'])} "
+              f"(mediana habitual por instancia {segundos(todas.get('p50'))})")
+
+    print(f"\n=== POR INSTANCIA (las {args.instancias} con más mensajes) ===")
+    print(f"{'Instancia':<10} {'arranque':<10} {'vida':>7} {'peticiones':>10} {'mensajes':>8} {'msg/min':>7} "
+          f"{'errores':>7} {'conc.':>5} {'p50 msg':>8} {'p95 msg':>8}")
+    for id, i in sorted(instancias.items(), key=lambda par: -par[1]["mensajes"])[:args.instancias]:
+        arranque = i["arranque"]["senal"] if i["arranque"] else "previo"
+        print(f"{id[-8:]:<10} {arranque:<10} {duracion(i['vida_segundos']):>7} {i['peticiones']:>10} "
+              f"{i['mensajes']:>8} {i['mensajes_por_minuto_vivo']:>7.2f} {i['errores']:>7} {i['concurrencia_max']:>5} "
+              f"{segundos(i['latencia_mensaje'].get('p50')):>8} {segundos(i['latencia_mensaje'].get('p95')):>8}")
+
+    correlacion = resumen["correlacion"]
+    if correlacion:
+        print(f"\n=== PICOS DE LATENCIA (> p{args.percentil:g} = {segundos(correlacion['umbral_pico'])}) ===")
+        print(f"Mensajes: {correlacion['mensajes']}, en frío (primeros {args.ventana_frio:g}s de una instancia): "
+              f"{correlacion['frios']} ({100 * correlacion['proporcion_frios']:.1f}%)")
+        if correlacion["proporcion_picos_frios"] is not None:
+            print(f"Picos: {correlacion['picos']}, en frío: {correlacion['picos_frios']} "
+                  f"({100 * correlacion['proporcion_picos_frios']:.1f}%)")
+        f, c = correlacion["latencia_frio"], correlacion["latencia_caliente"]
+        if f["n"] and c["n"]:
+            prueba = correlacion["prueba"]
+            print(f"Latencia p50 en frío {segundos(f['p50'])} frente a {segundos(c['p50'])} en caliente"
+                  + (f" (p = {prueba['p']:.4f})" if prueba else ""))
+            if prueba and prueba["p"] < 0.01:
+                print("⚠ Los arranques en frío alargan el procesamiento: min-instances ≥ 1 evitaría esos picos")
+        if correlacion["vivas_media_picos"] is not None:
+            print(f"Instancias vivas de media: {correlacion['vivas_media']:.2f} en general, "
+                  f"{correlacion['vivas_media_picos']:.2f} durante los picos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Latencia por mensaje del pipeline de leads (Pub/Sub → IDs → procesado → Airtable → email)
+
+Ejemplos:
+  python analizar_latencias.py --freshness 6h
+  python analizar_latencias.py --cache --lentos 20
+  python analizar_latencias.py --bundle cloud_run_logs_diagnostico.ndjson.gz --json
+"""
+import argparse
+import json
+import sys
+
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.latencia import ETAPAS, LatenciaAnalizador
+from diagnostico.motor import Motor
+
+
+def formatear_segundos(valor):
+    if valor is None:
+        return "-"
+    if valor >= 60:
+        return f"{valor / 60:.1f}m"
+    return f"{valor:.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencias por etapa y extremo a extremo de cada mensaje")
+    anadir_argumentos_fuente(parser)
+    parser.add_argument("--lentos", type=int, default=10, help="Número de mensajes más lentos a mostrar")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resumen en JSON")
+    args = parser.parse_args()
+
+    motor = Motor(ensamblar=True)
+    latencia = motor.registrar(LatenciaAnalizador(max_lentos=args.lentos))
+    try:
+        motor.ejecutar(entradas_fuente(args))
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    resumen = latencia.resumen()
+
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return 0
+
+    print("=== LATENCIA DEL PIPELINE POR MENSAJE ===\n")
+    print(f"✓ {motor.fragmentos} logs leídos ({motor.total} eventos)")
+    print(f"Mensajes trazados: {resumen['mensajes']} (incompletos: {resumen['incompletos']}, "
+          f"con error: {resumen['con_error']}, emails sin enlazar: {resumen['emails_sin_enlazar']})\n")
+
+    print(f"{'Etapa':<20} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    filas = [(etapa, resumen["etapas"][etapa]) for etapa in ETAPAS[1:]]
+    filas.append(("extremo a extremo", resumen["extremo_a_extremo"]))
+    for etapa, distribucion in filas:
+        print(f"{etapa:<20} {distribucion['n']:>6} "
+              + " ".join(f"{formatear_segundos(distribucion.get(clave)):>9}" for clave in ("p50", "p95", "p99", "max")))
+
+    if resumen["lentos"]:
+        print(f"\n=== {len(resumen['lentos'])} MENSAJES MÁS LENTOS ===")
+        for i, traza in enumerate(resumen["lentos"], 1):
+            etapas = ", ".join(f"{etapa} {formatear_segundos(s)}" for etapa, s in traza["etapas"].items())
+            marca = " ✗ error" if traza["error"] else ""
+            print(f"\n{i}. {traza['id']} [{traza['inicio']}] total {formatear_segundos(traza['total'])}{marca}")
+            print(f"   {etapas}")
+            if traza["email_enviado"]:
+                print(f"   Email enviado: {traza['email_enviado']} (hilo {traza['hilo']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
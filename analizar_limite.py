@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Ejecuciones por minuto frente al límite de seguridad de processor.js y simulación de otros límites
+
+Ejemplos:
+  python analizar_limite.py --freshness 1d
+  python analizar_limite.py --cache --limite 3000 --limite 10000 --ventana 60 --ventana 300
+  python analizar_limite.py --bundle cloud_run_logs_diagnostico.ndjson.gz --json
+"""
+import argparse
+import json
+import sys
+
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.limite import LimiteSeguridadAnalizador, leer_processor_js
+from diagnostico.motor import Motor
+
+
+def porcentaje(margen):
+    return f"{100 * margen:.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Margen del límite de ejecuciones por minuto de processor.js")
+    anadir_argumentos_fuente(parser, freshness="1d")
+    parser.add_argument("--limite", type=int, action="append",
+                        help="RATE_LIMIT_MAX a simular (repetible; siempre se incluye el de processor.js)")
+    parser.add_argument("--ventana", type=float, action="append",
+                        help="Ventana en segundos a simular (repetible; por defecto la de processor.js)")
+    parser.add_argument("--minutos", type=int, default=15, help="Minutos con más ejecuciones a mostrar")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resumen en JSON")
+    args = parser.parse_args()
+
+    limite, ventana = leer_processor_js()
+    escenarios = [(lim, ven) for lim in args.limite or [limite] for ven in args.ventana or [ventana]]
+    motor = Motor(ensamblar=True)
+    analizador = motor.registrar(LimiteSeguridadAnalizador(escenarios=escenarios))
+    try:
+        motor.ejecutar(entradas_fuente(args))
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    resumen = analizador.resumen()
+
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return 0
+
+    print("=== LÍMITE DE SEGURIDAD DE EJECUCIONES ===\n")
+    print(f"✓ {motor.fragmentos} logs leídos ({motor.total} eventos)")
+    print(f"processor.js: RATE_LIMIT_MAX {resumen['limite']} por ventana de {resumen['ventana_segundos']:g}s, "
+          "contador independiente en cada instancia")
+    print(f"Ejecuciones: {resumen['ejecuciones']} en {len(resumen['instancias'])} instancias"
+          + (f" ({resumen['ignoradas']} etiquetas al salir por el límite no cuentan)" if resumen["ignoradas"] else ""))
+    if resumen["sin_registro"]:
+        print(f"  {resumen['sin_registro']} etiquetas de correos saltados, ya registrados o con 404 no cuentan")
+    if not resumen["ejecuciones"]:
+        print("ℹ Ninguna etiqueta \"processed\" de un mensaje registrado en Airtable: no hay ejecuciones que contar")
+        return 0
+
+    for titulo, d in (("por instancia", resumen["distribucion_instancia"]), ("global", resumen["distribucion_global"])):
+        print(f"Ejecuciones por minuto {titulo}: media {d['media']:.1f}, p50 {d['p50']}, p95 {d['p95']}, "
+              f"p99 {d['p99']}, máx {d['max']} ({porcentaje(d['max'] / resumen['limite'])} del límite)")
+
+    if resumen["disparos"] or resumen["paradas"] or resumen["rechazos"]:
+        print(f"\n✗ {len(resumen['disparos'])} disparos del límite, {resumen['paradas']} paradas automáticas, "
+              f"{resumen['rechazos']} lotes rechazados")
+        for d in resumen["disparos"][-10:]:
+            print(f"  {d['momento']} [{d['instancia'][-8:]}] {d['tipo']}: {d['contador']} / {d['limite']}")
+    else:
+        print("\n✓ Ningún disparo del límite en la ventana")
+
+    print("\n=== INSTANCIAS ===")
+    print(f"{'Instancia':<10} {'ejecuciones':>11} {'minutos':>8} {'pico/min':>9} {'reinicios':>9}  primera → última")
+    for instancia, i in sorted(resumen["instancias"].items(), key=lambda par: -par[1]["ejecuciones"]):
+        print(f"{instancia[-8:]:<10} {i['ejecuciones']:>11} {i['minutos_activos']:>8} {i['pico_minuto']:>9} "
+              f"{i['reinicios']:>9}  {i['primera'][:19]} → {i['ultima'][:19]}")
+
+    print(f"\n=== MINUTOS CON MÁS EJECUCIONES (top {args.minutos}) ===")
+    print(f"{'Minuto (UTC)':<17} {'total':>6} {'instancias':>10} {'máx/instancia':>13}")
+    for minuto, m in sorted(resumen["por_minuto"].items(), key=lambda par: -par[1]["total"])[:args.minutos]:
+        print(f"{minuto:<17} {m['total']:>6} {m['instancias']:>10} {m['max_instancia']:>13}")
+
+    print("\n=== SIMULACIÓN SOBRE EL MISMO TRÁFICO ===")
+    print(f"{'límite':>7} {'ventana':>8} │ {'pico/inst':>9} {'margen':>7} {'disparos':>8} {'inst.':>5} │ "
+          f"{'pico comp.':>10} {'margen':>7} {'disparos':>8}")
+    for s in resumen["simulaciones"]:
+        i, c = s["por_instancia"], s["compartido"]
+        print(f"{s['limite']:>7} {s['ventana_segundos']:>7g}s │ {i['pico']:>9} {porcentaje(i['margen']):>7} "
+              f"{i['disparos']:>8} {i['instancias_disparadas']:>5} │ {c['pico']:>10} {porcentaje(c['margen']):>7} "
+              f"{c['disparos']:>8}")
+    print(f"\nCon la ventana actual no habría disparado nunca un límite ≥ {resumen['limite_minimo_seguro']} por "
+          f"instancia (≥ {resumen['limite_minimo_seguro_compartido']} con un contador compartido)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,87 +1,112 @@
 #!/usr/bin/env python3
 """Analizar logs de Cloud Run para diagnosticar problema"""
-import json
 import os
-from datetime import datetime
 
-repo_path = r"C:\Users\fever\Media Fees Lead Automation\mfs-lead-generation-ai"
-log_file = os.path.join(repo_path, "cloud_run_logs_diagnostico.json")
+from diagnostico.config import REPO_PATH
+from diagnostico.history import HistoryAnalizador, diagnostico as diagnostico_history
+from diagnostico.mapeo import BundleMapeado, preparar_mapeo
+from diagnostico.motor import Motor
+
+log_file = os.path.join(REPO_PATH, "cloud_run_logs_diagnostico.ndjson.gz")
+if not os.path.exists(log_file):
+    # Volcado antiguo (JSON con las entradas serializadas en un string)
+    log_file = os.path.join(REPO_PATH, "cloud_run_logs_diagnostico.json")
 
 if not os.path.exists(log_file):
     print(f"Error: No se encontró {log_file}")
     exit(1)
 
-with open(log_file, 'r', encoding='utf-8') as f:
-    data = json.load(f)
-
 print("=== ANÁLISIS DE LOGS DE CLOUD RUN ===\n")
 
-# Analizar logs recientes
-if data.get("logs") and len(data["logs"]) > 0:
-    recent_logs = data["logs"][0]
-    if recent_logs["result"]["success"] and recent_logs["result"]["output"]:
-        try:
-            logs = json.loads(recent_logs["result"]["output"])
-            print(f"Total de logs encontrados: {len(logs)}\n")
-            
-            # Filtrar logs relevantes
-            pubsub_logs = [log for log in logs if "_pubsub" in log.get("textPayload", "")]
-            history_logs = [log for log in logs if "[history]" in log.get("textPayload", "")]
-            error_logs = [log for log in logs if log.get("severity") in ["ERROR", "CRITICAL"]]
-            
-            print(f"Logs de Pub/Sub: {len(pubsub_logs)}")
-            print(f"Logs de History: {len(history_logs)}")
-            print(f"Logs de Error: {len(error_logs)}\n")
-            
-            print("=== ÚLTIMOS LOGS DE PUB/SUB ===")
-            for i, log in enumerate(pubsub_logs[-10:], 1):
-                timestamp = log.get("timestamp", "N/A")
-                text = log.get("textPayload", "")
-                print(f"\n{i}. [{timestamp}] {text[:200]}")
-            
-            print("\n=== ÚLTIMOS LOGS DE HISTORY ===")
-            for i, log in enumerate(history_logs[-10:], 1):
+with BundleMapeado(preparar_mapeo(log_file)) as bundle:
+    # Solo se decodifican las entradas candidatas; las últimas se leen desde el final del fichero
+    def es_pubsub(log):
+        return "_pubsub" in log.get("textPayload", "")
+
+    def es_history(log):
+        return "[history]" in log.get("textPayload", "")
+
+    def es_error(log):
+        return log.get("severity") in ["ERROR", "CRITICAL"]
+
+    filtros = {
+        "pubsub": (b"_pubsub", es_pubsub),
+        "history": (b"[history]", es_history),
+        "error": ((b"ERROR", b"CRITICAL"), es_error),
+    }
+    tipo = "cloud_run_recent"
+    total = bundle.contar(tipo)
+    contadores = {}
+    history = None
+    try:
+        contadores = {clave: bundle.contar(tipo, contiene, predicado) for clave, (contiene, predicado) in filtros.items()}
+        pubsub_logs = bundle.cola(10, tipo, *filtros["pubsub"])
+        history_logs = bundle.cola(10, tipo, *filtros["history"])
+        error_logs = bundle.cola(5, tipo, *filtros["error"])
+        # El desfase del historyId necesita el flujo completo y reensamblado (Delta INBOX es multilínea)
+        motor = Motor(ensamblar=True)
+        history = motor.registrar(HistoryAnalizador())
+        motor.ejecutar(bundle.entradas(tipo))
+    except ValueError as e:
+        print(f"Error parseando logs: {e}")
+        total = 0
+
+    seccion = bundle.secciones.get("cloud_run_recent", {})
+    if not seccion.get("success", True):
+        print(f"Error obteniendo logs: {seccion.get('error')}")
+    if total:
+        print(f"Total de logs encontrados: {total}\n")
+
+        print(f"Logs de Pub/Sub: {contadores['pubsub']}")
+        print(f"Logs de History: {contadores['history']}")
+        print(f"Logs de Error: {contadores['error']}\n")
+
+        print("=== ÚLTIMOS LOGS DE PUB/SUB ===")
+        for i, log in enumerate(pubsub_logs, 1):
+            timestamp = log.get("timestamp", "N/A")
+            text = log.get("textPayload", "")
+            print(f"\n{i}. [{timestamp}] {text[:200]}")
+
+        print("\n=== ÚLTIMOS LOGS DE HISTORY ===")
+        for i, log in enumerate(history_logs, 1):
+            timestamp = log.get("timestamp", "N/A")
+            text = log.get("textPayload", "")
+            print(f"\n{i}. [{timestamp}] {text[:200]}")
+
+        if error_logs:
+            print("\n=== ERRORES ENCONTRADOS ===")
+            for i, log in enumerate(error_logs, 1):
                 timestamp = log.get("timestamp", "N/A")
-                text = log.get("textPayload", "")
-                print(f"\n{i}. [{timestamp}] {text[:200]}")
-            
-            if error_logs:
-                print("\n=== ERRORES ENCONTRADOS ===")
-                for i, log in enumerate(error_logs[-5:], 1):
-                    timestamp = log.get("timestamp", "N/A")
-                    text = log.get("textPayload", log.get("jsonPayload", {}))
-                    print(f"\n{i}. [{timestamp}] {str(text)[:300]}")
-            else:
-                print("\n✓ No se encontraron errores recientes")
-                
-        except Exception as e:
-            print(f"Error parseando logs: {e}")
-            print(f"Output: {recent_logs['result']['output'][:500]}")
+                text = log.get("textPayload", log.get("jsonPayload", {}))
+                print(f"\n{i}. [{timestamp}] {str(text)[:300]}")
+        else:
+            print("\n✓ No se encontraron errores recientes")
 
-# Analizar estado del servicio
-if "service_status" in data:
-    service = data["service_status"]
-    print("\n=== ESTADO DEL SERVICIO ===")
-    if service["success"]:
-        print("✓ Servicio accesible")
-        try:
-            service_info = json.loads(service["output"])
-            print(f"Última revisión: {service_info.get('status', {}).get('latestReadyRevisionName', 'N/A')}")
-            print(f"Estado: {service_info.get('status', {}).get('conditions', [{}])[0].get('status', 'N/A')}")
-        except:
-            print(f"Info: {service['output'][:200]}")
-    else:
-        print(f"✗ Error: {service['error']}")
+    # Analizar estado del servicio
+    service = bundle.cabecera.get("service_status")
+    if service:
+        print("\n=== ESTADO DEL SERVICIO ===")
+        if service["success"]:
+            print("✓ Servicio accesible")
+            service_info = service["datos"]
+            if isinstance(service_info, dict):
+                print(f"Última revisión: {service_info.get('status', {}).get('latestReadyRevisionName', 'N/A')}")
+                print(f"Estado: {service_info.get('status', {}).get('conditions', [{}])[0].get('status', 'N/A')}")
+            else:
+                print(f"Info: {str(service_info)[:200]}")
+        else:
+            print(f"✗ Error: {service['error']}")
 
 print("\n=== DIAGNÓSTICO ===")
-print("Problema identificado:")
-print("- Las notificaciones de Pub/Sub SÍ están llegando")
-print("- Pero no se encuentran mensajes nuevos para procesar")
-print("- Posibles causas:")
-print("  1. El historyId guardado está muy avanzado")
-print("  2. Los mensajes no están llegando a INBOX")
-print("  3. El historyId de la notificación es <= al guardado")
-print("\nSolución sugerida:")
-print("- Ejecutar /reset para reiniciar el historyId")
-print("- O verificar si hay emails nuevos en INBOX manualmente")
-
+if history is None:
+    print("No se pudo analizar el historyId")
+else:
+    resumen_history = history.resumen()
+    for linea in diagnostico_history(resumen_history):
+        print(linea)
+    cuentas = resumen_history["cuentas"].values()
+    if any(cuenta["estancado_desde"] or cuenta["regresiones"] for cuenta in cuentas):
+        print("\nSolución sugerida:")
+        print("- Ejecutar /reset para reiniciar el historyId")
+        print("- O verificar si hay emails nuevos en INBOX manualmente")
+    print("\nSerie completa: python analizar_history.py --bundle <paquete>")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Eficiencia de las notificaciones de Pub/Sub: ejecuciones vacías, fallback y ahorro por debounce
+
+Ejemplos:
+  python analizar_pubsub.py --freshness 1d
+  python analizar_pubsub.py --cache --intervalo 15 --ventanas 10,30,60
+  python analizar_pubsub.py --bundle cloud_run_logs_diagnostico.ndjson.gz --json
+"""
+import argparse
+import json
+import sys
+from datetime import timedelta
+
+from diagnostico.eficiencia import VENTANAS, EficienciaPubSubAnalizador
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.motor import Motor
+
+
+def porcentaje(parte, total):
+    return f"{100 * parte / total:.0f}%" if total else "-"
+
+
+def imprimir_tabla(titulo, grupos, limite=None):
+    print(f"\n=== {titulo} ===")
+    print(f"{'':<28} {'notif':>6} {'vacías':>7} {'%vac':>5} {'fallback':>8} {'mensajes':>8} {'history':>8} {'s inst.':>8}")
+    filas = list(grupos.items())
+    if limite:
+        filas = filas[-limite:]
+    for clave, c in filas:
+        print(f"{clave[:28]:<28} {c['notificaciones']:>6} {c['vacias']:>7} {porcentaje(c['vacias'], c['notificaciones']):>5} "
+              f"{c['fallback']:>8} {c['mensajes']:>8} {c['llamadas_history']:>8} {c['segundos']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notificaciones de Pub/Sub desperdiciadas frente a mensajes procesados")
+    anadir_argumentos_fuente(parser, freshness="1d")
+    parser.add_argument("--intervalo", type=int, default=60, help="Minutos por intervalo")
+    parser.add_argument("--ventanas", default=",".join(map(str, VENTANAS)),
+                        help="Ventanas de debounce a simular, en segundos")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resumen en JSON")
+    args = parser.parse_args()
+
+    ventanas = tuple(int(v) for v in args.ventanas.split(",") if v.strip())
+    motor = Motor(ensamblar=True)
+    eficiencia = motor.registrar(EficienciaPubSubAnalizador(intervalo=timedelta(minutes=args.intervalo),
+                                                            ventanas=ventanas))
+    try:
+        motor.ejecutar(entradas_fuente(args))
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    resumen = eficiencia.resumen()
+
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return 0
+
+    g = resumen["global"]
+    print("=== EFICIENCIA DE NOTIFICACIONES PUB/SUB ===\n")
+    print(f"✓ {motor.fragmentos} logs leídos ({motor.total} eventos)")
+    print(f"Notificaciones: {g['notificaciones']}  vacías: {g['vacias']} ({porcentaje(g['vacias'], g['notificaciones'])})  "
+          f"con fallback: {g['fallback']}  mensajes procesados: {g['mensajes']}")
+    if g["notificaciones"]:
+        print(f"Mensajes por notificación: {g['mensajes'] / g['notificaciones']:.2f}  "
+              f"llamadas a history.list: {g['llamadas_history']}")
+    if resumen["coste_base"] is not None:
+        print(f"Segundos de instancia: {g['segundos']:.1f} (en ejecuciones vacías: {g['segundos_vacias']:.1f}); "
+              f"coste fijo por ejecución ≈ {resumen['coste_base']:.2f}s, por mensaje ≈ {resumen['coste_por_mensaje']:.2f}s")
+
+    imprimir_tabla(f"POR INTERVALO ({args.intervalo} min)", resumen["por_intervalo"], limite=48)
+    imprimir_tabla("POR INSTANCIA", resumen["por_instancia"])
+
+    print("\n=== SIMULACIÓN DE DEBOUNCE ===")
+    print(f"{'ventana':>8} {'ejecuciones':>11} {'vacías':>7} {'ahorro':>7} {'s ahorrados':>11} {'espera media':>12}")
+    for r in resumen["coalescencia"]:
+        segundos = "-" if r["segundos_ahorrados"] is None else f"{r['segundos_ahorrados']:.1f}"
+        print(f"{r['ventana']:>7}s {r['ejecuciones']:>11} {r['vacias']:>7} {r['ahorro']:>6.0%} {segundos:>11} "
+              f"{r['espera_media']:>11.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Métricas por revisión desplegada y regresiones de la actual frente a la anterior
+
+Sale con código 2 si hay alguna regresión significativa, para poder usarlo
+justo después de un despliegue.
+
+Ejemplos:
+  python analizar_revisiones.py --freshness 1d
+  python analizar_revisiones.py --cache --actual mfs-lead-generation-ai-00104-abc --anterior mfs-lead-generation-ai-00103-j8x
+  python analizar_revisiones.py --bundle cloud_run_logs_diagnostico.ndjson.gz --json
+"""
+import argparse
+import json
+import os
+import sys
+
+from diagnostico.config import LOGS_DIR
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.motor import Motor
+from diagnostico.revisiones import ALFA, MIN_EMPEORAMIENTO, RevisionesAnalizador, revisiones_desplegadas
+
+
+def formato(valor, porcentaje=False):
+    if valor is None:
+        return "-"
+    return f"{100 * valor:.1f}%" if porcentaje else f"{valor:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara errores, volumen de logs y latencias entre revisiones")
+    anadir_argumentos_fuente(parser, freshness="1d")
+    parser.add_argument("--actual", help="Revisión a evaluar (por defecto la más reciente)")
+    parser.add_argument("--anterior", help="Revisión de referencia (por defecto la previa a --actual)")
+    parser.add_argument("--alfa", type=float, default=ALFA, help="Nivel de significación")
+    parser.add_argument("--empeoramiento", type=float, default=MIN_EMPEORAMIENTO,
+                        help="Empeoramiento relativo mínimo para considerarlo regresión (0.1 = 10%%)")
+    parser.add_argument("--estado", default=os.path.join(LOGS_DIR, "status.json"),
+                        help="status.json de obtener_estado.py con las revisiones desplegadas")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resumen en JSON")
+    args = parser.parse_args()
+
+    motor = Motor(ensamblar=True)
+    revisiones = motor.registrar(RevisionesAnalizador(actual=args.actual, anterior=args.anterior, alfa=args.alfa,
+                                                      min_empeoramiento=args.empeoramiento))
+    try:
+        motor.ejecutar(entradas_fuente(args))
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    resumen = revisiones.resumen()
+    desplegadas = revisiones_desplegadas(args.estado)
+    for revision in resumen["revisiones"]:
+        revision["creada"] = desplegadas.get(revision["revision"], {}).get("creada")
+    comparacion = resumen["comparacion"]
+    codigo = 2 if comparacion and comparacion["regresiones"] else 0
+
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return codigo
+
+    print("=== RENDIMIENTO POR REVISIÓN ===\n")
+    print(f"✓ {motor.fragmentos} logs leídos ({motor.total} eventos)\n")
+    print(f"{'Revisión':<36} {'commit':<8} {'desde':<20} {'entradas':>8} {'errores':>8} {'ent/msg':>8} "
+          f"{'vacías':>7} {'e2e p50':>8}")
+    for r in resumen["revisiones"]:
+        e2e = r["etapas"]["extremo_a_extremo"].get("p50")
+        print(f"{r['revision'][:36]:<36} {(r['commit'] or '-')[:7]:<8} {(r['creada'] or r['primera'] or '-')[:19]:<20} "
+              f"{r['entradas']:>8} {formato(r['tasa_errores'], True):>8} {formato(r['entradas_por_mensaje']):>8} "
+              f"{formato(r['ratio_vacias'], True):>7} {formato(e2e):>8}")
+
+    if not comparacion:
+        print("\nℹ Hace falta al menos dos revisiones en la ventana para comparar")
+        return 0
+
+    print(f"\n=== {comparacion['actual']} FRENTE A {comparacion['anterior']} (α={comparacion['alfa']}) ===")
+    print(f"{'Métrica':<28} {'anterior':>10} {'actual':>10} {'cambio':>8} {'p':>10}")
+    for c in comparacion["comparaciones"]:
+        porcentaje = c["metrica"] in ("tasa_errores", "ratio_vacias")
+        cambio = f"{100 * c['cambio']:+.0f}%" if c["cambio"] is not None else "-"
+        p = f"{c['p']:.2g}" if c["p"] is not None else "-"
+        marca = "  ✗ REGRESIÓN" if c["regresion"] else ""
+        print(f"{c['metrica']:<28} {formato(c['anterior'], porcentaje):>10} {formato(c['actual'], porcentaje):>10} "
+              f"{cambio:>8} {p:>10}{marca}")
+    if comparacion["regresiones"]:
+        print(f"\n✗ Regresiones significativas: {', '.join(comparacion['regresiones'])}")
+    else:
+        print("\n✓ Sin regresiones significativas")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Series temporales de volumen, errores y categorías por minuto u hora, agregadas con NumPy
+
+Ejemplos:
+  python analizar_series.py --freshness 7d --resolucion 1h
+  python analizar_series.py --cache --resolucion 5m --ventana 12 --grupos 10
+  python analizar_series.py --bundle cloud_run_logs_diagnostico.ndjson.gz --json
+"""
+import argparse
+import json
+import sys
+import time
+
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.logs import parsear_duracion
+from diagnostico.motor import Motor
+from diagnostico.series import MAX_GRUPOS, VENTANA_MOVIL, SeriesAnalizador
+
+
+def barra(valor, maximo, ancho=30):
+    return "█" * round(ancho * valor / maximo) if maximo else ""
+
+
+def imprimir_grupos(titulo, grupos):
+    print(f"\n=== POR {titulo} ===")
+    print(f"{'':<24} {'entradas':>9} {'errores':>8} {'tasa':>6} {'cubetas':>7}  primera → última")
+    for nombre, g in grupos.items():
+        print(f"{nombre[-24:]:<24} {g['entradas']:>9} {g['errores']:>8} {100 * g['tasa_error']:>5.1f}% "
+              f"{g['cubetas_activas']:>7}  {g['primera'][:19]} → {g['ultima'][:19]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histogramas, tasas móviles y agrupaciones vectorizadas de los logs")
+    anadir_argumentos_fuente(parser, freshness="7d")
+    parser.add_argument("--resolucion", default="1m", help="Anchura de cada cubeta (ej: 1m, 5m, 1h). Default: 1m")
+    parser.add_argument("--ventana", type=int, default=VENTANA_MOVIL,
+                        help=f"Cubetas de la media y la tasa de error móviles. Default: {VENTANA_MOVIL}")
+    parser.add_argument("--grupos", type=int, default=MAX_GRUPOS,
+                        help=f"Revisiones e instancias a mostrar. Default: {MAX_GRUPOS}")
+    parser.add_argument("--cubetas", type=int, default=15, help="Cubetas con más entradas a mostrar")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resumen en JSON")
+    args = parser.parse_args()
+    try:
+        resolucion = int(parsear_duracion(args.resolucion).total_seconds())
+    except ValueError as e:
+        parser.error(str(e))
+    if resolucion <= 0 or args.ventana <= 0:
+        parser.error("--resolucion y --ventana deben ser positivas")
+
+    motor = Motor(ensamblar=True)
+    analizador = motor.registrar(SeriesAnalizador(resolucion=resolucion, ventana=args.ventana,
+                                                  max_grupos=args.grupos))
+    try:
+        motor.ejecutar(entradas_fuente(args))
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    inicio = time.perf_counter()
+    try:
+        resumen = analizador.resumen()
+    except ImportError as e:
+        print(f"✗ {e}")
+        return 1
+    segundos_resumen = time.perf_counter() - inicio
+
+    if args.json:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+        return 0
+
+    print("=== SERIES TEMPORALES ===\n")
+    print(f"✓ {motor.fragmentos} logs leídos ({motor.total} eventos), resumidos en {segundos_resumen:.2f}s")
+    if not resumen["entradas"]:
+        print("ℹ Ninguna entrada con timestamp en la ventana")
+        return 0
+    print(f"{resumen['desde'][:19]} → {resumen['hasta'][:19]}: {resumen['cubetas']} cubetas de "
+          f"{args.resolucion} ({resumen['cubetas_vacias']} vacías)")
+    d = resumen["entradas_por_cubeta"]
+    print(f"Entradas por cubeta: media {d['media']:.1f}, p50 {d['p50']:g}, p95 {d['p95']:g}, máx {d['max']} "
+          f"({resumen['pico']['inicio'][:16]})")
+    print(f"Errores: {resumen['errores']} ({100 * resumen['tasa_error']:.2f}%), "
+          f"advertencias: {resumen['advertencias']}")
+    pico = resumen["pico_tasa_error_movil"]
+    if pico["tasa"]:
+        print(f"Peor tasa de error móvil ({args.ventana} cubetas): {100 * pico['tasa']:.1f}% hasta "
+              f"{pico['inicio'][:16]}")
+
+    categorias = {c: n for c, n in resumen["por_categoria"].items() if n}
+    if categorias:
+        print("\n=== POR CATEGORÍA ===")
+        maximo = max(categorias.values())
+        for categoria, n in sorted(categorias.items(), key=lambda par: -par[1]):
+            print(f"{categoria:<24} {n:>9} {barra(n, maximo)}")
+
+    print(f"\n=== CUBETAS CON MÁS ENTRADAS (top {args.cubetas}) ===")
+    print(f"{'Inicio (UTC)':<17} {'entradas':>9} {'errores':>8} {'/min móvil':>10} {'tasa móvil':>10}  categorías")
+    for c in sorted(resumen["por_cubeta"], key=lambda c: -c["entradas"])[:args.cubetas]:
+        principales = ", ".join(f"{k} {v}" for k, v in sorted(c["categorias"].items(), key=lambda par: -par[1])[:3])
+        print(f"{c['inicio'][:16]:<17} {c['entradas']:>9} {c['errores']:>8} {c['entradas_por_minuto_movil']:>10.1f} "
+              f"{100 * c['tasa_error_movil']:>9.1f}%  {principales}")
+
+    imprimir_grupos("REVISIÓN", resumen["por_revision"])
+    imprimir_grupos("INSTANCIA", resumen["por_instancia"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""Benchmark de los analizadores con logs sintéticos
+
+Genera (y guarda en auto_logs/bench/ para reutilizarlos) paquetes de
+entradas sintéticas del tamaño pedido y mide, en un proceso aparte por caso
+para que la memoria pico no se mezcle, el rendimiento de cada fase:
+
+    generar        solo el generador sintético (línea base del resto)
+    leer_bundle    leer y decodificar el paquete NDJSON en streaming
+    reproducir     el mismo paquete por el reproductor (orden, insertId) sin esperas
+    contar_mapeo   contar las entradas con el paquete proyectado en memoria
+    ensamblar      reunir los console.log partidos en varias entradas
+    clasificar     extraer el texto y clasificar cada entrada
+    <analizador>   Motor con un único analizador sobre el generador
+    huellas        agrupación de errores por plantilla con más errores en el generador;
+                   anota el ratio de aciertos de la caché LRU de normalización
+    motor_completo Motor con todos los analizadores a la vez
+    en_vivo        descarga real de Cloud Logging (solo con --en-vivo)
+
+Cada caso añade una línea JSON a auto_logs/benchmarks.ndjson con la
+duración, entradas por segundo, memoria pico y percentiles del tiempo por
+lote de 1000 entradas, junto al commit y la versión de Python, para poder
+comparar ejecuciones a lo largo del tiempo.
+
+Ejemplos:
+  python benchmark_diagnostico.py
+  python benchmark_diagnostico.py --entradas 10k,100k,1m --casos clasificar,motor_completo
+  python benchmark_diagnostico.py --entradas 20k --en-vivo --freshness 1d
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from diagnostico.config import LOGS_DIR, REPO_PATH
+from diagnostico.estadistica import percentil
+
+TAM_LOTE = 1000
+RESULTADOS = os.path.join(LOGS_DIR, "benchmarks.ndjson")
+DIRECTORIO_BUNDLES = os.path.join(LOGS_DIR, "bench")
+# Tasa de ráfagas de error del generador en el caso huellas (la por defecto apenas produce errores)
+TASA_ERRORES_HUELLAS = 0.2
+
+
+def _analizadores():
+    """Fábricas de cada analizador, importadas solo en el proceso que las mide"""
+    from diagnostico.analizadores import (
+        AirtableAnalizador,
+        EmailAnalizador,
+        ErroresAnalizador,
+        ProcesamientoAnalizador,
+        PubSubAnalizador,
+    )
+    from diagnostico.costes import CostGuardAnalizador
+    from diagnostico.eficiencia import EficienciaPubSubAnalizador
+    from diagnostico.history import HistoryAnalizador
+    from diagnostico.instancias import InstanciasAnalizador
+    from diagnostico.latencia import LatenciaAnalizador
+    from diagnostico.limite import LimiteSeguridadAnalizador
+    from diagnostico.revisiones import RevisionesAnalizador
+
+    return {
+        "errores": ErroresAnalizador,
+        "pubsub": PubSubAnalizador,
+        "airtable": AirtableAnalizador,
+        "procesamiento": ProcesamientoAnalizador,
+        "email": EmailAnalizador,
+        "latencia": LatenciaAnalizador,
+        "limite": LimiteSeguridadAnalizador,
+        "history": HistoryAnalizador,
+        "instancias": InstanciasAnalizador,
+        "eficiencia": EficienciaPubSubAnalizador,
+        "costes": CostGuardAnalizador,
+        "revisiones": RevisionesAnalizador,
+    }
+
+
+CASOS_BASE = ("generar", "leer_bundle", "reproducir", "contar_mapeo", "ensamblar", "clasificar")
+CASOS_ANALIZADORES = ("errores", "pubsub", "airtable", "procesamiento", "email", "latencia", "limite", "history",
+                      "instancias", "eficiencia", "costes", "revisiones")
+CASOS = (*CASOS_BASE, *CASOS_ANALIZADORES, "huellas", "series", "motor_completo", "en_vivo")
+
+
+def parsear_tamano(texto):
+    """'10k' -> 10000, '1m' -> 1000000"""
+    texto = texto.strip().lower()
+    multiplicador = {"k": 1_000, "m": 1_000_000}.get(texto[-1:], 1)
+    return int(float(texto.rstrip("km")) * multiplicador)
+
+
+def memoria_pico():
+    """Memoria residente máxima del proceso en MB (None si no se puede medir)"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 2**20
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return pico / 2**20 if sys.platform == "darwin" else pico / 2**10
+
+
+def commit_actual():
+    try:
+        resultado = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_PATH, capture_output=True,
+                                   text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return resultado.stdout.strip() or None
+
+
+class Cronometro:
+    """Envuelve un iterable y anota cuánto tarda cada lote de entradas en atravesar el pipeline"""
+
+    def __init__(self, tam_lote=TAM_LOTE):
+        self.tam_lote = tam_lote
+        self.lotes = []
+        self.total = 0
+
+    def medir(self, entradas):
+        marca = time.perf_counter()
+        for entrada in entradas:
+            yield entrada
+            self.total += 1
+            if self.total % self.tam_lote == 0:
+                ahora = time.perf_counter()
+                self.lotes.append(ahora - marca)
+                marca = ahora
+
+
+def ejecutar_caso(caso, n, ruta, semilla, freshness):
+    """Mide un caso en este proceso y devuelve sus métricas"""
+    from diagnostico.clasificador import Clasificador
+    from diagnostico.ensamblado import ensamblar
+    from diagnostico.fuentes import entradas_bundle
+    from diagnostico.logs import texto_entrada
+    from diagnostico.motor import Motor
+    from diagnostico.sintetico import generar_entradas
+
+    cronometro = Cronometro()
+    inicio = time.perf_counter()
+    eventos = None
+    extra = {}
+    if caso == "generar":
+        for _ in cronometro.medir(generar_entradas(n, semilla)):
+            pass
+    elif caso == "leer_bundle":
+        for _ in cronometro.medir(entradas_bundle(ruta)):
+            pass
+    elif caso == "reproducir":
+        from diagnostico.reproduccion import reproducir
+
+        for _ in cronometro.medir(reproducir(ruta)):
+            pass
+    elif caso == "contar_mapeo":
+        from diagnostico.mapeo import BundleMapeado
+
+        with BundleMapeado(ruta) as bundle:
+            cronometro.total = bundle.contar()
+    elif caso == "ensamblar":
+        eventos = sum(1 for _ in ensamblar(cronometro.medir(generar_entradas(n, semilla))))
+    elif caso == "clasificar":
+        clasificar = Clasificador().clasificar
+        for entrada in cronometro.medir(generar_entradas(n, semilla)):
+            clasificar(entrada, texto_entrada(entrada))
+    elif caso == "huellas":
+        from diagnostico.huellas import HuellasAnalizador, estadisticas_cache
+
+        motor = Motor([HuellasAnalizador()], ensamblar=True)
+        entradas = generar_entradas(n, semilla, tasa_errores=TASA_ERRORES_HUELLAS)
+        eventos = motor.ejecutar(cronometro.medir(entradas))
+        motor.analizadores[0].resumen()
+        extra["cache"] = estadisticas_cache()
+    elif caso == "series":
+        # Fuera de motor_completo: necesita numpy para resumir
+        from diagnostico.series import SeriesAnalizador
+
+        motor = Motor([SeriesAnalizador()], ensamblar=True)
+        eventos = motor.ejecutar(cronometro.medir(generar_entradas(n, semilla)))
+        motor.analizadores[0].resumen()
+    elif caso == "en_vivo":
+        from diagnostico.logs import iterar_entradas
+
+        for _ in cronometro.medir(iterar_entradas(freshness=freshness, max_entradas=n)):
+            pass
+    else:
+        fabricas = _analizadores()
+        elegidos = fabricas.values() if caso == "motor_completo" else [fabricas[caso]]
+        motor = Motor([fabrica() for fabrica in elegidos], ensamblar=True)
+        eventos = motor.ejecutar(cronometro.medir(generar_entradas(n, semilla)))
+        for analizador in motor.analizadores:
+            analizador.resumen()
+    segundos = time.perf_counter() - inicio
+
+    lotes_ms = sorted(1000 * s for s in cronometro.lotes)
+    return {
+        "caso": caso,
+        "entradas": cronometro.total,
+        "eventos": eventos,
+        "segundos": segundos,
+        "entradas_por_segundo": cronometro.total / segundos if segundos else None,
+        "memoria_pico_mb": memoria_pico(),
+        "lote_ms": {f"p{p}": percentil(lotes_ms, p) for p in (50, 95, 99)} if lotes_ms else {},
+        **extra,
+    }
+
+
+def preparar_bundle(n, semilla):
+    """Paquete sintético de n entradas, generado solo la primera vez"""
+    from diagnostico.sintetico import escribir_bundle
+
+    ruta = os.path.join(DIRECTORIO_BUNDLES, f"sintetico_{n}_{semilla}.ndjson")
+    if not os.path.exists(ruta):
+        os.makedirs(DIRECTORIO_BUNDLES, exist_ok=True)
+        temporal = ruta + ".tmp"
+        escribir_bundle(temporal, n, semilla)
+        os.replace(temporal, ruta)
+    return ruta
+
+
+def lanzar_caso(caso, n, ruta, args):
+    """Ejecuta el caso en un proceso nuevo para aislar su memoria pico"""
+    orden = [sys.executable, os.path.abspath(__file__), "--caso", caso, "--n", str(n), "--ruta", ruta,
+             "--semilla", str(args.semilla), "--freshness", args.freshness]
+    resultado = subprocess.run(orden, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    if resultado.returncode != 0:
+        error = (resultado.stderr.strip().splitlines() or ["código de salida " + str(resultado.returncode)])[-1]
+        return {"caso": caso, "entradas": n, "error": error}
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide rendimiento y memoria de los analizadores con logs sintéticos")
+    parser.add_argument("--entradas", default="10k,100k", help="Tamaños a medir separados por comas (10k, 1m...)")
+    parser.add_argument("--casos", help=f"Casos separados por comas (por defecto todos): {', '.join(CASOS)}")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del generador sintético")
+    parser.add_argument("--en-vivo", action="store_true", help="Medir también la descarga real de Cloud Logging")
+    parser.add_argument("--freshness", default="1d", help="Ventana de la descarga con --en-vivo")
+    parser.add_argument("--salida", default=RESULTADOS, help="Fichero NDJSON al que añadir los resultados")
+    parser.add_argument("--json", action="store_true", help="Imprimir los resultados en JSON")
+    # Uso interno: un único caso en este proceso
+    parser.add_argument("--caso", help=argparse.SUPPRESS)
+    parser.add_argument("--n", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--ruta", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.caso:
+        print(json.dumps(ejecutar_caso(args.caso, args.n, args.ruta, args.semilla, args.freshness)))
+        return 0
+
+    casos = [c.strip() for c in args.casos.split(",")] if args.casos else [c for c in CASOS if c != "en_vivo"]
+    if args.en_vivo and "en_vivo" not in casos:
+        casos.append("en_vivo")
+    desconocidos = set(casos) - set(CASOS)
+    if desconocidos:
+        print(f"✗ Casos desconocidos: {', '.join(sorted(desconocidos))}")
+        return 1
+    tamanos = [parsear_tamano(t) for t in args.entradas.split(",") if t.strip()]
+
+    comun = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "semilla": args.semilla,
+    }
+    resultados = []
+    if not args.json:
+        print("=== BENCHMARK DE DIAGNÓSTICO ===\n")
+        print(f"{'Caso':<16} {'entradas':>10} {'seg':>8} {'entradas/s':>11} {'neto/s':>11} {'RSS MB':>8} "
+              f"{'lote p50':>9} {'p99 ms':>8}")
+    for n in tamanos:
+        ruta = preparar_bundle(n, args.semilla)
+        base = None
+        for caso in casos:
+            resultado = {**comun, **lanzar_caso(caso, n, ruta, args)}
+            if caso == "generar" and "error" not in resultado:
+                base = resultado["segundos"]
+            # Sin el coste de generar las entradas, para los casos que leen del generador
+            if base is not None and caso not in ("generar", "leer_bundle", "reproducir", "contar_mapeo", "en_vivo") \
+                    and "error" not in resultado and resultado["segundos"] > base:
+                resultado["entradas_por_segundo_neto"] = resultado["entradas"] / (resultado["segundos"] - base)
+            resultados.append(resultado)
+            if args.json:
+                continue
+            if "error" in resultado:
+                print(f"{caso:<16} {n:>10} ✗ {resultado['error']}")
+                continue
+            neto = resultado.get("entradas_por_segundo_neto")
+            memoria = resultado["memoria_pico_mb"]
+            p50 = resultado["lote_ms"].get("p50")
+            p99 = resultado["lote_ms"].get("p99")
+            print(f"{caso:<16} {resultado['entradas']:>10} {resultado['segundos']:>8.2f} "
+                  f"{resultado['entradas_por_segundo']:>11.0f} {f'{neto:.0f}' if neto else '-':>11} "
+                  f"{f'{memoria:.0f}' if memoria is not None else '-':>8} "
+                  f"{f'{p50:.1f}' if p50 is not None else '-':>9} {f'{p99:.1f}' if p99 is not None else '-':>8}")
+            cache = resultado.get("cache")
+            if cache and cache["ratio_aciertos"] is not None:
+                print(f"{'':<16} caché de plantillas: {100 * cache['ratio_aciertos']:.1f}% aciertos "
+                      f"({cache['aciertos']}/{cache['aciertos'] + cache['fallos']}, {cache['tamano']} líneas)")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    with open(args.salida, "a", encoding="utf-8") as f:
+        for resultado in resultados:
+            f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    else:
+        print(f"\n✓ Resultados añadidos a {args.salida}")
+    return 1 if any("error" in r for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
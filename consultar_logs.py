@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Consultar el histórico local de logs de Cloud Run (SQLite indexado)
+
+Ejemplos:
+  python consultar_logs.py --sincronizar
+  python consultar_logs.py --sincronizar --purgar 30d --contar
+  python consultar_logs.py --importar cloud_run_logs_diagnostico.ndjson.gz
+  python consultar_logs.py --severidad ERROR --revision 00103 --desde 2025-12-02T18:00 --hasta 2025-12-02T19:00
+  python consultar_logs.py --etiqueta pubsub --limite 20 --recientes
+"""
+import argparse
+import sys
+from datetime import datetime, timezone
+
+from diagnostico.almacen import RUTA_ALMACEN, AlmacenLogs, entradas_diagnostico_json
+from diagnostico.logs import SEVERIDADES, formatear_timestamp, parsear_duracion, texto_entrada
+
+
+def parsear_momento(texto):
+    """Acepta fechas ISO ("2025-12-02T18:00", "2025-12-02 18:00:00"); sin zona se asume UTC"""
+    momento = datetime.fromisoformat(texto.replace("Z", "+00:00"))
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=timezone.utc)
+    return formatear_timestamp(momento)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta el histórico local de logs de Cloud Run")
+    parser.add_argument("--db", default=RUTA_ALMACEN, help="Ruta del almacén SQLite")
+    parser.add_argument("--sincronizar", action="store_true", help="Descargar las entradas nuevas de Cloud Logging")
+    parser.add_argument("--freshness", default="2h", help="Ventana inicial si el almacén está vacío")
+    parser.add_argument("--importar", metavar="PAQUETE",
+                        help="Importar un paquete de obtener_logs_cloudrun.py (.ndjson[.gz|.zst] o .json antiguo)")
+    parser.add_argument("--purgar", metavar="DURACION", type=parsear_duracion,
+                        help="Borrar las entradas más antiguas que esta duración (ej: 30d)")
+    parser.add_argument("--desde", type=parsear_momento)
+    parser.add_argument("--hasta", type=parsear_momento)
+    parser.add_argument("--severidad", type=str.upper, choices=list(SEVERIDADES), metavar="NIVEL",
+                        help=f"Severidad mínima ({', '.join(SEVERIDADES)})")
+    parser.add_argument("--revision", help="Nombre de revisión o sufijo (p. ej. 00103)")
+    parser.add_argument("--instancia", help="instanceId completo")
+    parser.add_argument("--etiqueta", help="Etiqueta de categoría (error, pubsub, airtable, email...)")
+    parser.add_argument("--limite", type=int, default=50)
+    parser.add_argument("--recientes", action="store_true", help="Mostrar primero las más recientes")
+    parser.add_argument("--contar", action="store_true", help="Solo mostrar el número de entradas")
+    args = parser.parse_args()
+
+    with AlmacenLogs(args.db) as almacen:
+        if args.importar:
+            nuevas = almacen.insertar(entradas_diagnostico_json(args.importar))
+            print(f"✓ Importadas {nuevas} entradas nuevas de {args.importar}")
+        if args.sincronizar:
+            try:
+                nuevas = almacen.sincronizar(args.freshness)
+                print(f"✓ Sincronizadas {nuevas} entradas nuevas")
+            except Exception as e:
+                print(f"✗ Error sincronizando: {e}")
+                return 1
+        if args.purgar:
+            limite = formatear_timestamp(datetime.now(timezone.utc) - args.purgar)
+            print(f"✓ Purgadas {almacen.purgar(limite)} entradas anteriores a {limite[:19]}")
+
+        filtros = {
+            "desde": args.desde,
+            "hasta": args.hasta,
+            "severidad_min": args.severidad,
+            "revision": args.revision,
+            "instancia": args.instancia,
+            "etiqueta": args.etiqueta,
+        }
+        total = almacen.contar(**filtros)
+        print(f"Entradas que cumplen los filtros: {total}")
+        if args.contar:
+            return 0
+
+        orden = "desc" if args.recientes else "asc"
+        for entrada in almacen.consultar(limite=args.limite, orden=orden, **filtros):
+            timestamp = entrada.get("timestamp", "N/A")
+            severity = entrada.get("severity", "DEFAULT")
+            revision = entrada.get("resource", {}).get("labels", {}).get("revision_name", "")
+            print(f"[{timestamp}] [{severity}] [{revision}] {texto_entrada(entrada)[:250]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Demonio local que mantiene calientes los clientes de Cloud Logging, Cloud Run y Cloud Build
+
+Mientras está en marcha, los scripts de diagnóstico le piden a él los logs
+y las sondas `gcloud ... --format=json` que sabe resolver, en lugar de
+arrancar un proceso gcloud y autenticarse en cada consulta. Los .ps1
+pueden usarlo igual con Invoke-RestMethod.
+
+Consulta con las credenciales de quien lo arranca: solo escucha en
+loopback salvo que MFS_DIAG_TOKEN tenga un secreto compartido, que entonces
+se exige en cada petición (Authorization: Bearer <token>).
+
+Ejemplos:
+  python demonio_diagnostico.py
+  python demonio_diagnostico.py --puerto 9000 --detallado
+  python demonio_diagnostico.py --estado
+  Invoke-RestMethod "http://127.0.0.1:8765/run/revisiones?limit=3"
+  Invoke-RestMethod "http://127.0.0.1:8765/logs?freshness=30m&max=50"
+  $env:MFS_DIAG_TOKEN = "secreto"; python demonio_diagnostico.py --host 0.0.0.0
+  Invoke-RestMethod "http://equipo:8765/builds?limit=3" -Headers @{Authorization = "Bearer $env:MFS_DIAG_TOKEN"}
+"""
+import argparse
+import json
+import os
+import sys
+
+from diagnostico import demonio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sirve por HTTP local las consultas de diagnóstico con clientes ya autenticados")
+    parser.add_argument("--host", default=demonio.HOST,
+                        help="Dirección en la que escuchar (una no local exige MFS_DIAG_TOKEN)")
+    parser.add_argument("--puerto", type=int, default=demonio.PUERTO, help="Puerto en el que escuchar")
+    parser.add_argument("--detallado", action="store_true", help="Mostrar cada petición atendida")
+    parser.add_argument("--estado", action="store_true", help="Consultar el demonio en marcha y salir")
+    args = parser.parse_args()
+
+    if args.estado:
+        os.environ["MFS_DIAG_DEMONIO"] = f"{args.host}:{args.puerto}"
+        if not demonio.disponible():
+            print(f"✗ No hay ningún demonio escuchando en {args.host}:{args.puerto}")
+            return 1
+        print(json.dumps(demonio.consultar("/salud"), indent=2, ensure_ascii=False))
+        return 0
+
+    try:
+        demonio.comprobar_host(args.host)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    print(f"=== DEMONIO DE DIAGNÓSTICO en http://{args.host}:{args.puerto} ===")
+    print("Rutas: /salud /run/servicio /run/revisiones /builds /builds/triggers /pubsub/suscripciones /logs")
+    print("--- escuchando (Ctrl+C para salir) ---", flush=True)
+    try:
+        demonio.servir(args.host, args.puerto, args.detallado)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"✗ No se pudo abrir {args.host}:{args.puerto}: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Utilidades compartidas por los scripts de diagnóstico de mfs-lead-generation-ai"""
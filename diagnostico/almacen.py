@@ -0,0 +1,200 @@
+"""Almacén SQLite indexado de entradas de Cloud Run
+
+Persiste el histórico de entradas de mfs-lead-generation-ai con índices por
+timestamp, severidad, revisión, instancia y etiqueta de categoría, de forma
+que consultas como "errores de la revisión 00103 entre las 18:00 y las
+19:00" son búsquedas por índice en lugar de recorrer volcados JSON.
+"""
+import json
+import os
+import sqlite3
+from datetime import timedelta
+
+from diagnostico.bundle import abrir_bundle
+from diagnostico.clasificador import Clasificador
+from diagnostico.config import LOGS_DIR, PROJECT, SERVICE
+from diagnostico.logs import SEVERIDADES, filtro_servicio, iterar_entradas, parsear_timestamp, texto_entrada
+
+RUTA_ALMACEN = os.path.join(LOGS_DIR, "logs.sqlite3")
+TAM_LOTE = 1000
+# Margen hacia atrás de la última entrada guardada para recoger las que Cloud Logging ingiere con retraso;
+# las repetidas las descarta INSERT OR IGNORE por insert_id
+SOLAPE = timedelta(seconds=60)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    insert_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    severidad INTEGER NOT NULL,
+    revision TEXT,
+    instancia TEXT,
+    texto TEXT,
+    entrada TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entradas_timestamp ON entradas (timestamp);
+CREATE INDEX IF NOT EXISTS idx_entradas_severidad ON entradas (severidad, timestamp);
+CREATE INDEX IF NOT EXISTS idx_entradas_revision ON entradas (revision, timestamp);
+CREATE INDEX IF NOT EXISTS idx_entradas_instancia ON entradas (instancia, timestamp);
+CREATE TABLE IF NOT EXISTS etiquetas (
+    etiqueta TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    insert_id TEXT NOT NULL,
+    PRIMARY KEY (etiqueta, timestamp, insert_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_etiquetas_insert_id ON etiquetas (insert_id);
+"""
+
+
+def _timestamp_normalizado(texto):
+    """Timestamp con 6 decimales fijos para que el orden de texto coincida con el temporal"""
+    if not texto:
+        return ""
+    return parsear_timestamp(texto).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _limite_revision(revision):
+    """Rango [inicio, fin) de nombres de revisión para un nombre completo o un sufijo como "00103" """
+    if not revision.startswith(SERVICE):
+        revision = f"{SERVICE}-{revision}"
+    # "-" es el carácter anterior a "." así que el rango cubre todas las revisiones con ese prefijo
+    return revision, revision + "."
+
+
+class AlmacenLogs:
+    """Histórico persistente de entradas en SQLite"""
+
+    def __init__(self, ruta=RUTA_ALMACEN, clasificador=None):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.executescript(ESQUEMA)
+        self.clasificador = clasificador or Clasificador()
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def insertar(self, entradas):
+        """Guarda las entradas por lotes, ignorando las que ya existen; devuelve cuántas eran nuevas"""
+        nuevas = 0
+        lote = []
+        for entrada in entradas:
+            lote.append(entrada)
+            if len(lote) >= TAM_LOTE:
+                nuevas += self._insertar_lote(lote)
+                lote = []
+        if lote:
+            nuevas += self._insertar_lote(lote)
+        return nuevas
+
+    def _insertar_lote(self, lote):
+        filas = []
+        filas_etiquetas = []
+        for entrada in lote:
+            insert_id = entrada.get("insertId")
+            if not insert_id:
+                continue
+            timestamp = _timestamp_normalizado(entrada.get("timestamp"))
+            texto = texto_entrada(entrada)
+            labels = entrada.get("labels", {})
+            recurso = entrada.get("resource", {}).get("labels", {})
+            filas.append((
+                insert_id,
+                timestamp,
+                SEVERIDADES.get(entrada.get("severity", "DEFAULT"), 0),
+                recurso.get("revision_name"),
+                labels.get("instanceId"),
+                texto,
+                json.dumps(entrada, ensure_ascii=False),
+            ))
+            for etiqueta in self.clasificador.clasificar(entrada, texto):
+                filas_etiquetas.append((etiqueta, timestamp, insert_id))
+        with self.conexion:
+            antes = self.conexion.total_changes
+            self.conexion.executemany("INSERT OR IGNORE INTO entradas VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+            nuevas = self.conexion.total_changes - antes
+            self.conexion.executemany("INSERT OR IGNORE INTO etiquetas VALUES (?, ?, ?)", filas_etiquetas)
+        return nuevas
+
+    def ultimo_timestamp(self):
+        fila = self.conexion.execute("SELECT MAX(timestamp) FROM entradas").fetchone()
+        return fila[0] if fila else None
+
+    def sincronizar(self, freshness_inicial="2h", project=PROJECT, service=SERVICE, client=None):
+        """Descarga de Cloud Logging las entradas posteriores a la última guardada (menos SOLAPE)"""
+        ultimo = self.ultimo_timestamp()
+        if ultimo:
+            entradas = iterar_entradas(filtro_servicio(service), project=project, freshness=None,
+                                       desde=parsear_timestamp(ultimo) - SOLAPE, client=client)
+        else:
+            entradas = iterar_entradas(filtro_servicio(service), project=project,
+                                       freshness=freshness_inicial, client=client)
+        return self.insertar(entradas)
+
+    def _condiciones(self, desde, hasta, severidad_min, revision, instancia, etiqueta):
+        tabla = "entradas e"
+        condiciones = []
+        parametros = []
+        if etiqueta:
+            tabla = "etiquetas t JOIN entradas e ON e.insert_id = t.insert_id"
+            condiciones.append("t.etiqueta = ?")
+            parametros.append(etiqueta)
+        columna_tiempo = "t.timestamp" if etiqueta else "e.timestamp"
+        if desde:
+            condiciones.append(f"{columna_tiempo} >= ?")
+            parametros.append(_timestamp_normalizado(desde))
+        if hasta:
+            condiciones.append(f"{columna_tiempo} < ?")
+            parametros.append(_timestamp_normalizado(hasta))
+        if severidad_min:
+            if severidad_min.upper() not in SEVERIDADES:
+                raise ValueError(f"Severidad no válida: {severidad_min!r} ({', '.join(SEVERIDADES)})")
+            condiciones.append("e.severidad >= ?")
+            parametros.append(SEVERIDADES[severidad_min.upper()])
+        if revision:
+            inicio, fin = _limite_revision(revision)
+            condiciones.append("e.revision >= ? AND e.revision < ?")
+            parametros.extend((inicio, fin))
+        if instancia:
+            condiciones.append("e.instancia = ?")
+            parametros.append(instancia)
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        return tabla, columna_tiempo, where, parametros
+
+    def consultar(self, desde=None, hasta=None, severidad_min=None, revision=None, instancia=None,
+                  etiqueta=None, limite=None, orden="asc"):
+        """Genera las entradas que cumplen los filtros, decodificadas bajo demanda"""
+        tabla, columna_tiempo, where, parametros = self._condiciones(
+            desde, hasta, severidad_min, revision, instancia, etiqueta)
+        sql = f"SELECT e.entrada FROM {tabla}{where} ORDER BY {columna_tiempo} {'DESC' if orden == 'desc' else 'ASC'}"
+        if limite:
+            sql += " LIMIT ?"
+            parametros.append(limite)
+        for (entrada,) in self.conexion.execute(sql, parametros):
+            yield json.loads(entrada)
+
+    def contar(self, desde=None, hasta=None, severidad_min=None, revision=None, instancia=None, etiqueta=None):
+        tabla, _, where, parametros = self._condiciones(desde, hasta, severidad_min, revision, instancia, etiqueta)
+        return self.conexion.execute(f"SELECT COUNT(*) FROM {tabla}{where}", parametros).fetchone()[0]
+
+    def purgar(self, antes_de):
+        """Elimina las entradas anteriores a `antes_de` (RFC 3339) y devuelve cuántas borró"""
+        limite = _timestamp_normalizado(antes_de)
+        with self.conexion:
+            self.conexion.execute("DELETE FROM etiquetas WHERE timestamp < ?", (limite,))
+            return self.conexion.execute("DELETE FROM entradas WHERE timestamp < ?", (limite,)).rowcount
+
+
+def entradas_diagnostico_json(ruta):
+    """Genera las entradas de un paquete de obtener_logs_cloudrun.py (NDJSON o el JSON antiguo)"""
+    with abrir_bundle(ruta) as bundle:
+        yield from bundle.entradas()
@@ -0,0 +1,95 @@
+"""Analizadores de las secciones de los informes de diagnóstico"""
+from collections import deque
+
+from diagnostico.motor import Analizador
+
+
+class ErroresAnalizador(Analizador):
+    """Errores por severidad o por aparecer "error" en el mensaje"""
+
+    nombre = "errores"
+
+    def __init__(self, max_muestras=10, desde=None, solo_severidad=False):
+        super().__init__(max_muestras, desde)
+        self.solo_severidad = solo_severidad
+        self.por_severidad = 0
+        self.advertencias = 0
+
+    def coincide(self, entrada, texto, etiquetas):
+        if "advertencia" in etiquetas:
+            self.advertencias += 1
+        if "grave" in etiquetas:
+            self.por_severidad += 1
+            return True
+        return not self.solo_severidad and "error" in etiquetas
+
+    def resumen(self):
+        return {**super().resumen(), "por_severidad": self.por_severidad, "advertencias": self.advertencias}
+
+
+class PubSubAnalizador(Analizador):
+    """Logs del handler de notificaciones de Pub/Sub"""
+
+    nombre = "pubsub"
+
+    def coincide(self, entrada, texto, etiquetas):
+        return "pubsub" in etiquetas
+
+
+class AirtableAnalizador(Analizador):
+    """Logs de Airtable, separando registros creados y fallos"""
+
+    nombre = "airtable"
+
+    def __init__(self, max_muestras=5, desde=None):
+        super().__init__(max_muestras, desde)
+        self.exitosos = 0
+        self.fallidos = 0
+        self.muestras_fallidos = deque(maxlen=max_muestras)
+
+    def coincide(self, entrada, texto, etiquetas):
+        return "airtable" in etiquetas
+
+    def acumular(self, entrada, texto, etiquetas):
+        if "exito" in etiquetas:
+            self.exitosos += 1
+        if "error" in etiquetas or "fallo" in etiquetas:
+            self.fallidos += 1
+            self.muestras_fallidos.append(entrada)
+
+    def resumen(self):
+        return {**super().resumen(), "exitosos": self.exitosos, "fallidos": self.fallidos}
+
+
+class ProcesamientoAnalizador(Analizador):
+    """Logs del ciclo de procesamiento de mensajes (delta de history, IDs y mensajes)"""
+
+    nombre = "procesamiento"
+
+    def coincide(self, entrada, texto, etiquetas):
+        return "procesamiento" in etiquetas
+
+
+class EmailAnalizador(Analizador):
+    """Logs de envío de emails de leads"""
+
+    nombre = "email"
+
+    def __init__(self, max_muestras=20, desde=None):
+        super().__init__(max_muestras, desde)
+        self.exitosos = 0
+        self.muestras_exitosos = deque(maxlen=5)
+        self.muestras_relevantes = deque(maxlen=max_muestras)
+
+    def coincide(self, entrada, texto, etiquetas):
+        return "email" in etiquetas
+
+    def acumular(self, entrada, texto, etiquetas):
+        if "email_relevante" in etiquetas:
+            self.muestras_relevantes.append(entrada)
+        if "envio_ok" in etiquetas:
+            self.exitosos += 1
+            self.muestras_exitosos.append(entrada)
+
+    def resumen(self):
+        return {**super().resumen(), "exitosos": self.exitosos}
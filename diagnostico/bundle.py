@@ -0,0 +1,210 @@
+"""Formato de paquete de diagnóstico: NDJSON versionado y opcionalmente comprimido
+
+Estructura (una línea JSON por registro):
+
+    {"formato": "mfs-diagnostico", "version": 1, ...metadatos...}     cabecera
+    {"_seccion": {"tipo": "errors", "descripcion": "...", "filtro": "..."}}
+    {...entrada de Cloud Logging tal cual...}
+    ...
+    {"_fin_seccion": {"tipo": "errors", "success": true, "total": 12, "error": ""}}
+
+La cabecera lleva los metadatos pequeños (estado del servicio, suscripciones
+de Pub/Sub...). Las entradas se guardan nativas, sin volver a serializarlas
+dentro de un string, y se leen en streaming sin cargar el fichero entero.
+La compresión se elige por extensión: .gz (gzip) o .zst (zstandard).
+
+`abrir_bundle` también entiende el volcado antiguo cloud_run_logs_diagnostico.json
+(entradas serializadas como string dentro de results["logs"][i]["result"]["output"]).
+"""
+import gzip
+import io
+import json
+
+FORMATO = "mfs-diagnostico"
+VERSION = 1
+
+_SECCION = '{"_seccion"'
+_FIN_SECCION = '{"_fin_seccion"'
+
+
+def _modulo_zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Para paquetes .zst instala zstandard: pip install zstandard")
+    return zstandard
+
+
+def abrir_texto(ruta, modo="r"):
+    """Abre un fichero de texto UTF-8 aplicando la compresión que indique su extensión"""
+    if ruta.endswith(".gz"):
+        return gzip.open(ruta, modo + "t", encoding="utf-8")
+    if ruta.endswith(".zst"):
+        zstandard = _modulo_zstd()
+        if modo == "w":
+            binario = zstandard.ZstdCompressor().stream_writer(open(ruta, "wb"))
+        else:
+            binario = zstandard.ZstdDecompressor().stream_reader(open(ruta, "rb"))
+        return io.TextIOWrapper(binario, encoding="utf-8")
+    return open(ruta, modo, encoding="utf-8")
+
+
+def metadato_comando(resultado):
+    """Resume el resultado de un comando gcloud --format=json para la cabecera"""
+    datos = None
+    if resultado.get("success") and resultado.get("output"):
+        try:
+            datos = json.loads(resultado["output"])
+        except ValueError:
+            datos = resultado["output"]
+    return {"success": bool(resultado.get("success")), "error": resultado.get("error", ""), "datos": datos}
+
+
+class EscritorBundle:
+    """Escribe un paquete de diagnóstico entrada a entrada"""
+
+    def __init__(self, ruta, **metadatos):
+        self.ruta = ruta
+        self._f = abrir_texto(ruta, "w")
+        self._escribir({"formato": FORMATO, "version": VERSION, **metadatos})
+
+    def _escribir(self, registro):
+        self._f.write(json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def seccion(self, tipo, descripcion, entradas, filtro=None, error=""):
+        """Vuelca una consulta completa; un fallo a mitad se registra en el cierre de la sección"""
+        self._escribir({"_seccion": {"tipo": tipo, "descripcion": descripcion, "filtro": filtro}})
+        total = 0
+        try:
+            for entrada in entradas:
+                self._escribir(entrada)
+                total += 1
+        except Exception as e:
+            error = str(e)
+        resumen = {"tipo": tipo, "success": not error, "total": total, "error": error}
+        self._escribir({"_fin_seccion": resumen})
+        return resumen
+
+    def cerrar(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+class LectorBundle:
+    """Lee un paquete de diagnóstico en streaming
+
+    `cabecera` está disponible nada más abrir; `secciones` se va completando
+    (descripción, total, error) a medida que se recorren las entradas.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._f = abrir_texto(ruta, "r")
+        primera = self._f.readline()
+        try:
+            self.cabecera = json.loads(primera)
+        except ValueError:
+            self._f.close()
+            raise ValueError(f"{ruta} no es un paquete {FORMATO}")
+        if not isinstance(self.cabecera, dict) or self.cabecera.get("formato") != FORMATO:
+            self._f.close()
+            raise ValueError(f"{ruta} no es un paquete {FORMATO}")
+        if self.cabecera.get("version", 0) > VERSION:
+            self._f.close()
+            raise ValueError(f"Versión de paquete no soportada: {self.cabecera.get('version')}")
+        self.secciones = {}
+
+    def registros(self):
+        """Genera (tipo_de_sección, entrada) para cada entrada del paquete"""
+        tipo = None
+        for linea in self._f:
+            if linea.startswith(_SECCION):
+                info = json.loads(linea)["_seccion"]
+                tipo = info["tipo"]
+                self.secciones[tipo] = dict(info)
+            elif linea.startswith(_FIN_SECCION):
+                info = json.loads(linea)["_fin_seccion"]
+                self.secciones.setdefault(info["tipo"], {}).update(info)
+                tipo = None
+            elif linea.strip():
+                yield tipo, json.loads(linea)
+
+    def entradas(self, tipo=None):
+        """Genera las entradas de una sección (o de todas si `tipo` es None)"""
+        for seccion, entrada in self.registros():
+            if tipo is None or seccion == tipo:
+                yield entrada
+
+    def cerrar(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+class _LectorLegado:
+    """Misma interfaz que LectorBundle sobre el volcado JSON antiguo (se carga entero)"""
+
+    def __init__(self, ruta, datos):
+        self.ruta = ruta
+        self._datos = datos
+        self.cabecera = {
+            "formato": "legado",
+            "version": 0,
+            "generado": datos.get("timestamp"),
+            "service_status": metadato_comando(datos.get("service_status", {})),
+            "pubsub": metadato_comando(datos.get("pubsub", {})),
+        }
+        self.secciones = {}
+
+    def registros(self):
+        for consulta in self._datos.get("logs", []):
+            tipo = consulta.get("type")
+            resultado = consulta.get("result", {})
+            info = {"tipo": tipo, "descripcion": consulta.get("description", ""), "filtro": None,
+                    "success": bool(resultado.get("success")), "error": resultado.get("error", "")}
+            entradas = []
+            if resultado.get("success") and resultado.get("output"):
+                try:
+                    entradas = json.loads(resultado["output"])
+                except ValueError as e:
+                    info["success"] = False
+                    info["error"] = f"Salida no es JSON: {e}"
+            info["total"] = len(entradas)
+            self.secciones[tipo] = info
+            # Los volcados antiguos se guardaban de más reciente a más antigua
+            entradas.sort(key=lambda entrada: entrada.get("timestamp", ""))
+            for entrada in entradas:
+                yield tipo, entrada
+
+    entradas = LectorBundle.entradas
+
+    def cerrar(self):
+        self._datos = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def abrir_bundle(ruta):
+    """Abre un paquete NDJSON (comprimido o no) o un volcado JSON antiguo"""
+    try:
+        return LectorBundle(ruta)
+    except ValueError:
+        pass
+    with abrir_texto(ruta, "r") as f:
+        datos = json.load(f)
+    if not isinstance(datos, dict) or "logs" not in datos:
+        raise ValueError(f"{ruta} no es un paquete de diagnóstico reconocido")
+    return _LectorLegado(ruta, datos)
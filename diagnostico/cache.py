@@ -0,0 +1,216 @@
+"""Caché local e incremental de logs por proyecto/servicio
+
+Cada caché es un fichero NDJSON con las entradas en orden cronológico y un
+cursor JSON con la marca de agua (timestamp + insertId de las últimas
+entradas). En cada ejecución solo se piden a Cloud Logging las entradas
+posteriores al cursor (nunca antes de la ventana pedida), se descartan
+duplicados por insertId y, cuando lo caducado ya pesa, se eliminan las
+entradas más antiguas que la retención.
+"""
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from diagnostico.config import CACHE_DIR, PROJECT, SERVICE
+from diagnostico.logs import (
+    filtro_servicio,
+    formatear_timestamp,
+    iterar_entradas,
+    parsear_duracion,
+    parsear_timestamp,
+)
+
+# Margen hacia atrás del cursor para recoger entradas que Cloud Logging ingiere con retraso
+SOLAPE = timedelta(seconds=30)
+RETENCION = "1d"
+# Fracción caducada (estimada por tiempo) a partir de la que compensa reescribir el fichero
+FRACCION_EXPULSAR = 0.25
+TAM_BLOQUE = 64 * 1024
+
+
+def _ruta_base(project, service, directorio):
+    return os.path.join(directorio, f"{project}__{service}")
+
+
+def _leer_cursor(ruta):
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_json(ruta, datos):
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def _lineas_inversas(ruta, tam_bloque=TAM_BLOQUE):
+    """Genera las líneas de un fichero desde el final, leyendo por bloques"""
+    with open(ruta, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        posicion = f.tell()
+        resto = b""
+        while posicion > 0:
+            leer = min(tam_bloque, posicion)
+            posicion -= leer
+            f.seek(posicion)
+            bloque = f.read(leer) + resto
+            lineas = bloque.split(b"\n")
+            resto = lineas.pop(0)
+            for linea in reversed(lineas):
+                if linea.strip():
+                    yield linea
+        if resto.strip():
+            yield resto
+
+
+class CacheLogs:
+    """Caché persistente de las entradas de un servicio de Cloud Run"""
+
+    def __init__(self, project=PROJECT, service=SERVICE, directorio=CACHE_DIR, retencion=RETENCION):
+        self.project = project
+        self.service = service
+        self.retencion = parsear_duracion(retencion)
+        base = _ruta_base(project, service, directorio)
+        self.ruta_entradas = base + ".ndjson"
+        self.ruta_cursor = base + ".cursor.json"
+        self.directorio = directorio
+
+    def cursor(self):
+        return _leer_cursor(self.ruta_cursor)
+
+    def _descargar(self, f, desde, hasta, vistos, filtro, client):
+        """Escribe en `f` las entradas no vistas de la ventana y devuelve (nuevas, [(timestamp, insertId)])"""
+        nuevas = 0
+        marcas = []
+        for entrada in iterar_entradas(filtro or filtro_servicio(self.service), project=self.project,
+                                       freshness=None, desde=desde, hasta=hasta, orden="asc", client=client):
+            insert_id = entrada.get("insertId")
+            if insert_id in vistos:
+                continue
+            if insert_id:
+                vistos.add(insert_id)
+            f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            nuevas += 1
+            if entrada.get("timestamp"):
+                marcas.append((entrada["timestamp"], insert_id))
+        return nuevas, marcas
+
+    def actualizar(self, freshness_inicial="2h", filtro=None, client=None):
+        """Descarga solo las entradas nuevas desde el cursor y devuelve cuántas se añadieron"""
+        os.makedirs(self.directorio, exist_ok=True)
+        cursor = self.cursor() or {}
+        ahora = datetime.now(timezone.utc)
+        inicio_pedido = max(ahora - parsear_duracion(freshness_inicial), ahora - self.retencion)
+        recientes = [tuple(par) for par in cursor.get("ids_recientes", [])]
+        vistos = {insert_id for _, insert_id in recientes}
+        nuevas = 0
+
+        cubierto_desde = cursor.get("cubierto_desde")
+        desde = None
+        if cursor.get("timestamp"):
+            desde = parsear_timestamp(cursor["timestamp"]) - SOLAPE
+        if desde is None or desde < inicio_pedido:
+            # Sin cursor, o con uno anterior a la ventana pedida: lo guardado no enlazaría con el delta
+            # (quedaría un hueco), así que se descarta y solo se pide la ventana pedida
+            if os.path.exists(self.ruta_entradas):
+                open(self.ruta_entradas, "w").close()
+            desde = inicio_pedido
+            cubierto_desde = formatear_timestamp(inicio_pedido)
+            recientes, vistos, cursor = [], set(), {}
+        elif cubierto_desde and parsear_timestamp(cubierto_desde) > inicio_pedido:
+            # La ventana pedida empieza antes de lo que cubre la caché: se rellena por delante
+            temporal = self.ruta_entradas + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                nuevas, _ = self._descargar(f, inicio_pedido, parsear_timestamp(cubierto_desde), set(), filtro, client)
+                if os.path.exists(self.ruta_entradas):
+                    with open(self.ruta_entradas, "r", encoding="utf-8") as anterior:
+                        for linea in anterior:
+                            f.write(linea)
+            os.replace(temporal, self.ruta_entradas)
+            cubierto_desde = formatear_timestamp(inicio_pedido)
+
+        with open(self.ruta_entradas, "a", encoding="utf-8") as f:
+            delta, marcas = self._descargar(f, desde, None, vistos, filtro, client)
+        nuevas += delta
+
+        ultimo = max([cursor.get("timestamp") or ""] + [t for t, _ in marcas])
+        if ultimo:
+            # Solo hace falta recordar los insertId que pueden volver a aparecer dentro del solape
+            limite = formatear_timestamp(parsear_timestamp(ultimo) - SOLAPE)
+            recientes = [(t, i) for t, i in recientes + marcas if t >= limite and i]
+        _escribir_json(self.ruta_cursor, {
+            "project": self.project,
+            "service": self.service,
+            "timestamp": ultimo or None,
+            "cubierto_desde": cubierto_desde,
+            "ids_recientes": recientes,
+            "actualizado": formatear_timestamp(ahora),
+        })
+        self.expulsar()
+        return nuevas
+
+    def expulsar(self, fraccion=FRACCION_EXPULSAR):
+        """Reescribe la caché sin las entradas más antiguas que la retención y devuelve cuántas quitó
+
+        Solo compacta cuando lo caducado supera `fraccion` del tiempo cubierto;
+        mientras tanto `iterar` ya salta esas entradas al filtrar por la ventana.
+        """
+        cursor = self.cursor()
+        if not cursor or not cursor.get("cubierto_desde") or not os.path.exists(self.ruta_entradas):
+            return 0
+        ahora = datetime.now(timezone.utc)
+        limite = formatear_timestamp(ahora - self.retencion)
+        if cursor["cubierto_desde"] >= limite:
+            return 0
+        cubierto = parsear_timestamp(cursor["cubierto_desde"])
+        fin = parsear_timestamp(cursor["timestamp"]) if cursor.get("timestamp") else ahora
+        if fin > cubierto and (ahora - self.retencion - cubierto) / (fin - cubierto) < fraccion:
+            return 0
+        eliminadas = 0
+        temporal = self.ruta_entradas + ".tmp"
+        with open(self.ruta_entradas, "r", encoding="utf-8") as origen, \
+                open(temporal, "w", encoding="utf-8") as destino:
+            for linea in origen:
+                if json.loads(linea).get("timestamp", "") < limite:
+                    eliminadas += 1
+                    continue
+                destino.write(linea)
+        os.replace(temporal, self.ruta_entradas)
+        cursor["cubierto_desde"] = limite
+        _escribir_json(self.ruta_cursor, cursor)
+        return eliminadas
+
+    def iterar(self, freshness=None, desde=None, orden="asc"):
+        """Genera las entradas de la caché dentro de la ventana, sin cargar el fichero entero"""
+        if not os.path.exists(self.ruta_entradas):
+            return
+        if freshness and desde is None:
+            desde = datetime.now(timezone.utc) - parsear_duracion(freshness)
+        limite = formatear_timestamp(desde) if desde is not None else ""
+        if orden == "desc":
+            # El fichero está ordenado salvo por las entradas tardías del solape
+            corte = formatear_timestamp(desde - SOLAPE) if desde is not None else ""
+            for linea in _lineas_inversas(self.ruta_entradas):
+                entrada = json.loads(linea)
+                timestamp = entrada.get("timestamp", "")
+                if timestamp < corte:
+                    return
+                if timestamp >= limite:
+                    yield entrada
+        else:
+            with open(self.ruta_entradas, "r", encoding="utf-8") as f:
+                for linea in f:
+                    entrada = json.loads(linea)
+                    if entrada.get("timestamp", "") >= limite:
+                        yield entrada
+
+
+def entradas_cacheadas(freshness="1h", project=PROJECT, service=SERVICE, orden="asc", client=None):
+    """Actualiza la caché con el delta desde la última ejecución y genera la ventana pedida"""
+    cache = CacheLogs(project, service)
+    cache.actualizar(freshness_inicial=freshness, client=client)
+    return cache.iterar(freshness=freshness, orden=orden)
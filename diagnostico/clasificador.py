@@ -0,0 +1,68 @@
+"""Clasificación de entradas por categorías en una sola pasada
+
+El texto de cada entrada se normaliza (minúsculas) una única vez y todas las
+palabras clave se buscan con una sola expresión regular compilada, en vez de
+repetir `str(payload).lower()` por cada palabra.
+"""
+import re
+
+from diagnostico.logs import texto_entrada
+
+# Etiqueta -> palabras clave (se comparan en minúsculas)
+CATEGORIAS = {
+    "error": ("error",),
+    "fallo": ("fallo",),
+    "exito": ("creado", "exitoso"),
+    "pubsub": ("_pubsub",),
+    "history": ("[history]",),
+    "airtable": ("airtable",),
+    "procesamiento": ("procesando mensaje", "ids que voy a procesar", "delta inbox"),
+    "email": ("email",),
+    "email_relevante": ("sendleademail", "email de lead enviado", "error enviando email", "email_from", "email_to"),
+    "envio_ok": ("email de lead enviado", "exitosamente"),
+}
+
+SEVERIDADES_GRAVES = frozenset(("ERROR", "CRITICAL", "ALERT", "EMERGENCY"))
+
+
+class Clasificador:
+    """Asigna a cada entrada el conjunto de etiquetas cuyas palabras clave aparecen en su texto"""
+
+    def __init__(self, categorias=CATEGORIAS):
+        etiquetas_por_clave = {}
+        for etiqueta, claves in categorias.items():
+            for clave in claves:
+                etiquetas_por_clave.setdefault(clave.lower(), set()).add(etiqueta)
+        # La alternancia devuelve la clave más larga en cada posición, así que una
+        # clave hereda las etiquetas de las claves que contiene ("error enviando email"
+        # también es "error" y "email").
+        self._etiquetas = {
+            clave: frozenset().union(*(tags for otra, tags in etiquetas_por_clave.items() if otra in clave))
+            for clave in etiquetas_por_clave
+        }
+        claves = sorted(self._etiquetas, key=len, reverse=True)
+        self._patron = re.compile("|".join(re.escape(clave) for clave in claves))
+        self._cache = {}
+
+    def etiquetas_texto(self, texto):
+        """Etiquetas de un texto ya normalizado a minúsculas"""
+        encontradas = {m.group() for m in self._patron.finditer(texto)}
+        if not encontradas:
+            return frozenset()
+        clave = frozenset(encontradas)
+        etiquetas = self._cache.get(clave)
+        if etiquetas is None:
+            etiquetas = self._cache[clave] = frozenset().union(*(self._etiquetas[c] for c in encontradas))
+        return etiquetas
+
+    def clasificar(self, entrada, texto=None):
+        """Devuelve las etiquetas de la entrada, incluidas las derivadas de la severidad"""
+        if texto is None:
+            texto = texto_entrada(entrada)
+        etiquetas = self.etiquetas_texto(texto.lower())
+        severity = entrada.get("severity")
+        if severity in SEVERIDADES_GRAVES:
+            etiquetas = etiquetas | {"grave"}
+        elif severity == "WARNING":
+            etiquetas = etiquetas | {"advertencia"}
+        return etiquetas
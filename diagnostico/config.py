@@ -0,0 +1,16 @@
+"""Configuración común de los scripts de diagnóstico"""
+import os
+
+PROJECT = "check-in-sf"
+SERVICE = "mfs-lead-generation-ai"
+REGION = "us-central1"
+
+# Raíz del repositorio (carpeta que contiene este paquete)
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Directorio de salida de los scripts automáticos (status.json, caché de logs...)
+LOGS_DIR = os.path.join(REPO_PATH, "auto_logs")
+CACHE_DIR = os.path.join(LOGS_DIR, "cache")
+
+# Proyectos, servicios y regiones a diagnosticar (ver diagnostico/objetivos.py)
+OBJETIVOS_PATH = os.path.join(REPO_PATH, "diagnostico_objetivos.json")
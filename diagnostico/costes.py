@@ -0,0 +1,295 @@
+"""Gasto en Vertex reconstruido a partir de los logs y proyección del Cost Guard
+
+El servicio no registra los caracteres de cada llamada, así que el coste
+se estima como lo hace services/cost-guard.js (caracteres / 1M × precio de
+MODEL_PRICING en config.js) con el prompt real medido en config.js y el body
+truncado que usa vertex.js. Se extrae de
+
+    [mfs] Llamando a Vertex con modelo: <modelo> fallbacks: [...]   una llamada
+    [classify] ⚠️ LOW POWER MODE ACTIVATED                           la siguiente es de bajo consumo
+    Generando resumen del body con Gemini usando modelo: <modelo>   la siguiente es un resumen
+    Resumen del body generado: { originalLength, summaryLength }    coste exacto del resumen
+    [classify] ⚡ Verificación rápida detectó Discard               clasificación sin llamada
+    🚨 TIER 1|2 TRIGGERED: $x > límite                              contador real del Cost Guard
+    🛑 SKIP: Cost Guard limit exceeded ($x USD)                     contador real del Cost Guard
+    Resetting Cost Guard Counter for new hour / New Day detected    cambios de hora y de día
+    Airtable: ✓ Registro creado exitosamente / Lead creado en Salesforce
+
+Los importes de los TIER TRIGGERED y de los SKIP sirven de anclas: la razón
+entre el contador real y la estimación en ese instante calibra el resto.
+Las horas son UTC, como la clave horaria del Cost Guard.
+"""
+import os
+import re
+from collections import OrderedDict, deque
+from datetime import timedelta
+
+from diagnostico.config import REPO_PATH
+from diagnostico.logs import parsear_timestamp
+from diagnostico.motor import Analizador
+
+# Valores por defecto de config.js, por si no se puede leer
+PRECIOS = {"default": {"input": 0.10, "output": 0.40}}
+LIMITES = {"tier1": 2.00, "tier2": 8.00}
+MODELO = "gemini-2.5-flash"
+
+# Caracteres por llamada (vertex.js trunca el body a 4000 en la clasificación y a 1000 en bajo consumo)
+CHARS_PROMPT = {"clasificacion": 2000, "bajo_consumo": 400, "resumen": 400}
+CHARS_BODY = {"clasificacion": 4000, "bajo_consumo": 1000, "resumen": 4000}
+CHARS_SALIDA = 500
+VENTANA_VELOCIDAD = timedelta(minutes=15)
+
+_PRECIO = re.compile(r'"([\w.\-]+)":\s*\{\s*input:\s*([\d.]+),\s*output:\s*([\d.]+)\s*\}')
+_LIMITE = re.compile(r"COST_GUARD_TIER([12])_LIMIT\s*\|\|\s*\"([\d.]+)\"")
+_MODELO_INTENT = re.compile(r"VERTEX_INTENT_MODEL\s*\|\|\s*\"([^\"]+)\"")
+
+_LLAMADA = re.compile(r"Llamando a Vertex con modelo:\s*(\S+)")
+_BAJO_CONSUMO = re.compile(r"LOW POWER MODE ACTIVATED")
+_GENERANDO_RESUMEN = re.compile(r"Generando resumen del body con Gemini")
+_RESUMEN = re.compile(r"Resumen del body generado[\s\S]*?originalLength:\s*(\d+)[\s\S]*?summaryLength:\s*(\d+)")
+_DESCARTE = re.compile(r"Verificaci.n r.pida detect. Discard")
+_CLASIFICACION = re.compile(r"Resultado final de clasificaci.n")
+_TIER = re.compile(r"TIER ([12]) TRIGGERED: \$([\d.]+) > ([\d.]+)")
+_SKIP = re.compile(r"SKIP: Cost Guard limit exceeded \(\$([\d.]+) USD\)")
+_NUEVA_HORA = re.compile(r"Resetting Cost Guard Counter for new hour:\s*(\S+)")
+_NUEVO_DIA = re.compile(r"New Day detected:\s*([\d-]+)")
+_AIRTABLE = re.compile(r"Airtable: ✓ Registro creado exitosamente")
+_SALESFORCE = re.compile(r"Lead creado en Salesforce")
+_MARCAS = re.compile(r"Vertex|LOW POWER|[Rr]esumen del body|Discard|clasificaci|TIER|Cost Guard|New Day|Registro creado|Lead creado")
+
+
+def leer_config_js(ruta=None):
+    """Precios por modelo, límites de los tiers y modelo de clasificación por defecto de config.js"""
+    ruta = ruta or os.path.join(REPO_PATH, "config.js")
+    precios = dict(PRECIOS)
+    limites = dict(LIMITES)
+    modelo = MODELO
+    prompts = {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            fuente = f.read()
+    except OSError:
+        return precios, limites, modelo, prompts
+    for nombre, entrada, salida in _PRECIO.findall(fuente):
+        precios[nombre] = {"input": float(entrada), "output": float(salida)}
+    for tier, valor in _LIMITE.findall(fuente):
+        limites[f"tier{tier}"] = float(valor)
+    coincidencia = _MODELO_INTENT.search(fuente)
+    if coincidencia:
+        modelo = coincidencia.group(1)
+    for clave, nombre in (("clasificacion", "INTENT_PROMPT"), ("bajo_consumo", "INTENT_PROMPT_LOW_POWER")):
+        coincidencia = re.search(rf"export const {nombre} = `([\s\S]*?)`", fuente)
+        if coincidencia:
+            prompts[clave] = len(coincidencia.group(1).strip())
+    return precios, limites, modelo, prompts
+
+
+def coste_llamada(precios, modelo, chars_entrada, chars_salida):
+    """Mismo cálculo que cost-guard.js: caracteres / 1M × precio por millón"""
+    precio = precios.get(modelo) or precios["default"]
+    return chars_entrada / 1e6 * precio["input"] + chars_salida / 1e6 * precio["output"]
+
+
+def _contadores():
+    return {"clasificacion": 0, "bajo_consumo": 0, "resumen": 0, "descartes_rapidos": 0, "clasificaciones": 0,
+            "coste": 0.0, "skips": 0, "leads_airtable": 0, "leads_salesforce": 0,
+            "contador_guard": None, "tier1": None, "tier2": None}
+
+
+class CostGuardAnalizador(Analizador):
+    """Gasto estimado por hora y día, anclado a los importes que registra el Cost Guard"""
+
+    nombre = "costes"
+
+    def __init__(self, max_muestras=10, desde=None, precios=None, limites=None, modelo=None,
+                 chars_body=None, chars_salida=CHARS_SALIDA, ventana=VENTANA_VELOCIDAD, config_js=None):
+        super().__init__(max_muestras, desde)
+        leidos_precios, leidos_limites, leido_modelo, prompts = leer_config_js(config_js)
+        self.precios = precios or leidos_precios
+        self.limites = {**leidos_limites, **(limites or {})}
+        self.modelo = modelo or leido_modelo
+        self.chars_entrada = {
+            tipo: prompts.get(tipo, CHARS_PROMPT[tipo]) + (chars_body or {}).get(tipo, CHARS_BODY[tipo])
+            for tipo in CHARS_PROMPT
+        }
+        self.chars_salida = chars_salida
+        self.ventana = ventana
+        self.por_hora = OrderedDict()
+        self.por_modelo = {}
+        self.global_ = _contadores()
+        self.anclas = []
+        self.reinicios_hora = []
+        self.dias = []
+        self.pendiente = {}  # instanceId -> tipo de la próxima llamada ("resumen" | "bajo_consumo")
+        self.ultimo_resumen = {}  # instanceId -> (hora, modelo, coste estimado) del último resumen
+        self.recientes_coste = deque()  # (momento, coste) dentro de la ventana de velocidad
+        self.ultimo_momento = None
+
+    def coincide(self, entrada, texto, etiquetas):
+        return _MARCAS.search(texto) is not None
+
+    def _hora(self, momento):
+        clave = momento.strftime("%Y-%m-%dT%H")
+        if clave not in self.por_hora:
+            self.por_hora[clave] = _contadores()
+        return self.por_hora[clave]
+
+    def _sumar(self, hora, campo, valor=1):
+        hora[campo] += valor
+        self.global_[campo] += valor
+
+    def _gastar(self, hora, modelo, momento, coste):
+        self._sumar(hora, "coste", coste)
+        self.por_modelo[modelo] = self.por_modelo.get(modelo, 0.0) + coste
+        self.recientes_coste.append((momento, coste))
+
+    def acumular(self, entrada, texto, etiquetas):
+        instancia = entrada.get("labels", {}).get("instanceId", "")
+        momento = parsear_timestamp(entrada["timestamp"])
+        self.ultimo_momento = momento
+        hora = self._hora(momento)
+
+        if _GENERANDO_RESUMEN.search(texto):
+            self.pendiente[instancia] = "resumen"
+            return
+        if _BAJO_CONSUMO.search(texto):
+            self.pendiente[instancia] = "bajo_consumo"
+            return
+        coincidencia = _LLAMADA.search(texto)
+        if coincidencia:
+            modelo = coincidencia.group(1)
+            tipo = self.pendiente.pop(instancia, "clasificacion")
+            coste = coste_llamada(self.precios, modelo, self.chars_entrada[tipo], self.chars_salida)
+            self._sumar(hora, tipo)
+            self._gastar(hora, modelo, momento, coste)
+            if tipo == "resumen":
+                self.ultimo_resumen[instancia] = (hora, modelo, coste)
+            return
+        coincidencia = _RESUMEN.search(texto)
+        if coincidencia:
+            anterior = self.ultimo_resumen.pop(instancia, None)
+            if anterior:
+                # Sustituye la estimación por los caracteres reales del resumen
+                hora_resumen, modelo, estimado = anterior
+                real = coste_llamada(self.precios, modelo, int(coincidencia.group(1)) + CHARS_PROMPT["resumen"],
+                                     int(coincidencia.group(2)))
+                self._gastar(hora_resumen, modelo, momento, real - estimado)
+            return
+        if _DESCARTE.search(texto):
+            self._sumar(hora, "descartes_rapidos")
+            return
+        if _CLASIFICACION.search(texto):
+            self._sumar(hora, "clasificaciones")
+            return
+        coincidencia = _TIER.search(texto)
+        if coincidencia:
+            tier = f"tier{coincidencia.group(1)}"
+            valor = float(coincidencia.group(2))
+            hora[tier] = hora[tier] or momento.isoformat()
+            self._anclar(hora, momento, valor, tier, float(coincidencia.group(3)))
+            return
+        coincidencia = _SKIP.search(texto)
+        if coincidencia:
+            self._sumar(hora, "skips")
+            self._anclar(hora, momento, float(coincidencia.group(1)), "skip")
+            return
+        coincidencia = _NUEVA_HORA.search(texto)
+        if coincidencia:
+            self.reinicios_hora.append({"momento": momento.isoformat(), "hora": coincidencia.group(1)})
+            return
+        coincidencia = _NUEVO_DIA.search(texto)
+        if coincidencia:
+            self.dias.append({"momento": momento.isoformat(), "dia": coincidencia.group(1)})
+            return
+        if _AIRTABLE.search(texto):
+            self._sumar(hora, "leads_airtable")
+        elif _SALESFORCE.search(texto):
+            self._sumar(hora, "leads_salesforce")
+
+    def _anclar(self, hora, momento, valor, origen, limite=None):
+        hora["contador_guard"] = max(hora["contador_guard"] or 0.0, valor)
+        self.anclas.append({
+            "momento": momento.isoformat(),
+            "origen": origen,
+            "contador": valor,
+            "limite": limite,
+            "estimado": hora["coste"],
+        })
+
+    def calibracion(self):
+        """Media de contador real / estimado en las anclas (None si no hay anclas útiles)"""
+        razones = [a["contador"] / a["estimado"] for a in self.anclas if a["estimado"] > 0]
+        return sum(razones) / len(razones) if razones else None
+
+    def velocidad(self):
+        """Dólares por minuto estimados en la ventana que acaba en el último log"""
+        if self.ultimo_momento is None:
+            return 0.0
+        limite = self.ultimo_momento - self.ventana
+        while self.recientes_coste and self.recientes_coste[0][0] < limite:
+            self.recientes_coste.popleft()
+        return sum(coste for _, coste in self.recientes_coste) / (self.ventana.total_seconds() / 60)
+
+    def proyeccion(self, factor=None):
+        """Gasto previsto al final de la hora en curso y minuto en que se alcanzaría cada tier"""
+        if self.ultimo_momento is None:
+            return None
+        factor = factor or 1.0
+        hora = self._hora(self.ultimo_momento)
+        gastado = max(hora["coste"] * factor, hora["contador_guard"] or 0.0)
+        velocidad = self.velocidad() * factor
+        transcurrido = self.ultimo_momento.minute + self.ultimo_momento.second / 60
+        restante = 60 - transcurrido
+        tiers = {}
+        for tier, limite in self.limites.items():
+            if gastado >= limite:
+                tiers[tier] = {"limite": limite, "estado": "superado", "minuto": None}
+            elif velocidad > 0 and gastado + velocidad * restante >= limite:
+                minuto = transcurrido + (limite - gastado) / velocidad
+                tiers[tier] = {"limite": limite, "estado": "se alcanzará", "minuto": round(minuto, 1)}
+            else:
+                tiers[tier] = {"limite": limite, "estado": "no se alcanza esta hora", "minuto": None}
+        return {
+            "hora": self.ultimo_momento.strftime("%Y-%m-%dT%H"),
+            "gastado": gastado,
+            "velocidad_por_minuto": velocidad,
+            "previsto_fin_hora": gastado + velocidad * restante,
+            "tiers": tiers,
+        }
+
+    def capacidad(self, factor=None):
+        """Clasificaciones por hora que caben en cada tier al coste estimado por llamada"""
+        coste = coste_llamada(self.precios, self.modelo, self.chars_entrada["clasificacion"], self.chars_salida)
+        coste *= factor or 1.0
+        return {tier: int(limite / coste) for tier, limite in self.limites.items()}
+
+    def resumen(self):
+        factor = self.calibracion()
+        por_dia = OrderedDict()
+        for clave, hora in self.por_hora.items():
+            dia = por_dia.setdefault(clave[:10], {"coste": 0.0, "llamadas": 0, "leads_airtable": 0, "horas_tier1": 0,
+                                                  "horas_tier2": 0})
+            dia["coste"] += hora["coste"]
+            dia["llamadas"] += hora["clasificacion"] + hora["bajo_consumo"] + hora["resumen"]
+            dia["leads_airtable"] += hora["leads_airtable"]
+            dia["horas_tier1"] += hora["tier1"] is not None
+            dia["horas_tier2"] += hora["tier2"] is not None
+        g = self.global_
+        return {
+            **super().resumen(),
+            "precios": self.precios,
+            "limites": self.limites,
+            "chars_entrada": self.chars_entrada,
+            "global": dict(g),
+            "por_modelo": dict(self.por_modelo),
+            "por_hora": {clave: dict(hora) for clave, hora in self.por_hora.items()},
+            "por_dia": por_dia,
+            "anclas": list(self.anclas),
+            "reinicios_hora": list(self.reinicios_hora),
+            "dias": list(self.dias),
+            "calibracion": factor,
+            "coste_por_lead": g["coste"] / g["leads_airtable"] if g["leads_airtable"] else None,
+            "coste_por_lead_salesforce": g["coste"] / g["leads_salesforce"] if g["leads_salesforce"] else None,
+            "proyeccion": self.proyeccion(factor),
+            "capacidad": self.capacidad(factor),
+        }
@@ -0,0 +1,427 @@
+"""Demonio local de diagnóstico: clientes de las APIs de Google siempre calientes
+
+Cada sonda `gcloud ...` arranca un intérprete, carga credenciales y abre
+una conexión TLS nueva; eso son segundos por consulta. El demonio
+(demonio_diagnostico.py) mantiene en un proceso de larga duración:
+
+    Cloud Logging       los clientes de obtener_cliente() por proyecto
+    Cloud Run / Build / Pub/Sub
+                        una AuthorizedSession de google-auth (requests con
+                        pool de conexiones y token renovado automáticamente)
+
+y los sirve por HTTP en 127.0.0.1:8765:
+
+    GET /salud                                          estado y peticiones atendidas
+    GET /run/servicio?project=&region=&service=         = gcloud run services describe
+    GET /run/revisiones?project=&region=&service=&limit= = gcloud run revisions list
+    GET /builds?project=&limit=&ongoing=1               = gcloud builds list
+    GET /builds/triggers?project=                       = gcloud builds triggers list
+    GET /pubsub/suscripciones?project=                  = gcloud pubsub subscriptions list
+    GET /logs?filtro=&project=&freshness=&desde=&hasta=&orden=&max=&pagina=
+                                                        entradas en NDJSON, en streaming
+
+Las respuestas tienen la misma forma que `--format=json` de gcloud. Los
+scripts no cambian: `iterar_entradas` y `ejecutar_comando` preguntan
+primero al demonio si está en marcha y, si no lo está o la consulta falla
+(en los logs, antes de la primera entrada), siguen como antes (cliente
+propio o proceso gcloud). MFS_DIAG_DEMONIO=0 lo desactiva y
+MFS_DIAG_DEMONIO=host:puerto cambia la dirección.
+
+Las consultas se hacen con las credenciales (ADC) de quien lo arranca, así
+que solo escucha en una dirección de loopback salvo que MFS_DIAG_TOKEN
+tenga un secreto compartido. Con MFS_DIAG_TOKEN, el demonio exige en cada
+petición la cabecera `Authorization: Bearer <token>` y los scripts la
+envían leyéndola de la misma variable.
+"""
+import hmac
+import ipaddress
+import json
+import os
+import shlex
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from diagnostico.config import PROJECT, REGION, SERVICE
+from diagnostico.logs import TAM_PAGINA, formatear_timestamp, iterar_entradas, obtener_cliente, parsear_timestamp
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+TIMEOUT_CONEXION = 0.2
+TIMEOUT = 60
+
+_AMBITO = "https://www.googleapis.com/auth/cloud-platform"
+_VARIABLE_TOKEN = "MFS_DIAG_TOKEN"
+_EN_DEMONIO = False
+
+
+def direccion():
+    """(host, puerto) del demonio, o None si está desactivado con MFS_DIAG_DEMONIO=0"""
+    valor = os.environ.get("MFS_DIAG_DEMONIO", "").strip()
+    if valor.lower() in ("0", "no", "false"):
+        return None
+    if not valor:
+        return HOST, PUERTO
+    host, _, puerto = valor.rpartition(":")
+    return host or HOST, int(puerto)
+
+
+def token():
+    """Secreto compartido entre el demonio y los scripts (MFS_DIAG_TOKEN), o None"""
+    return os.environ.get(_VARIABLE_TOKEN, "").strip() or None
+
+
+def es_local(host):
+    """Indica si `host` solo es accesible desde esta máquina (127.0.0.0/8, ::1, localhost)"""
+    try:
+        return all(ipaddress.ip_address(info[4][0].split("%")[0]).is_loopback
+                   for info in socket.getaddrinfo(host, None))
+    except (OSError, ValueError):
+        return False
+
+
+# --- Servidor ---------------------------------------------------------------------------------------------------
+
+
+class Recursos:
+    """Clientes compartidos por todas las peticiones del demonio"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sesion = None
+
+    def sesion(self):
+        with self._lock:
+            if self._sesion is None:
+                import google.auth
+                from google.auth.transport.requests import AuthorizedSession
+
+                credenciales, _ = google.auth.default(scopes=[_AMBITO])
+                self._sesion = AuthorizedSession(credenciales)
+            return self._sesion
+
+    def _get(self, url, params=None):
+        respuesta = self.sesion().get(url, params=params, timeout=TIMEOUT)
+        if respuesta.status_code >= 400:
+            raise RuntimeError(f"{respuesta.status_code} {respuesta.reason}: {respuesta.text[:500]}")
+        return respuesta.json()
+
+    def _listar(self, url, clave, params=None, limite=None):
+        """Recorre las páginas de un list de la API REST hasta `limite` elementos"""
+        params = dict(params or {})
+        elementos = []
+        while True:
+            datos = self._get(url, params)
+            elementos.extend(datos.get(clave, []))
+            token = datos.get("nextPageToken") or datos.get("metadata", {}).get("continue")
+            if not token or (limite and len(elementos) >= limite):
+                return elementos[:limite] if limite else elementos
+            params["pageToken" if "nextPageToken" in datos else "continue"] = token
+
+    def servicio(self, project, region, service):
+        return self._get(f"https://{region}-run.googleapis.com/apis/serving.knative.dev/v1/"
+                         f"namespaces/{project}/services/{service}")
+
+    def revisiones(self, project, region, service, limite=None):
+        revisiones = self._listar(
+            f"https://{region}-run.googleapis.com/apis/serving.knative.dev/v1/namespaces/{project}/revisions",
+            "items", {"labelSelector": f"serving.knative.dev/service={service}"},
+        )
+        # gcloud las muestra de la más reciente a la más antigua
+        revisiones.sort(key=lambda r: r.get("metadata", {}).get("creationTimestamp", ""), reverse=True)
+        return revisiones[:limite] if limite else revisiones
+
+    def builds(self, project, limite=None, en_curso=False):
+        params = {"pageSize": min(limite or 50, 50)}
+        if en_curso:
+            params["filter"] = 'status="WORKING" OR status="QUEUED"'
+        return self._listar(f"https://cloudbuild.googleapis.com/v1/projects/{project}/builds", "builds", params,
+                            limite)
+
+    def triggers(self, project):
+        return self._listar(f"https://cloudbuild.googleapis.com/v1/projects/{project}/triggers", "triggers")
+
+    def suscripciones(self, project):
+        return self._listar(f"https://pubsub.googleapis.com/v1/projects/{project}/subscriptions", "subscriptions")
+
+
+def _entero(valor):
+    return int(valor) if valor not in (None, "") else None
+
+
+def _momento(valor):
+    return parsear_timestamp(valor) if valor else None
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    server_version = "mfs-diagnostico"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        if self.server.detallado:
+            super().log_message(formato, *args)
+
+    def _json(self, codigo, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _logs(self, p):
+        entradas = iterar_entradas(
+            p.get("filtro") or None,
+            project=p.get("project", PROJECT),
+            freshness=p.get("freshness") or None,
+            desde=_momento(p.get("desde")),
+            hasta=_momento(p.get("hasta")),
+            orden=p.get("orden", "asc"),
+            max_entradas=_entero(p.get("max")),
+            tam_pagina=_entero(p.get("pagina")) or TAM_PAGINA,
+            client=obtener_cliente(p.get("project", PROJECT)),
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        total = 0
+        try:
+            for entrada in entradas:
+                self.wfile.write(json.dumps(entrada, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+                total += 1
+            final = {"_fin": {"total": total}}
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except Exception as e:
+            # La cabecera ya salió: el error viaja como última línea del flujo
+            final = {"_error": str(e)}
+        self.wfile.write(json.dumps(final).encode("utf-8") + b"\n")
+
+    def _autorizado(self):
+        if self.server.token is None:
+            return True
+        cabecera = self.headers.get("Authorization", "")
+        return hmac.compare_digest(cabecera.encode("utf-8"), f"Bearer {self.server.token}".encode("utf-8"))
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if not self._autorizado():
+            self._json(401, {"error": f"Falta la cabecera Authorization con el token de {_VARIABLE_TOKEN}"})
+            return
+        p = dict(urllib.parse.parse_qsl(url.query))
+        recursos = self.server.recursos
+        project = p.get("project", PROJECT)
+        region = p.get("region", REGION)
+        service = p.get("service", SERVICE)
+        rutas = {
+            "/run/servicio": lambda: recursos.servicio(project, region, service),
+            "/run/revisiones": lambda: recursos.revisiones(project, region, service, _entero(p.get("limit"))),
+            "/builds": lambda: recursos.builds(project, _entero(p.get("limit")), p.get("ongoing") == "1"),
+            "/builds/triggers": lambda: recursos.triggers(project),
+            "/pubsub/suscripciones": lambda: recursos.suscripciones(project),
+        }
+        inicio = time.monotonic()
+        self.server.contar(url.path)
+        try:
+            if url.path == "/salud":
+                self._json(200, self.server.salud())
+            elif url.path == "/logs":
+                self._logs(p)
+            elif url.path in rutas:
+                self._json(200, rutas[url.path]())
+            else:
+                self._json(404, {"error": f"Ruta desconocida: {url.path}"})
+        except ImportError as e:
+            self._json(501, {"error": f"Falta una dependencia en el demonio: {e}"})
+        except Exception as e:
+            self._json(502, {"error": str(e)})
+        finally:
+            self.server.medir(url.path, time.monotonic() - inicio)
+
+
+class ServidorDiagnostico(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host=HOST, puerto=PUERTO, detallado=False, token=None):
+        super().__init__((host, puerto), _Manejador)
+        self.token = token
+        self.recursos = Recursos()
+        self.detallado = detallado
+        self.inicio = datetime.now(timezone.utc)
+        self._lock = threading.Lock()
+        self.rutas = {}
+
+    def contar(self, ruta):
+        with self._lock:
+            self.rutas.setdefault(ruta, {"peticiones": 0, "segundos": 0.0})["peticiones"] += 1
+
+    def medir(self, ruta, segundos):
+        with self._lock:
+            self.rutas[ruta]["segundos"] += segundos
+
+    def salud(self):
+        with self._lock:
+            rutas = {ruta: dict(medida) for ruta, medida in self.rutas.items()}
+        return {"ok": True, "pid": os.getpid(), "inicio": formatear_timestamp(self.inicio), "rutas": rutas}
+
+
+def comprobar_host(host):
+    """Lanza ValueError si `host` no es de loopback y no hay MFS_DIAG_TOKEN"""
+    if token() is None and not es_local(host):
+        raise ValueError(f"{host} no es una dirección local: para escuchar en ella define {_VARIABLE_TOKEN} "
+                         "con un secreto compartido")
+
+
+def servir(host=HOST, puerto=PUERTO, detallado=False):
+    """Arranca el demonio en primer plano (Ctrl+C para pararlo)
+
+    Sin MFS_DIAG_TOKEN solo en loopback (ver `comprobar_host`): cualquiera
+    en la red podría consultar con las credenciales del usuario.
+    """
+    global _EN_DEMONIO
+    comprobar_host(host)
+    _EN_DEMONIO = True
+    servidor = ServidorDiagnostico(host, puerto, detallado, token())
+    try:
+        servidor.serve_forever()
+    finally:
+        servidor.server_close()
+
+
+# --- Cliente ----------------------------------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=1)
+def disponible():
+    """Indica si hay un demonio escuchando (se comprueba una vez por proceso)"""
+    destino = direccion()
+    if destino is None or _EN_DEMONIO:
+        return False
+    try:
+        with socket.create_connection(destino, timeout=TIMEOUT_CONEXION):
+            pass
+    except OSError:
+        return False
+    try:
+        return bool(consultar("/salud", timeout=2).get("ok"))
+    except (OSError, ValueError, RuntimeError):
+        return False
+
+
+def _url(ruta, params=None):
+    host, puerto = direccion()
+    consulta = urllib.parse.urlencode({k: v for k, v in (params or {}).items() if v not in (None, "", False)})
+    return f"http://{host}:{puerto}{ruta}" + (f"?{consulta}" if consulta else "")
+
+
+def _peticion(ruta, params=None):
+    secreto = token()
+    cabeceras = {"Authorization": f"Bearer {secreto}"} if secreto else {}
+    return urllib.request.Request(_url(ruta, params), headers=cabeceras)
+
+
+def consultar(ruta, timeout=TIMEOUT, **params):
+    """GET al demonio; lanza RuntimeError con el mensaje del demonio si la consulta falla"""
+    try:
+        with urllib.request.urlopen(_peticion(ruta, params), timeout=timeout) as respuesta:
+            return json.load(respuesta)
+    except urllib.error.HTTPError as e:
+        try:
+            mensaje = json.load(e).get("error", str(e))
+        except ValueError:
+            mensaje = str(e)
+        raise RuntimeError(mensaje) from None
+
+
+def entradas(filtro=None, project=PROJECT, freshness=None, desde=None, hasta=None, orden="asc", max_entradas=None,
+             tam_pagina=None):
+    """Mismas entradas que `iterar_entradas`, leídas del demonio línea a línea
+
+    Lanza RuntimeError si el demonio devuelve un error o corta el flujo.
+    """
+    params = {
+        "filtro": filtro,
+        "project": project,
+        "freshness": freshness,
+        "desde": formatear_timestamp(desde) if desde is not None else None,
+        "hasta": formatear_timestamp(hasta) if hasta is not None else None,
+        "orden": orden,
+        "max": max_entradas,
+        "pagina": tam_pagina,
+    }
+    with urllib.request.urlopen(_peticion("/logs", params), timeout=TIMEOUT) as respuesta:
+        for linea in respuesta:
+            registro = json.loads(linea)
+            if "_fin" in registro:
+                return
+            if "_error" in registro:
+                raise RuntimeError(registro["_error"])
+            yield registro
+    raise RuntimeError("El demonio cortó el flujo de logs antes de terminar")
+
+
+def _opciones(argumentos):
+    """['--region=us-central1', '--ongoing'] -> {'region': 'us-central1', 'ongoing': True}"""
+    opciones = {}
+    posicionales = []
+    for argumento in argumentos:
+        if argumento.startswith("--"):
+            clave, _, valor = argumento[2:].partition("=")
+            opciones[clave] = valor or True
+        else:
+            posicionales.append(argumento)
+    return posicionales, opciones
+
+
+def traducir(cmd):
+    """Ruta y parámetros del demonio equivalentes a un comando gcloud, o None si no hay equivalente"""
+    partes = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+    if not partes or partes[0] != "gcloud":
+        return None
+    posicionales, o = _opciones(partes[1:])
+    # `gcloud config get-value project` no se traduce: el proyecto de la configuración de gcloud no es el de las
+    # credenciales del demonio. Del resto, solo si la salida pedida es JSON, que es lo que devuelve el demonio
+    if o.get("format") != "json":
+        return None
+    project = o.get("project", PROJECT)
+    if posicionales[:3] == ["run", "services", "describe"] and len(posicionales) == 4:
+        return "/run/servicio", {"project": project, "region": o.get("region", REGION), "service": posicionales[3]}
+    if posicionales == ["run", "revisions", "list"]:
+        return "/run/revisiones", {"project": project, "region": o.get("region", REGION),
+                                   "service": o.get("service", SERVICE), "limit": o.get("limit")}
+    if posicionales == ["builds", "list"]:
+        return "/builds", {"project": project, "limit": o.get("limit"), "ongoing": "1" if o.get("ongoing") else None}
+    if posicionales == ["builds", "triggers", "list"]:
+        return "/builds/triggers", {"project": project}
+    if posicionales == ["pubsub", "subscriptions", "list"]:
+        return "/pubsub/suscripciones", {"project": project}
+    return None
+
+
+def comando(cmd, timeout=TIMEOUT):
+    """Resultado con el formato de ejecutar_comando servido por el demonio, o None si hay que lanzar gcloud"""
+    traduccion = traducir(cmd)
+    if traduccion is None:
+        return None
+    ruta, params = traduccion
+    inicio = time.monotonic()
+    try:
+        datos = consultar(ruta, timeout=timeout, **params)
+    except (OSError, ValueError, RuntimeError):
+        return None
+    return {
+        "success": True,
+        "output": json.dumps(datos, indent=2, ensure_ascii=False),
+        "error": "",
+        "exitCode": 0,
+        "duration": round(time.monotonic() - inicio, 3),
+        "demonio": True,
+    }
@@ -0,0 +1,254 @@
+"""Eficiencia de las notificaciones de Pub/Sub: ejecuciones vacías frente a mensajes procesados
+
+Cada notificación de Gmail watch es una petición completa a /_pubsub (más
+las llamadas a history.list de las dos cuentas) aunque no haya nada que
+procesar. Este analizador reconstruye cada ejecución por instancia:
+
+    petición POST /_pubsub (httpRequest.latency)    coste de la ejecución
+    _pubsub: notificación recibida de Gmail          inicio de la ejecución
+    [history] Delta INBOX                            llamada a history.list
+    _pubsub: IDs que voy a procesar ahora (cuenta principal|SENDER): { count, usedFallback }
+
+y acumula por intervalo y por instancia notificaciones, ejecuciones
+vacías, ejecuciones con fallback y mensajes procesados. `simular_coalescencia`
+estima cuántas ejecuciones (y segundos de instancia) se habrían ahorrado
+agrupando las notificaciones en una ventana de debounce; el analizador la
+calcula sobre la marcha, con memoria acotada por las ejecuciones abiertas y
+las que aún pueden llegar desordenadas (como mucho DURACION_MAX segundos).
+"""
+import heapq
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from diagnostico.logs import parsear_timestamp
+from diagnostico.motor import Analizador
+
+INTERVALO = timedelta(hours=1)
+VENTANAS = (5, 15, 30, 60, 120, 300)
+# Margen entre el final de la petición y sus últimos logs
+MARGEN_PETICION = 1.0
+# Una ejecución sin nueva notificación en su instancia se da por terminada pasado este tiempo
+DURACION_MAX = 600.0
+
+_NOTIFICACION = re.compile(r"_pubsub: notificaci.n recibida")
+_IDS = re.compile(r"IDs que voy a procesar ahora(?: \(cuenta (principal|SENDER)\))?:[\s\S]*?count:\s*(\d+)"
+                  r"(?:[\s\S]*?usedFallback:\s*(true|false))?")
+_DELTA = re.compile(r"\[history\] Delta INBOX")
+_MARCAS = re.compile(r"_pubsub|Delta INBOX")
+
+
+def _segundos(latencia):
+    """'0.628331407s' -> 0.628"""
+    try:
+        return float(str(latencia).rstrip("s"))
+    except ValueError:
+        return None
+
+
+def _contadores():
+    return {"notificaciones": 0, "vacias": 0, "fallback": 0, "mensajes": 0, "llamadas_history": 0,
+            "segundos": 0.0, "segundos_vacias": 0.0, "con_latencia": 0, "vacias_con_latencia": 0}
+
+
+class _Ejecucion:
+    __slots__ = ("instancia", "momento", "latencia", "mensajes", "fallback", "llamadas_history")
+
+    def __init__(self, instancia, momento, latencia):
+        self.instancia = instancia
+        self.momento = momento
+        self.latencia = latencia
+        self.mensajes = 0
+        self.fallback = False
+        self.llamadas_history = 0
+
+
+class _Coalescencia:
+    """Simulación incremental de un debounce de `ventana` segundos
+
+    Recibe las notificaciones en orden cronológico: cada lote empieza con la
+    primera notificación pendiente y se ejecuta `ventana` segundos después
+    procesando todo lo llegado hasta entonces.
+    """
+
+    __slots__ = ("ventana", "fin", "mensajes", "ejecuciones", "vacias", "espera", "reales", "vacias_reales")
+
+    def __init__(self, ventana):
+        self.ventana = ventana
+        self.fin = None  # momento de ejecución del lote abierto
+        self.mensajes = 0
+        self.ejecuciones = 0
+        self.vacias = 0
+        self.espera = 0.0
+        self.reales = 0
+        self.vacias_reales = 0
+
+    def anadir(self, momento, mensajes):
+        if self.fin is None or momento > self.fin:
+            if self.fin is not None:
+                self.ejecuciones += 1
+                self.vacias += self.mensajes == 0
+            self.fin = momento + self.ventana
+            self.mensajes = 0
+        self.mensajes += mensajes
+        self.espera += self.fin - momento
+        self.reales += 1
+        self.vacias_reales += not mensajes
+
+    def resultado(self, coste_base=None):
+        ejecuciones, vacias = self.ejecuciones, self.vacias
+        if self.fin is not None:
+            ejecuciones += 1
+            vacias += self.mensajes == 0
+        reales = self.reales
+        ahorradas = reales - ejecuciones
+        return {
+            "ventana": self.ventana,
+            "ejecuciones": ejecuciones,
+            "vacias": vacias,
+            "ahorradas": ahorradas,
+            "ahorro": ahorradas / reales if reales else 0.0,
+            "vacias_evitadas": self.vacias_reales - vacias,
+            "segundos_ahorrados": ahorradas * coste_base if coste_base is not None else None,
+            "espera_media": self.espera / reales if reales else 0.0,
+        }
+
+
+class EficienciaPubSubAnalizador(Analizador):
+    """Notificaciones, ejecuciones vacías y mensajes procesados por intervalo e instancia"""
+
+    nombre = "eficiencia_pubsub"
+
+    def __init__(self, max_muestras=10, desde=None, intervalo=INTERVALO, ventanas=VENTANAS):
+        super().__init__(max_muestras, desde)
+        self.intervalo = intervalo
+        self.ventanas = ventanas
+        self.global_ = _contadores()
+        self.por_intervalo = OrderedDict()
+        self.por_instancia = {}
+        self.abiertas = {}  # instanceId -> _Ejecucion en curso
+        self.peticiones = {}  # instanceId -> (inicio, fin) de la última petición a /_pubsub
+        # (segundos epoch, mensajes) de las ejecuciones cerradas que aún pueden llegar desordenadas
+        self._pendientes = []
+        self.coalescencia = [_Coalescencia(ventana) for ventana in ventanas]
+
+    def coincide(self, entrada, texto, etiquetas):
+        if "httpRequest" in entrada:
+            return entrada["httpRequest"].get("requestUrl", "").endswith("/_pubsub")
+        return _MARCAS.search(texto) is not None
+
+    def _cerrar(self, instancia):
+        ejecucion = self.abiertas.pop(instancia, None)
+        if ejecucion is None:
+            return
+        segundos = self.intervalo.total_seconds()
+        clave = datetime.fromtimestamp(ejecucion.momento // segundos * segundos, timezone.utc).isoformat()
+        grupos = (
+            self.global_,
+            self.por_intervalo.setdefault(clave, _contadores()),
+            self.por_instancia.setdefault(instancia, _contadores()),
+        )
+        vacia = ejecucion.mensajes == 0
+        for contadores in grupos:
+            contadores["notificaciones"] += 1
+            contadores["vacias"] += vacia
+            contadores["fallback"] += ejecucion.fallback
+            contadores["mensajes"] += ejecucion.mensajes
+            contadores["llamadas_history"] += ejecucion.llamadas_history
+            if ejecucion.latencia is not None:
+                contadores["con_latencia"] += 1
+                contadores["segundos"] += ejecucion.latencia
+                if vacia:
+                    contadores["vacias_con_latencia"] += 1
+                    contadores["segundos_vacias"] += ejecucion.latencia
+        heapq.heappush(self._pendientes, (ejecucion.momento, ejecucion.mensajes))
+
+    def _simular(self, momento):
+        """Pasa a la simulación las ejecuciones cerradas que ya no pueden quedar por detrás de otra
+
+        Las abiertas con más de DURACION_MAX segundos se cierran; las que siguen
+        abiertas y las que aún no han empezado son posteriores al umbral.
+        """
+        for instancia, ejecucion in list(self.abiertas.items()):
+            if momento - ejecucion.momento > DURACION_MAX:
+                self._cerrar(instancia)
+        umbral = min((e.momento for e in self.abiertas.values()), default=momento)
+        while self._pendientes and self._pendientes[0][0] <= umbral:
+            inicio, mensajes = heapq.heappop(self._pendientes)
+            for simulacion in self.coalescencia:
+                simulacion.anadir(inicio, mensajes)
+
+    def acumular(self, entrada, texto, etiquetas):
+        instancia = entrada.get("labels", {}).get("instanceId", "")
+        momento = parsear_timestamp(entrada["timestamp"]).timestamp()
+
+        if "httpRequest" in entrada:
+            latencia = _segundos(entrada["httpRequest"].get("latency", ""))
+            if latencia is not None:
+                self.peticiones[instancia] = (momento, momento + latencia)
+            return
+        if _NOTIFICACION.search(texto):
+            self._cerrar(instancia)
+            self._simular(momento)
+            latencia = None
+            peticion = self.peticiones.pop(instancia, None)
+            if peticion and peticion[0] <= momento <= peticion[1] + MARGEN_PETICION:
+                latencia = peticion[1] - peticion[0]
+            self.abiertas[instancia] = _Ejecucion(instancia, momento, latencia)
+            return
+        ejecucion = self.abiertas.get(instancia)
+        if ejecucion is None:
+            return
+        if _DELTA.search(texto):
+            ejecucion.llamadas_history += 1
+            return
+        coincidencia = _IDS.search(texto)
+        if coincidencia:
+            ejecucion.mensajes += int(coincidencia.group(2))
+            ejecucion.fallback = ejecucion.fallback or coincidencia.group(3) == "true"
+
+    def cerrar_pendientes(self):
+        for instancia in list(self.abiertas):
+            self._cerrar(instancia)
+        self._simular(float("inf"))
+
+    def costes(self):
+        """Segundos de instancia fijos por ejecución y por mensaje procesado, estimados de las latencias"""
+        g = self.global_
+        if not g["con_latencia"]:
+            return None, None
+        # Coste base: media de las ejecuciones vacías (o de todas si no hubo ninguna vacía con latencia)
+        if g["vacias_con_latencia"]:
+            base = g["segundos_vacias"] / g["vacias_con_latencia"]
+        else:
+            base = g["segundos"] / g["con_latencia"]
+        resto = g["segundos"] - base * g["con_latencia"]
+        por_mensaje = max(resto, 0.0) / g["mensajes"] if g["mensajes"] else 0.0
+        return base, por_mensaje
+
+    def resumen(self):
+        self.cerrar_pendientes()
+        base, por_mensaje = self.costes()
+        return {
+            **super().resumen(),
+            "global": dict(self.global_),
+            "por_intervalo": {clave: dict(c) for clave, c in self.por_intervalo.items()},
+            "por_instancia": {clave: dict(c) for clave, c in self.por_instancia.items()},
+            "coste_base": base,
+            "coste_por_mensaje": por_mensaje,
+            "coalescencia": [simulacion.resultado(base) for simulacion in self.coalescencia],
+        }
+
+
+def simular_coalescencia(notificaciones, ventanas=VENTANAS, coste_base=None):
+    """Ejecuciones que habría con un debounce de `ventana` segundos
+
+    Cada lote empieza con la primera notificación pendiente y se ejecuta
+    `ventana` segundos después procesando todo lo llegado hasta entonces.
+    Devuelve, por ventana, ejecuciones, vacías, ahorro y espera media añadida.
+    """
+    simulaciones = [_Coalescencia(ventana) for ventana in ventanas]
+    for momento, mensajes in sorted(notificaciones):
+        for simulacion in simulaciones:
+            simulacion.anadir(momento, mensajes)
+    return [simulacion.resultado(coste_base) for simulacion in simulaciones]
@@ -0,0 +1,110 @@
+"""Reensamblado de los console.log multilínea en eventos lógicos
+
+Cloud Run parte cada console.log de Node que imprime un objeto en varias
+entradas (una por línea) separadas por microsegundos, p. ej.:
+
+    [mfs] [history] Delta INBOX: {
+      nuevosMensajes: 0,
+      notifHistoryId: '35638356'
+    }
+
+El ensamblador agrupa los fragmentos de una misma instancia (label
+instanceId) que llegan casi a la vez mientras las llaves/corchetes sigan
+abiertos, o que son líneas de continuación de un stack trace. Trabaja en
+streaming sobre entradas en orden cronológico y con memoria acotada.
+"""
+import re
+from collections import OrderedDict
+from datetime import timedelta
+
+from diagnostico.logs import SEVERIDADES, parsear_timestamp
+
+# Separación máxima entre fragmentos del mismo evento
+MAX_HUECO = timedelta(milliseconds=10)
+MAX_FRAGMENTOS = 500
+MAX_INSTANCIAS_ABIERTAS = 1000
+
+_CADENAS = re.compile(r"'(?:[^'\\\n]|\\.)*'|\"(?:[^\"\\\n]|\\.)*\"")
+_CONTINUACION = re.compile(r"^\s+at\s")
+
+
+def balance_llaves(texto):
+    """Llaves y corchetes abiertos menos cerrados, sin contar los que van dentro de cadenas"""
+    texto = _CADENAS.sub("", texto)
+    return texto.count("{") + texto.count("[") - texto.count("}") - texto.count("]")
+
+
+class _Evento:
+    __slots__ = ("entrada", "fragmentos", "balance", "ultimo", "severidad")
+
+    def __init__(self, entrada, texto, momento):
+        self.entrada = entrada
+        self.fragmentos = [texto]
+        self.balance = balance_llaves(texto)
+        self.ultimo = momento
+        self.severidad = entrada.get("severity", "DEFAULT")
+
+    def admite(self, texto, momento, hueco):
+        if momento - self.ultimo > hueco or len(self.fragmentos) >= MAX_FRAGMENTOS:
+            return False
+        return self.balance > 0 or bool(_CONTINUACION.match(texto))
+
+    def anadir(self, entrada, texto, momento):
+        self.fragmentos.append(texto)
+        self.balance += balance_llaves(texto)
+        self.ultimo = momento
+        severidad = entrada.get("severity", "DEFAULT")
+        if SEVERIDADES.get(severidad, 0) > SEVERIDADES.get(self.severidad, 0):
+            self.severidad = severidad
+
+    def entrada_final(self):
+        if len(self.fragmentos) == 1:
+            return self.entrada
+        entrada = dict(self.entrada)
+        entrada["textPayload"] = "\n".join(self.fragmentos)
+        entrada["_fragmentos"] = len(self.fragmentos)
+        if self.severidad != "DEFAULT":
+            entrada["severity"] = self.severidad
+        return entrada
+
+
+def ensamblar(entradas, max_hueco=None):
+    """Genera eventos lógicos a partir de entradas en orden cronológico
+
+    Las entradas sin textPayload (peticiones HTTP, jsonPayload) pasan tal cual.
+    Cada evento se emite en cuanto llega un fragmento de su instancia que no le
+    pertenece, o cuando el flujo avanza más allá de `max_hueco`; por eso el
+    orden de salida es cronológico por instancia y, entre instancias, como
+    mucho `max_hueco` desordenado.
+    """
+    hueco = max_hueco or MAX_HUECO
+    abiertos = OrderedDict()  # instanceId -> _Evento, ordenado por última actividad
+    for entrada in entradas:
+        texto = entrada.get("textPayload")
+        timestamp = entrada.get("timestamp")
+        if texto is None or not timestamp:
+            yield entrada
+            continue
+        momento = parsear_timestamp(timestamp)
+
+        # Emitir los eventos de instancias que ya no pueden recibir más fragmentos
+        while abiertos:
+            clave, evento = next(iter(abiertos.items()))
+            if momento - evento.ultimo <= hueco and len(abiertos) <= MAX_INSTANCIAS_ABIERTAS:
+                break
+            del abiertos[clave]
+            yield evento.entrada_final()
+
+        instancia = entrada.get("labels", {}).get("instanceId", "")
+        evento = abiertos.get(instancia)
+        if evento is not None and evento.admite(texto, momento, hueco):
+            evento.anadir(entrada, texto, momento)
+            abiertos.move_to_end(instancia)
+            continue
+        if evento is not None:
+            del abiertos[instancia]
+            yield evento.entrada_final()
+        abiertos[instancia] = _Evento(entrada, texto, momento)
+
+    for evento in abiertos.values():
+        yield evento.entrada_final()
@@ -0,0 +1,80 @@
+"""Utilidades estadísticas pequeñas para los analizadores (sin dependencias)"""
+import math
+
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) por rango más cercano sobre una lista ya ordenada"""
+    if not ordenados:
+        return None
+    rango = max(1, math.ceil(p / 100 * len(ordenados)))
+    return ordenados[rango - 1]
+
+
+def resumen_distribucion(valores, percentiles=(50, 95, 99)):
+    """n, media, percentiles y máximo de una serie de valores"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return {"n": 0}
+    resumen = {"n": len(ordenados), "media": sum(ordenados) / len(ordenados)}
+    for p in percentiles:
+        resumen[f"p{p}"] = percentil(ordenados, p)
+    resumen["max"] = ordenados[-1]
+    return resumen
+
+
+def _cola_normal(z):
+    """P(Z >= z) de una normal estándar"""
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def prueba_proporciones(exitos_a, n_a, exitos_b, n_b):
+    """Prueba z de dos proporciones; p unilateral de que la proporción de b sea mayor que la de a"""
+    if not n_a or not n_b:
+        return None
+    conjunta = (exitos_a + exitos_b) / (n_a + n_b)
+    varianza = conjunta * (1 - conjunta) * (1 / n_a + 1 / n_b)
+    if varianza <= 0:
+        return None
+    z = (exitos_b / n_b - exitos_a / n_a) / math.sqrt(varianza)
+    return {"z": z, "p": _cola_normal(z)}
+
+
+def prueba_tasas(eventos_a, exposicion_a, eventos_b, exposicion_b):
+    """Compara dos tasas de Poisson (eventos por unidad de exposición) condicionando al total
+
+    Con tasas iguales, los eventos de b siguen una binomial de parámetro
+    exposicion_b / (exposicion_a + exposicion_b); se usa la aproximación normal.
+    p unilateral de que la tasa de b sea mayor que la de a.
+    """
+    total = eventos_a + eventos_b
+    if not total or not exposicion_a or not exposicion_b:
+        return None
+    esperada = exposicion_b / (exposicion_a + exposicion_b)
+    varianza = total * esperada * (1 - esperada)
+    z = (eventos_b - total * esperada) / math.sqrt(varianza)
+    return {"z": z, "p": _cola_normal(z)}
+
+
+def prueba_mann_whitney(a, b):
+    """U de Mann-Whitney con aproximación normal (rangos medios en los empates)
+
+    p unilateral de que los valores de b tiendan a ser mayores que los de a.
+    """
+    n_a, n_b = len(a), len(b)
+    if not n_a or not n_b:
+        return None
+    valores = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    suma_rangos_b = 0.0
+    i = 0
+    while i < len(valores):
+        j = i
+        while j + 1 < len(valores) and valores[j + 1][0] == valores[i][0]:
+            j += 1
+        rango = (i + j) / 2 + 1
+        suma_rangos_b += rango * sum(1 for k in range(i, j + 1) if valores[k][1])
+        i = j + 1
+    u = suma_rangos_b - n_b * (n_b + 1) / 2
+    media = n_a * n_b / 2
+    desviacion = math.sqrt(n_a * n_b * (n_a + n_b + 1) / 12)
+    z = (u - media) / desviacion
+    return {"u": u, "z": z, "p": _cola_normal(z)}
@@ -0,0 +1,231 @@
+"""Construcción de filtros de Cloud Logging y plan de consultas por categoría
+
+Los filtros escritos a mano fallan por las comillas: una expresión regular
+sin comillas dobles (`textPayload=~mfs.*procesar`, lo que queda cuando el
+shell se come las comillas) da "Unparseable filter: regular expressions
+must begin and end with '"'". Aquí cada predicado sabe escribir su filtro
+con el valor escapado y, además, evaluarse sobre una entrada ya descargada:
+
+    Severidad("ERROR")                 severity>=ERROR
+    Texto("mfs.*procesar", regex=True) textPayload=~"mfs.*procesar" OR jsonPayload.message=~"mfs.*procesar"
+    Texto("Airtable")                  textPayload:"Airtable" OR jsonPayload.message:"Airtable"
+    Etiqueta("commit-sha", "abc")      labels."commit-sha"="abc"
+    Tiempo(desde, hasta)               timestamp>="…" AND timestamp<"…"
+    a & b, a | b                       (a) AND (b), (a) OR (b)
+
+`PlanConsultas` recibe varias categorías (sección -> predicado) y las
+resuelve con el menor número de descargas: si alguna no filtra nada, una
+sola consulta sin filtro extra; si no, un único OR de todas (partido solo
+si supera el tamaño máximo de filtro). Un OR nunca trae más entradas que
+las consultas por separado, porque las que cumplen varios predicados llegan
+una vez, y ahorra la ida y vuelta de cada consulta. Cada entrada descargada
+se asigna después a sus categorías evaluando los predicados en local.
+"""
+import re
+
+from diagnostico.clasificador import CATEGORIAS, SEVERIDADES_GRAVES
+from diagnostico.logs import SEVERIDADES, formatear_timestamp
+
+# Cloud Logging admite filtros de hasta 20000 caracteres; se deja margen para el del servicio y la ventana
+LARGO_MAX_FILTRO = 18000
+# Campos de texto de una entrada: los console.log y los logs estructurados (JSON con "message")
+CAMPOS_TEXTO = ("textPayload", "jsonPayload.message")
+
+_CAMPO_SIMPLE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def comillas(valor):
+    """Literal de cadena del lenguaje de filtros: entre comillas dobles y con \\ y " escapados"""
+    return '"' + str(valor).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def valor_campo(entrada, campo):
+    """Valor de un campo con puntos (jsonPayload.message) en una entrada descargada, o None"""
+    valor = entrada
+    for parte in campo.split("."):
+        if not isinstance(valor, dict):
+            return None
+        valor = valor.get(parte)
+    return valor
+
+
+def campo_etiqueta(clave, recurso=False):
+    """labels.instanceId, labels."commit-sha", resource.labels.revision_name..."""
+    prefijo = "resource.labels" if recurso else "labels"
+    return f"{prefijo}.{clave}" if _CAMPO_SIMPLE.fullmatch(clave) else f"{prefijo}.{comillas(clave)}"
+
+
+class Predicado:
+    """Condición que se puede enviar a Cloud Logging y comprobar sobre una entrada descargada"""
+
+    def filtro(self):
+        raise NotImplementedError
+
+    def coincide(self, entrada):
+        raise NotImplementedError
+
+    def __and__(self, otro):
+        return Y(self, otro)
+
+    def __or__(self, otro):
+        return O(self, otro)
+
+    def __str__(self):
+        return self.filtro()
+
+
+class Severidad(Predicado):
+    def __init__(self, minima, maxima=None):
+        for nivel in (minima, maxima):
+            if nivel is not None and nivel.upper() not in SEVERIDADES:
+                raise ValueError(f"Severidad no válida: {nivel!r} ({', '.join(SEVERIDADES)})")
+        self.minima = minima.upper()
+        self.maxima = maxima.upper() if maxima else None
+
+    def filtro(self):
+        if self.maxima == self.minima:
+            return f"severity={self.minima}"
+        filtro = f"severity>={self.minima}"
+        if self.maxima:
+            filtro += f" AND severity<={self.maxima}"
+        return filtro
+
+    def coincide(self, entrada):
+        nivel = SEVERIDADES.get(entrada.get("severity", "DEFAULT"), 0)
+        return SEVERIDADES[self.minima] <= nivel and (self.maxima is None or nivel <= SEVERIDADES[self.maxima])
+
+
+class Texto(Predicado):
+    """Texto que contiene `patron` (sin distinguir mayúsculas) o que casa con la expresión regular
+
+    Por defecto mira textPayload y jsonPayload.message; `campo` limita la
+    búsqueda a uno solo (con puntos para los de jsonPayload).
+    """
+
+    def __init__(self, patron, regex=False, campo=None):
+        self.patron = patron
+        self.regex = regex
+        self.campos = (campo,) if campo else CAMPOS_TEXTO
+        self._local = re.compile(patron) if regex else None
+        self._minusculas = patron.lower()
+
+    def filtro(self):
+        operador = "=~" if self.regex else ":"
+        return " OR ".join(f"{campo}{operador}{comillas(self.patron)}" for campo in self.campos)
+
+    def coincide(self, entrada):
+        for campo in self.campos:
+            texto = valor_campo(entrada, campo)
+            if not isinstance(texto, str):
+                continue
+            if self._local.search(texto) if self.regex else self._minusculas in texto.lower():
+                return True
+        return False
+
+
+class Etiqueta(Predicado):
+    def __init__(self, clave, valor, recurso=False):
+        self.clave = clave
+        self.valor = valor
+        self.recurso = recurso
+
+    def filtro(self):
+        return f"{campo_etiqueta(self.clave, self.recurso)}={comillas(self.valor)}"
+
+    def coincide(self, entrada):
+        origen = entrada.get("resource", {}) if self.recurso else entrada
+        return origen.get("labels", {}).get(self.clave) == self.valor
+
+
+class Tiempo(Predicado):
+    """Ventana [desde, hasta) con datetimes"""
+
+    def __init__(self, desde=None, hasta=None):
+        self.desde = formatear_timestamp(desde) if desde is not None else None
+        self.hasta = formatear_timestamp(hasta) if hasta is not None else None
+
+    def filtro(self):
+        partes = []
+        if self.desde:
+            partes.append(f"timestamp>={comillas(self.desde)}")
+        if self.hasta:
+            partes.append(f"timestamp<{comillas(self.hasta)}")
+        return " AND ".join(partes)
+
+    def coincide(self, entrada):
+        # Mismo formato RFC 3339 en UTC: la comparación de cadenas respeta el orden cronológico
+        timestamp = entrada.get("timestamp", "")
+        return (not self.desde or timestamp >= self.desde) and (not self.hasta or timestamp < self.hasta)
+
+
+class Y(Predicado):
+    def __init__(self, *partes):
+        self.partes = [p for p in partes if p is not None]
+
+    def filtro(self):
+        return " AND ".join(f"({p.filtro()})" for p in self.partes)
+
+    def coincide(self, entrada):
+        return all(p.coincide(entrada) for p in self.partes)
+
+
+class O(Predicado):
+    def __init__(self, *partes):
+        self.partes = [p for p in partes if p is not None]
+
+    def filtro(self):
+        return " OR ".join(f"({p.filtro()})" for p in self.partes)
+
+    def coincide(self, entrada):
+        return any(p.coincide(entrada) for p in self.partes)
+
+
+def predicado_categoria(etiqueta):
+    """Equivalente en servidor de una etiqueta del clasificador (palabras clave o severidad)"""
+    if etiqueta == "grave":
+        return Severidad(min(SEVERIDADES_GRAVES, key=SEVERIDADES.get))
+    if etiqueta == "advertencia":
+        return Severidad("WARNING", "WARNING")
+    if etiqueta not in CATEGORIAS:
+        raise ValueError(f"Categoría desconocida: {etiqueta!r} ({', '.join((*CATEGORIAS, 'grave', 'advertencia'))})")
+    return O(*(Texto(clave) for clave in CATEGORIAS[etiqueta]))
+
+
+class PlanConsultas:
+    """Resuelve varias categorías (tipo -> predicado o None para todo) con el mínimo de descargas"""
+
+    def __init__(self, categorias, largo_max=LARGO_MAX_FILTRO):
+        self.categorias = dict(categorias)
+        self.largo_max = largo_max
+        self.grupos = self._agrupar()
+
+    def _agrupar(self):
+        """Lista de (predicado de la consulta o None, tipos que cubre)"""
+        tipos = list(self.categorias)
+        if not tipos:
+            return []
+        # Una categoría sin filtro ya trae todas las demás: basta con una descarga
+        if any(self.categorias[tipo] is None for tipo in tipos):
+            return [(None, tipos)]
+        # Fusionar nunca descarga más que por separado: se junta todo lo que quepa en un filtro
+        grupos = []
+        actual, largo = [], 0
+        for tipo in tipos:
+            largo_tipo = len(self.categorias[tipo].filtro()) + len(" OR ()")
+            if actual and largo + largo_tipo > self.largo_max:
+                grupos.append(actual)
+                actual, largo = [], 0
+            actual.append(tipo)
+            largo += largo_tipo
+        grupos.append(actual)
+        return [(self.categorias[grupo[0]] if len(grupo) == 1 else O(*(self.categorias[tipo] for tipo in grupo)), grupo)
+                for grupo in grupos]
+
+    def filtros(self):
+        """Filtro extra (o None) de cada consulta y las categorías que resuelve"""
+        return [(predicado.filtro() if predicado else None, tipos) for predicado, tipos in self.grupos]
+
+    def etiquetar(self, entrada, tipos=None):
+        """Categorías (de `tipos`, por defecto todas) a las que pertenece una entrada descargada"""
+        return [tipo for tipo in (tipos or self.categorias)
+                if self.categorias[tipo] is None or self.categorias[tipo].coincide(entrada)]
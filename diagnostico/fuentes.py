@@ -0,0 +1,94 @@
+"""Origen de las entradas para los scripts de análisis
+
+Todos los analizadores consumen el mismo generador de entradas en orden
+cronológico; este módulo decide de dónde sale: Cloud Logging en directo,
+la caché local incremental, un paquete de diagnóstico o una exportación
+guardada (reproducida por diagnostico.reproduccion) o varios objetivos
+(proyecto × servicio × región) consultados a la vez.
+"""
+import heapq
+import sys
+from contextlib import ExitStack
+
+from diagnostico.bundle import abrir_bundle
+from diagnostico.cache import entradas_cacheadas
+from diagnostico.config import PROJECT, SERVICE
+from diagnostico.logs import filtro_servicio, iterar_entradas
+from diagnostico.objetivos import CONCURRENCIA, ConsultaObjetivos, seleccionar_objetivos
+from diagnostico.perfil import PERFIL
+from diagnostico.seguimiento import IdsRecientes
+
+# Sección de los paquetes de obtener_logs_cloudrun.py con todos los logs del servicio
+SECCION_PRINCIPAL = "cloud_run_recent"
+
+
+def anadir_argumentos_fuente(parser, freshness="2h"):
+    parser.add_argument("--freshness", default=freshness, help="Ventana a analizar (30m, 2h, 1d...)")
+    parser.add_argument("--cache", action="store_true", help="Usar la caché local y descargar solo el delta")
+    parser.add_argument("--bundle", metavar="PAQUETE",
+                        help="Analizar un paquete guardado, una exportación de logs (lista JSON o sink NDJSON) "
+                             "o un directorio de ellas en vez de Cloud Logging")
+    parser.add_argument("--velocidad", type=float, metavar="X",
+                        help="Con --bundle, reemitir las entradas a X veces el ritmo en que se registraron "
+                             "(1 tiempo real; sin indicar, sin esperas)")
+    parser.add_argument("--objetivo", action="append", metavar="NOMBRE",
+                        help="Objetivo de diagnostico_objetivos.json (nombre, proyecto o servicio; 'todos' para todos)")
+    parser.add_argument("--concurrencia", type=int, default=CONCURRENCIA,
+                        help="Peticiones simultáneas a Cloud Logging con --objetivo")
+    parser.add_argument("--perfil", action="store_true",
+                        help="Medir tiempos, bytes y entradas de cada fase y guardarlos en auto_logs/perfil_<script>.json")
+    parser.add_argument("--cprofile", action="store_true", help="Como --perfil y además un volcado de cProfile (.prof)")
+
+
+def _registros_seccion(lector, tipo):
+    return (entrada for seccion, entrada in lector.registros() if seccion == tipo)
+
+
+def entradas_bundle(ruta):
+    """Entradas de la sección principal de un paquete; si no la tiene, todas sin repetir insertId
+
+    Sin sección principal se mezclan (k-way, `heapq.merge`) las secciones,
+    cada una ya en orden cronológico, con un lector por sección: el paquete
+    nunca se carga entero en memoria.
+    """
+    tipos = {}
+    with abrir_bundle(ruta) as bundle:
+        for tipo, entrada in bundle.registros():
+            if tipo == SECCION_PRINCIPAL:
+                yield entrada
+            tipos[tipo] = True
+    if SECCION_PRINCIPAL in tipos:
+        return
+    vistos = IdsRecientes()
+    with ExitStack() as pila:
+        flujos = [_registros_seccion(pila.enter_context(abrir_bundle(ruta)), tipo) for tipo in tipos]
+        for entrada in heapq.merge(*flujos, key=lambda e: e.get("timestamp", "")):
+            insert_id = entrada.get("insertId")
+            if insert_id and not vistos.anadir(insert_id):
+                continue
+            yield entrada
+
+
+def entradas_objetivos(objetivos, freshness, concurrencia=CONCURRENCIA):
+    """Entradas de varios objetivos mezcladas en orden cronológico, avisando de los que fallen"""
+    consulta = ConsultaObjetivos(objetivos, freshness=freshness, concurrencia=concurrencia)
+    yield from consulta.entradas()
+    for nombre, error in consulta.errores.items():
+        print(f"⚠ Objetivo {nombre}: {error}", file=sys.stderr)
+
+
+def entradas_fuente(args, project=PROJECT, service=SERVICE):
+    """Generador de entradas en orden cronológico según --bundle / --objetivo / --cache / --freshness"""
+    if getattr(args, "perfil", False) or getattr(args, "cprofile", False):
+        PERFIL.activar(cprofile=getattr(args, "cprofile", False))
+    if getattr(args, "bundle", None):
+        from diagnostico.reproduccion import Reproductor
+
+        return PERFIL.flujo("bundle", Reproductor(args.bundle, getattr(args, "velocidad", None)).entradas())
+    if getattr(args, "objetivo", None):
+        return PERFIL.flujo("objetivos", entradas_objetivos(seleccionar_objetivos(args.objetivo), args.freshness,
+                                                            getattr(args, "concurrencia", CONCURRENCIA)))
+    if getattr(args, "cache", False):
+        return PERFIL.flujo("cache", entradas_cacheadas(args.freshness, project, service, orden="asc"))
+    return PERFIL.flujo("cloud_logging", iterar_entradas(filtro_servicio(service), project=project,
+                                                         freshness=args.freshness, orden="asc"))
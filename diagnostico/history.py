@@ -0,0 +1,257 @@
+"""Desfase y estancamiento del historyId de Gmail
+
+El pipeline de Gmail watch depende de dos números por cuenta (principal y
+SENDER): el historyId que trae cada notificación de Pub/Sub y el historyId
+guardado hasta el que ya se procesó. Este analizador los extrae de
+
+    _pubsub: notificación recibida de Gmail: { historyId: 'N' }
+    [history] Delta INBOX: { nuevosMensajes, startHistoryId, notifHistoryId, useSenderState }
+    _pubsub: actualizo historyId guardado (cuenta principal|SENDER) → N
+    [history] ✓ historyId [SENDER ]actualizado a N
+    /reset, /control/start y /force-process (reinicios explícitos del guardado)
+
+y mantiene, de forma incremental y con memoria acotada, una serie temporal
+por intervalo con el desfase (notificado - guardado). Marca como
+estancamiento un guardado que no avanza durante `umbral_estancamiento`
+mientras siguen llegando notificaciones con historyId mayor, y como
+regresión un guardado que retrocede sin un /reset de por medio.
+"""
+import re
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from diagnostico.logs import parsear_timestamp
+from diagnostico.motor import Analizador
+
+CUENTAS = ("principal", "sender")
+INTERVALO = timedelta(minutes=1)
+UMBRAL_ESTANCAMIENTO = timedelta(minutes=10)
+MAX_PUNTOS = 24 * 60
+
+_NOTIFICACION = re.compile(r"_pubsub: notificaci.n recibida[\s\S]*?historyId:\s*'?(\d+)")
+_DELTA = re.compile(r"\[history\] Delta INBOX:")
+_CAMPO = re.compile(r"(\w+):\s*'?(\d+|true|false)\b")
+_GUARDADO = re.compile(r"actualizo historyId guardado(?: \(cuenta (principal|SENDER)\))?\s*\S*\s+(\d+)")
+_SINCRONIZADO = re.compile(r"\[history\] \S+ historyId (SENDER )?actualizado a (\d+)")
+_RESET = re.compile(
+    r"(?:/reset completado \(cuenta (principal|SENDER)\)\. Nuevo historyId:"
+    r"|/control/start → \S+ historyId (principal|SENDER) actualizado a:"
+    r"|/force-process → historyId actualizado a:)\s*(\d+)"
+)
+_MARCAS = re.compile(r"historyId|HistoryId|Delta INBOX")
+
+
+def _cuenta(texto):
+    return "sender" if texto and texto.strip().upper() == "SENDER" else "principal"
+
+
+class _Cuenta:
+    """Estado incremental de una cuenta de Gmail"""
+
+    def __init__(self, nombre, max_puntos):
+        self.nombre = nombre
+        self.notificado = None
+        self.guardado = None
+        self.ultimo_avance = None
+        self.desfase_max = 0
+        self.avances = 0
+        self.deltas = 0
+        self.deltas_vacios = 0
+        self.notificaciones_atrasadas = 0
+        self.regresiones = []
+        self.estancamientos = []
+        self.estancado_desde = None
+        self.serie = deque(maxlen=max_puntos)
+
+    @property
+    def desfase(self):
+        if self.notificado is None or self.guardado is None:
+            return None
+        return self.notificado - self.guardado
+
+    def resumen(self):
+        return {
+            "notificado": self.notificado,
+            "guardado": self.guardado,
+            "desfase": self.desfase,
+            "desfase_max": self.desfase_max,
+            "avances": self.avances,
+            "deltas": self.deltas,
+            "deltas_vacios": self.deltas_vacios,
+            "notificaciones_atrasadas": self.notificaciones_atrasadas,
+            "regresiones": list(self.regresiones),
+            "estancamientos": list(self.estancamientos),
+            "estancado_desde": self.estancado_desde.isoformat() if self.estancado_desde else None,
+            "serie": [{k: v for k, v in punto.items() if k != "_inicio"} for punto in self.serie],
+        }
+
+
+class HistoryAnalizador(Analizador):
+    """Serie temporal del desfase entre el historyId notificado y el guardado, por cuenta"""
+
+    nombre = "history"
+
+    def __init__(self, max_muestras=10, desde=None, intervalo=INTERVALO,
+                 umbral_estancamiento=UMBRAL_ESTANCAMIENTO, max_puntos=MAX_PUNTOS):
+        super().__init__(max_muestras, desde)
+        self.intervalo = intervalo
+        self.umbral_estancamiento = umbral_estancamiento
+        self.cuentas = {nombre: _Cuenta(nombre, max_puntos) for nombre in CUENTAS}
+        self.resets = []
+        self.ultimo_momento = None
+
+    def coincide(self, entrada, texto, etiquetas):
+        return _MARCAS.search(texto) is not None
+
+    def _punto(self, cuenta, momento):
+        """Actualiza el punto del intervalo en curso de la serie de la cuenta"""
+        segundos = self.intervalo.total_seconds()
+        inicio = momento.timestamp() // segundos * segundos
+        serie = cuenta.serie
+        if not serie or serie[-1]["_inicio"] != inicio:
+            serie.append({
+                "_inicio": inicio,
+                "intervalo": datetime.fromtimestamp(inicio, timezone.utc).isoformat(),
+                "notificaciones": 0,
+                "avances": 0,
+                "desfase_max": None,
+                "estancado": False,
+                "regresion": False,
+            })
+        punto = serie[-1]
+        punto["notificado"] = cuenta.notificado
+        punto["guardado"] = cuenta.guardado
+        desfase = cuenta.desfase
+        if desfase is not None and (punto["desfase_max"] is None or desfase > punto["desfase_max"]):
+            punto["desfase_max"] = desfase
+        punto["estancado"] = punto["estancado"] or cuenta.estancado_desde is not None
+        return punto
+
+    def _notificar(self, cuenta, valor, momento, nueva=True):
+        """Registra un historyId notificado; `nueva=False` si es el eco de una notificación ya contada"""
+        if nueva and cuenta.guardado is not None and valor <= cuenta.guardado:
+            cuenta.notificaciones_atrasadas += 1
+        cuenta.notificado = valor if cuenta.notificado is None else max(cuenta.notificado, valor)
+        if cuenta.desfase is not None:
+            cuenta.desfase_max = max(cuenta.desfase_max, cuenta.desfase)
+        self._comprobar_estancamiento(cuenta, momento)
+        punto = self._punto(cuenta, momento)
+        if nueva:
+            punto["notificaciones"] += 1
+
+    def _guardar(self, cuenta, valor, momento, reset=False):
+        anterior = cuenta.guardado
+        punto = None
+        if anterior is not None and valor < anterior and not reset:
+            cuenta.regresiones.append({"momento": momento.isoformat(), "de": anterior, "a": valor})
+            cuenta.guardado = valor
+            punto = self._punto(cuenta, momento)
+            punto["regresion"] = True
+        elif anterior is None or valor != anterior or reset:
+            cuenta.guardado = valor
+            cuenta.ultimo_avance = momento
+            cuenta.avances += 1
+            if cuenta.estancado_desde is not None:
+                cuenta.estancamientos[-1]["hasta"] = momento.isoformat()
+                cuenta.estancado_desde = None
+            punto = self._punto(cuenta, momento)
+            punto["avances"] += 1
+        if punto is None:
+            self._punto(cuenta, momento)
+
+    def _comprobar_estancamiento(self, cuenta, momento):
+        desfase = cuenta.desfase
+        if desfase is None or desfase <= 0 or cuenta.estancado_desde is not None:
+            return
+        referencia = cuenta.ultimo_avance or momento
+        if momento - referencia >= self.umbral_estancamiento:
+            cuenta.estancado_desde = referencia
+            cuenta.estancamientos.append({
+                "desde": referencia.isoformat(),
+                "detectado": momento.isoformat(),
+                "hasta": None,
+                "guardado": cuenta.guardado,
+                "notificado": cuenta.notificado,
+            })
+
+    def acumular(self, entrada, texto, etiquetas):
+        momento = parsear_timestamp(entrada["timestamp"])
+        self.ultimo_momento = momento
+
+        coincidencia = _NOTIFICACION.search(texto)
+        if coincidencia:
+            # La notificación es del buzón vigilado y la consultan las dos cuentas
+            for cuenta in self.cuentas.values():
+                self._notificar(cuenta, int(coincidencia.group(1)), momento)
+            return
+        if _DELTA.search(texto):
+            campos = dict(_CAMPO.findall(texto))
+            cuenta = self.cuentas["sender" if campos.get("useSenderState") == "true" else "principal"]
+            cuenta.deltas += 1
+            if campos.get("nuevosMensajes") == "0":
+                cuenta.deltas_vacios += 1
+            if "startHistoryId" in campos and cuenta.guardado is None:
+                self._guardar(cuenta, int(campos["startHistoryId"]), momento)
+            if "notifHistoryId" in campos:
+                self._notificar(cuenta, int(campos["notifHistoryId"]), momento, nueva=False)
+            return
+        coincidencia = _RESET.search(texto)
+        if coincidencia:
+            cuenta = self.cuentas[_cuenta(coincidencia.group(1) or coincidencia.group(2))]
+            self.resets.append({"momento": momento.isoformat(), "cuenta": cuenta.nombre})
+            self._guardar(cuenta, int(coincidencia.group(3)), momento, reset=True)
+            return
+        coincidencia = _GUARDADO.search(texto) or _SINCRONIZADO.search(texto)
+        if coincidencia:
+            self._guardar(self.cuentas[_cuenta(coincidencia.group(1))], int(coincidencia.group(2)), momento)
+
+    def cerrar(self, momento=None):
+        """Revisa los estancamientos al final de la ventana (o en `momento`, para flujos en vivo)"""
+        momento = momento or self.ultimo_momento
+        if momento is None:
+            return
+        for cuenta in self.cuentas.values():
+            self._comprobar_estancamiento(cuenta, momento)
+
+    def resumen(self):
+        self.cerrar()
+        cuentas = {nombre: cuenta.resumen() for nombre, cuenta in self.cuentas.items()}
+        return {**super().resumen(), "resets": list(self.resets), "cuentas": cuentas}
+
+
+def diagnostico(resumen):
+    """Conclusiones en texto a partir del resumen de HistoryAnalizador"""
+    lineas = []
+    for nombre, cuenta in resumen["cuentas"].items():
+        if cuenta["notificado"] is None and cuenta["guardado"] is None:
+            continue
+        etiqueta = f"Cuenta {nombre}"
+        problemas = []
+        if cuenta["estancado_desde"]:
+            problemas.append(f"✗ {etiqueta}: historyId guardado ESTANCADO en {cuenta['guardado']} desde "
+                             f"{cuenta['estancado_desde']} (notificado {cuenta['notificado']}, desfase {cuenta['desfase']})")
+        elif cuenta["estancamientos"]:
+            problemas.append(f"⚠ {etiqueta}: {len(cuenta['estancamientos'])} estancamientos recuperados en la ventana")
+        if cuenta["regresiones"]:
+            ultima = cuenta["regresiones"][-1]
+            problemas.append(f"✗ {etiqueta}: el historyId guardado retrocedió {len(cuenta['regresiones'])} veces "
+                             f"(última {ultima['de']} → {ultima['a']} a las {ultima['momento']})")
+        if cuenta["notificaciones_atrasadas"]:
+            problemas.append(f"⚠ {etiqueta}: {cuenta['notificaciones_atrasadas']} notificaciones con historyId <= al "
+                             "guardado (el guardado va por delante de Gmail)")
+        if cuenta["deltas"] and cuenta["deltas_vacios"] == cuenta["deltas"]:
+            problemas.append(f"⚠ {etiqueta}: los {cuenta['deltas']} deltas de history.list vinieron vacíos")
+        if problemas:
+            lineas.extend(problemas)
+        elif cuenta["guardado"] is None:
+            lineas.append(f"ℹ {etiqueta}: sin historyId guardado en la ventana (notificado {cuenta['notificado']})")
+        elif cuenta["desfase"] is not None and cuenta["desfase"] > 0:
+            lineas.append(f"✓ {etiqueta}: desfase actual {cuenta['desfase']} (máx. {cuenta['desfase_max']}), "
+                          "sin estancamiento")
+        else:
+            lineas.append(f"✓ {etiqueta}: historyId guardado al día ({cuenta['guardado']})")
+    if resumen["resets"]:
+        lineas.append(f"ℹ {len(resumen['resets'])} reinicios del historyId (/reset, /control/start, /force-process)")
+    if not lineas:
+        lineas.append("ℹ No hay logs de historyId en la ventana")
+    return lineas
@@ -0,0 +1,161 @@
+"""Huellas de errores: agrupa los mensajes de error por plantilla
+
+Un mismo fallo (invalid_grant de OAuth, un 422 de Airtable...) se repite
+con distintos IDs, fechas y números en cada línea y tapa a todos los demás
+en las secciones que muestran los últimos N errores. Aquí cada mensaje se
+reduce a una plantilla:
+
+    fechas, emails, UUIDs, IDs de Airtable / Gmail / hex     <fecha> <email> <uuid> <id>
+    números (salvo códigos de estado HTTP)                    <n>
+    marcos "at ..." de los stack traces                       se quitan; el primero del
+                                                              código propio queda como origen
+
+y la huella es un hash corto de plantilla + origen. Las líneas se
+normalizan con una caché LRU acotada: los marcos de stack y los mensajes
+idénticos que se repiten no vuelven a pasar por las expresiones regulares.
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+from diagnostico.motor import Analizador
+
+TAM_CACHE = 8192
+MAX_HUELLAS = 2000
+LARGO_PLANTILLA = 300
+LARGO_EJEMPLO = 500
+
+# Marco de stack trace, en su propia línea o dentro de un JSON serializado ("...\n    at f (file:1:2)")
+_MARCO = re.compile(r"(?:^|\\n)\s*at\s+(?:async\s+)?([^\"\n]+?)(?=\\n|\"|$)")
+_POSICION = re.compile(r":\d+(?::\d+)?(?=\)|$)")
+_SUSTITUCIONES = (
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<fecha>"),
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<uuid>"),
+    (re.compile(r"\brec[A-Za-z0-9]{14}\b"), "<id>"),
+    (re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{8,}\b"), "<id>"),
+    (re.compile(r"\b(?=[A-Za-z_-]*\d)[A-Za-z0-9_-]{20,}\b"), "<id>"),
+)
+# Los códigos de estado HTTP distinguen fallos distintos y se conservan
+_NUMERO = re.compile(r"((?:status(?: code)?|statusCode|code|c.digo|error)\W{0,3}\d{3}\b)|\b\d+(?:[.,]\d+)*\b",
+                     re.IGNORECASE)
+_ESPACIOS = re.compile(r"\s+")
+
+
+def _origen(marco):
+    """'processMessageIds (file:///app/services/processor.js:438:26)' -> sin file:// ni línea:columna"""
+    return _POSICION.sub("", marco.replace("file://", "")).strip()
+
+
+@lru_cache(maxsize=TAM_CACHE)
+def _normalizar_linea(linea):
+    """(plantilla de la línea, primer marco de código propio o None)"""
+    origen = None
+    for marco in _MARCO.findall(linea):
+        if "node_modules" not in marco and "node:" not in marco:
+            origen = _origen(marco)
+            break
+    linea = _MARCO.sub("", linea)
+    for patron, marcador in _SUSTITUCIONES:
+        linea = patron.sub(marcador, linea)
+    linea = _NUMERO.sub(lambda m: m.group(1) or "<n>", linea)
+    return _ESPACIOS.sub(" ", linea).strip(), origen
+
+
+def plantilla(texto):
+    """Plantilla de un mensaje de error y el origen (primer marco del código del servicio)"""
+    partes = []
+    origen = None
+    for linea in texto.split("\n"):
+        parte, origen_linea = _normalizar_linea(linea)
+        if parte:
+            partes.append(parte)
+        if origen is None:
+            origen = origen_linea
+    return " ".join(partes)[:LARGO_PLANTILLA], origen
+
+
+def huella(plantilla, origen=None):
+    return hashlib.sha1(f"{plantilla}\n{origen or ''}".encode("utf-8")).hexdigest()[:12]
+
+
+def estadisticas_cache():
+    info = _normalizar_linea.cache_info()
+    consultas = info.hits + info.misses
+    return {"aciertos": info.hits, "fallos": info.misses, "tamano": info.currsize, "maximo": info.maxsize,
+            "ratio_aciertos": info.hits / consultas if consultas else None}
+
+
+class _Huella:
+    __slots__ = ("huella", "plantilla", "origen", "total", "primera", "ultima", "ejemplo", "severidad", "instancias")
+
+    def __init__(self, id, plantilla, origen, entrada, texto):
+        self.huella = id
+        self.plantilla = plantilla
+        self.origen = origen
+        self.total = 0
+        self.primera = entrada.get("timestamp")
+        self.ultima = self.primera
+        self.ejemplo = texto[:LARGO_EJEMPLO]
+        self.severidad = entrada.get("severity", "DEFAULT")
+        self.instancias = set()
+
+    def resumen(self):
+        return {
+            "huella": self.huella,
+            "plantilla": self.plantilla,
+            "origen": self.origen,
+            "total": self.total,
+            "primera": self.primera,
+            "ultima": self.ultima,
+            "severidad": self.severidad,
+            "instancias": len(self.instancias),
+            "ejemplo": self.ejemplo,
+        }
+
+
+class HuellasAnalizador(Analizador):
+    """Errores agrupados por plantilla con recuento, primera/última vez y un ejemplo"""
+
+    nombre = "huellas"
+
+    def __init__(self, max_muestras=10, desde=None, solo_severidad=False, max_huellas=MAX_HUELLAS):
+        super().__init__(max_muestras, desde)
+        self.solo_severidad = solo_severidad
+        self.max_huellas = max_huellas
+        self.huellas = {}
+        self.sin_huella = 0  # errores de plantillas nuevas cuando ya se alcanzó max_huellas
+
+    def coincide(self, entrada, texto, etiquetas):
+        if "grave" in etiquetas:
+            return True
+        return not self.solo_severidad and ("error" in etiquetas or "fallo" in etiquetas)
+
+    def acumular(self, entrada, texto, etiquetas):
+        texto_plantilla, origen = plantilla(texto)
+        id = huella(texto_plantilla, origen)
+        grupo = self.huellas.get(id)
+        if grupo is None:
+            if len(self.huellas) >= self.max_huellas:
+                self.sin_huella += 1
+                return
+            grupo = self.huellas[id] = _Huella(id, texto_plantilla, origen, entrada, texto)
+        grupo.total += 1
+        grupo.ultima = entrada.get("timestamp") or grupo.ultima
+        if "grave" in etiquetas:
+            grupo.severidad = entrada.get("severity", grupo.severidad)
+        grupo.instancias.add(entrada.get("labels", {}).get("instanceId", ""))
+
+    def ranking(self, n=None):
+        """Huellas de la más a la menos frecuente"""
+        ordenadas = sorted(self.huellas.values(), key=lambda h: (-h.total, h.primera or ""))
+        return [h.resumen() for h in ordenadas[:n]]
+
+    def resumen(self, n=50):
+        return {
+            **super().resumen(),
+            "huellas": len(self.huellas),
+            "sin_huella": self.sin_huella,
+            "ranking": self.ranking(n),
+            "cache": estadisticas_cache(),
+        }
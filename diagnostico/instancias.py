@@ -0,0 +1,250 @@
+"""Ciclo de vida de las instancias de Cloud Run y arranques en frío
+
+Cada entrada lleva labels.instanceId. Agrupando por él se obtiene, para
+cada instancia:
+
+    vida          primera y última entrada vista (mientras no escribe logs no se la ve)
+    arranque      "HTTP server escuchando en puerto" de index.js o "Starting new instance" de Cloud Run;
+                  sin ninguno de los dos, se infiere si aparece pasado MARGEN_INFERIDO desde el inicio
+    trabajo       peticiones (httpRequest), mensajes procesados (trazas de latencia.py), entradas, errores
+    concurrencia  peticiones simultáneas según timestamp + httpRequest.latency
+
+y en conjunto las instancias vivas y activas minuto a minuto, los
+minutos-instancia sin ninguna entrada (lo que se paga por tenerlas
+calientes) y la relación de los picos de latencia del procesamiento con
+los arranques: latencia de los mensajes de los primeros VENTANA_FRIO
+segundos de cada instancia frente al resto (Mann-Whitney) y qué parte de
+los mensajes por encima del percentil PERCENTIL_PICO cae en instancias
+recién arrancadas o en minutos con más instancias vivas.
+"""
+import re
+from array import array
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+from diagnostico.eficiencia import _segundos
+from diagnostico.estadistica import percentil, prueba_mann_whitney, resumen_distribucion
+from diagnostico.latencia import LatenciaAnalizador
+from diagnostico.logs import parsear_timestamp
+from diagnostico.motor import Analizador
+
+VENTANA_FRIO = 120
+PERCENTIL_PICO = 95
+MARGEN_INFERIDO = 300
+
+_ARRANQUE_APP = re.compile(r"HTTP server escuchando en puerto")
+_ARRANQUE_RUN = re.compile(r"Starting new instance\.?(?: Reason: ([A-Z_]+))?")
+
+
+def _minuto(timestamp):
+    """Índice de minuto (minutos desde epoch) de un timestamp RFC 3339"""
+    return int(parsear_timestamp(timestamp[:16] + ":00Z").timestamp()) // 60
+
+
+def _fecha_minuto(indice):
+    return datetime.fromtimestamp(indice * 60, timezone.utc).strftime("%Y-%m-%dT%H:%M")
+
+
+class _Instancia:
+    __slots__ = ("id", "revision", "primera", "ultima", "entradas", "errores", "peticiones", "latencias_peticion",
+                 "intervalos", "minutos", "arranque", "mensajes", "latencias_mensaje")
+
+    def __init__(self, id, entrada):
+        self.id = id
+        self.revision = entrada.get("resource", {}).get("labels", {}).get("revision_name")
+        self.primera = entrada.get("timestamp", "")
+        self.ultima = self.primera
+        self.entradas = 0
+        self.errores = 0
+        self.peticiones = 0
+        self.latencias_peticion = []
+        self.intervalos = array("d")  # inicio, fin de cada petición (segundos epoch)
+        self.minutos = set()  # "YYYY-MM-DDTHH:MM" con alguna entrada
+        self.arranque = None
+        self.mensajes = 0
+        self.latencias_mensaje = []
+
+    def concurrencia_max(self):
+        """Máximo de peticiones atendidas a la vez"""
+        eventos = sorted([(self.intervalos[i], 1) for i in range(0, len(self.intervalos), 2)]
+                         + [(self.intervalos[i], -1) for i in range(1, len(self.intervalos), 2)])
+        actual = maximo = 0
+        for _, cambio in eventos:
+            actual += cambio
+            maximo = max(maximo, actual)
+        return maximo
+
+
+class InstanciasAnalizador(Analizador):
+    """Vida, arranques en frío y trabajo por instancia, y su relación con la latencia del procesamiento"""
+
+    nombre = "instancias"
+
+    def __init__(self, max_muestras=10, desde=None, ventana_frio=VENTANA_FRIO, percentil_pico=PERCENTIL_PICO,
+                 margen_inferido=MARGEN_INFERIDO):
+        super().__init__(max_muestras, desde)
+        self.ventana_frio = ventana_frio
+        self.percentil_pico = percentil_pico
+        self.margen_inferido = margen_inferido
+        self.instancias = {}
+        self.sin_instancia = 0
+        self.inicio = None
+        self.latencia = LatenciaAnalizador(max_muestras=0, max_lentos=0, al_cerrar=self._mensaje)
+        self.trazas = []  # (inicio en segundos epoch, instanceId, segundos de extremo a extremo)
+
+    def coincide(self, entrada, texto, etiquetas):
+        return True
+
+    def acumular(self, entrada, texto, etiquetas):
+        timestamp = entrada.get("timestamp", "")
+        if self.inicio is None and timestamp:
+            self.inicio = timestamp
+        id = entrada.get("labels", {}).get("instanceId")
+        if not id or not timestamp:
+            self.sin_instancia += 1
+            return
+        instancia = self.instancias.get(id)
+        if instancia is None:
+            instancia = self.instancias[id] = _Instancia(id, entrada)
+        instancia.entradas += 1
+        instancia.ultima = timestamp
+        instancia.minutos.add(timestamp[:16])
+        if "grave" in etiquetas:
+            instancia.errores += 1
+        peticion = entrada.get("httpRequest")
+        if peticion:
+            instancia.peticiones += 1
+            latencia = _segundos(peticion.get("latency", ""))
+            if latencia is not None:
+                inicio = parsear_timestamp(timestamp).timestamp()
+                instancia.latencias_peticion.append(latencia)
+                instancia.intervalos.extend((inicio, inicio + latencia))
+            return
+        if instancia.arranque is None:
+            if _ARRANQUE_APP.search(texto):
+                instancia.arranque = {"momento": timestamp, "senal": "app", "motivo": None}
+            else:
+                coincidencia = _ARRANQUE_RUN.search(texto)
+                if coincidencia:
+                    instancia.arranque = {"momento": timestamp, "senal": "cloud_run", "motivo": coincidencia.group(1)}
+        self.latencia.consumir(entrada, texto, etiquetas)
+
+    def _mensaje(self, traza, por_etapa, total):
+        self.trazas.append((min(traza.etapas.values()).timestamp(), traza.instancia, total))
+        instancia = self.instancias.get(traza.instancia)
+        if instancia is not None:
+            instancia.mensajes += 1
+            instancia.latencias_mensaje.append(total)
+
+    def arranques(self):
+        """instanceId -> arranque observado o inferido (None si ya estaba viva al empezar la ventana)"""
+        limite = None
+        if self.inicio:
+            limite = parsear_timestamp(self.inicio).timestamp() + self.margen_inferido
+        resultado = {}
+        for id, instancia in self.instancias.items():
+            arranque = instancia.arranque
+            if arranque is None and limite is not None and parsear_timestamp(instancia.primera).timestamp() > limite:
+                arranque = {"momento": instancia.primera, "senal": "inferido", "motivo": None}
+            resultado[id] = arranque
+        return resultado
+
+    def por_minuto(self):
+        """Minuto -> instancias vivas (entre su primera y última entrada) y activas (con alguna entrada)"""
+        if not self.instancias:
+            return OrderedDict()
+        cambios = Counter()
+        for instancia in self.instancias.values():
+            cambios[_minuto(instancia.primera)] += 1
+            cambios[_minuto(instancia.ultima) + 1] -= 1
+        activas = Counter(minuto for instancia in self.instancias.values() for minuto in instancia.minutos)
+        resultado = OrderedDict()
+        vivas = 0
+        for indice in range(min(cambios), max(cambios)):
+            vivas += cambios.get(indice, 0)
+            clave = _fecha_minuto(indice)
+            resultado[clave] = {"vivas": vivas, "activas": activas.get(clave, 0)}
+        return resultado
+
+    def correlacion(self, arranques, minutos):
+        """Latencia de extremo a extremo de los mensajes frente a arranques y número de instancias vivas"""
+        if not self.trazas:
+            return None
+        inicio_arranque = {id: parsear_timestamp(a["momento"]).timestamp() for id, a in arranques.items() if a}
+        umbral = percentil(sorted(total for _, _, total in self.trazas), self.percentil_pico)
+        frios, calientes = [], []
+        picos = picos_frios = 0
+        vivas_todas, vivas_picos = [], []
+        for inicio, id, total in self.trazas:
+            arranque = inicio_arranque.get(id)
+            frio = arranque is not None and 0 <= inicio - arranque <= self.ventana_frio
+            (frios if frio else calientes).append(total)
+            vivas = minutos.get(_fecha_minuto(int(inicio) // 60), {}).get("vivas", 0)
+            vivas_todas.append(vivas)
+            if total > umbral:
+                picos += 1
+                picos_frios += frio
+                vivas_picos.append(vivas)
+        return {
+            "mensajes": len(self.trazas),
+            "umbral_pico": umbral,
+            "picos": picos,
+            "frios": len(frios),
+            "picos_frios": picos_frios,
+            "proporcion_frios": len(frios) / len(self.trazas),
+            "proporcion_picos_frios": picos_frios / picos if picos else None,
+            "latencia_frio": resumen_distribucion(frios),
+            "latencia_caliente": resumen_distribucion(calientes),
+            # p unilateral de que los mensajes en frío tarden más que el resto
+            "prueba": prueba_mann_whitney(calientes, frios),
+            "vivas_media": sum(vivas_todas) / len(vivas_todas),
+            "vivas_media_picos": sum(vivas_picos) / len(vivas_picos) if vivas_picos else None,
+        }
+
+    def resumen(self):
+        self.latencia.cerrar_pendientes()
+        arranques = self.arranques()
+        minutos = self.por_minuto()
+        instancias = OrderedDict()
+        for instancia in sorted(self.instancias.values(), key=lambda i: i.primera):
+            vida = (parsear_timestamp(instancia.ultima) - parsear_timestamp(instancia.primera)).total_seconds()
+            minutos_vivos = _minuto(instancia.ultima) - _minuto(instancia.primera) + 1
+            arranque = arranques[instancia.id]
+            instancias[instancia.id] = {
+                "revision": instancia.revision,
+                "primera": instancia.primera,
+                "ultima": instancia.ultima,
+                "vida_segundos": vida,
+                "arranque": arranque,
+                "entradas": instancia.entradas,
+                "errores": instancia.errores,
+                "peticiones": instancia.peticiones,
+                "mensajes": instancia.mensajes,
+                "minutos_vivos": minutos_vivos,
+                "minutos_activos": len(instancia.minutos),
+                "mensajes_por_minuto_vivo": instancia.mensajes / minutos_vivos,
+                "concurrencia_max": instancia.concurrencia_max(),
+                # La primera petición tras un arranque carga con el arranque en frío
+                "primera_peticion": instancia.latencias_peticion[0] if arranque and instancia.latencias_peticion
+                else None,
+                "latencia_peticion": resumen_distribucion(instancia.latencias_peticion),
+                "latencia_mensaje": resumen_distribucion(instancia.latencias_mensaje),
+            }
+        vivos = sum(i["minutos_vivos"] for i in instancias.values())
+        activos = sum(i["minutos_activos"] for i in instancias.values())
+        primeras_frio = [i["primera_peticion"] for i in instancias.values() if i["primera_peticion"] is not None]
+        return {
+            **super().resumen(),
+            "sin_instancia": self.sin_instancia,
+            "instancias": instancias,
+            "arranques": [{"instancia": id, **a} for id, a in arranques.items() if a],
+            "por_minuto": minutos,
+            "vivas": resumen_distribucion(m["vivas"] for m in minutos.values()),
+            "activas": resumen_distribucion(m["activas"] for m in minutos.values()),
+            "minutos_instancia": vivos,
+            "minutos_instancia_activos": activos,
+            "proporcion_ociosa": 1 - activos / vivos if vivos else None,
+            "primera_peticion_frio": resumen_distribucion(primeras_frio),
+            "concurrencia_max": max((i["concurrencia_max"] for i in instancias.values()), default=0),
+            "correlacion": self.correlacion(arranques, minutos),
+        }
@@ -0,0 +1,223 @@
+"""Trazado de latencia por mensaje a lo largo del pipeline de leads
+
+Cada correo de Gmail deja un rastro en los logs del servicio:
+
+    notificacion  _pubsub: notificación recibida de Gmail (por instancia, sin ID)
+    ids           _pubsub: IDs que voy a procesar ahora: { ids: ['<id>', ...] }
+    procesando    Lock adquirido para mensaje <id> / Procesando correo ... - ID: <id>
+    airtable      Airtable: ✓ Registro creado exitosamente { emailId: '<id>' }
+    email         Email ID procesado: <id> ... Message ID: <enviado> / Thread ID: <hilo>
+    fin           Lock liberado para mensaje <id>
+
+El trazador correlaciona esas líneas por el ID del mensaje de Gmail (y por
+instancia para las líneas que no lo llevan: la notificación que precede al
+lote y el Message ID/Thread ID del email enviado en respuesta) y calcula la
+latencia de cada etapa respecto a la anterior observada y la de extremo a
+extremo. Necesita las entradas en orden cronológico y reensambladas.
+
+El Message ID/Thread ID se atribuye al último "Email ID procesado" de la
+misma instancia, lo que supone que una instancia no intercala dos envíos.
+Si llega otro "Email ID procesado" antes de la respuesta de Gmail, el
+pendiente se descarta y se cuenta en "emails_sin_enlazar" en vez de quedarse
+con el Message ID del siguiente; lo mismo un Message ID sin email pendiente
+(p. ej. las alertas, que no registran Email ID).
+"""
+import heapq
+import re
+from collections import OrderedDict
+
+from diagnostico.estadistica import resumen_distribucion
+from diagnostico.logs import parsear_timestamp
+from diagnostico.motor import Analizador
+
+ETAPAS = ("notificacion", "ids", "procesando", "airtable", "email", "fin")
+MAX_ABIERTAS = 5000
+
+_ID = r"([0-9a-f]{12,})"
+_MARCAS = re.compile(
+    r"notificaci.n recibida|IDs que voy a procesar|Lock (?:adquirido|liberado) para mensaje|Procesando correo"
+    r"|INICIANDO PROCESAMIENTO|Registro creado|Email ID procesado|Message ID:|Thread ID:|rror procesando mensaje"
+)
+_NOTIFICACION = re.compile(r"_pubsub: notificaci.n recibida")
+_IDS = re.compile(r"IDs que voy a procesar ahora[^:]*:[\s\S]*?\bids:\s*\[([^\]]*)\]")
+_ID_LISTA = re.compile(r"'([0-9a-f]{12,})'")
+_PROCESANDO = re.compile(
+    rf"Lock adquirido para mensaje\s+{_ID}|(?:Procesando correo|INICIANDO PROCESAMIENTO)[^\n]*?- ID: {_ID}")
+_AIRTABLE = re.compile(rf"Registro creado exitosamente[\s\S]*?emailId:\s*'{_ID}'|Registro creado o duplicado[^\n]*?- ID: {_ID}")
+_EMAIL_ID = re.compile(rf"Email ID procesado:\s*{_ID}")
+_MESSAGE_ID = re.compile(r"Message ID:\s*(\S+)")
+_THREAD_ID = re.compile(r"Thread ID:\s*(\S+)")
+_FIN = re.compile(rf"Lock liberado para mensaje\s+{_ID}")
+_ERROR = re.compile(rf"rror procesando mensaje:?\s+{_ID}")
+
+
+class _Traza:
+    __slots__ = ("id", "instancia", "etapas", "enviado", "hilo", "error")
+
+    def __init__(self, id, instancia):
+        self.id = id
+        self.instancia = instancia
+        self.etapas = {}
+        self.enviado = None
+        self.hilo = None
+        self.error = False
+
+    def marcar(self, etapa, momento):
+        # Se conserva la primera vez que se alcanza cada etapa
+        self.etapas.setdefault(etapa, momento)
+
+    def latencias(self):
+        """Segundos de cada etapa desde la anterior observada y de extremo a extremo"""
+        presentes = [(etapa, self.etapas[etapa]) for etapa in ETAPAS if etapa in self.etapas]
+        por_etapa = {}
+        for (_, anterior), (etapa, momento) in zip(presentes, presentes[1:]):
+            por_etapa[etapa] = (momento - anterior).total_seconds()
+        total = (presentes[-1][1] - presentes[0][1]).total_seconds() if len(presentes) > 1 else None
+        return por_etapa, total
+
+
+class LatenciaAnalizador(Analizador):
+    """Línea temporal por mensaje de Gmail y percentiles de latencia por etapa"""
+
+    nombre = "latencia"
+
+    def __init__(self, max_muestras=10, desde=None, max_lentos=10, al_cerrar=None):
+        super().__init__(max_muestras, desde)
+        self.max_lentos = max_lentos
+        # Se llama con (traza, latencias por etapa, total) al completarse cada traza
+        self.al_cerrar = al_cerrar
+        self.abiertas = OrderedDict()  # id -> _Traza, en orden de llegada
+        self.ultima_notificacion = {}  # instanceId -> momento
+        self.email_pendiente = {}  # instanceId -> id del mensaje cuyo email se está enviando
+        self.emails_sin_enlazar = 0
+        self.latencias = {etapa: [] for etapa in ETAPAS[1:]}
+        self.extremo_a_extremo = []
+        self.completos = 0
+        self.incompletos = 0
+        self.con_error = 0
+        self._lentos = []  # montículo (segundos, id, detalle) con los más lentos
+
+    def coincide(self, entrada, texto, etiquetas):
+        return _MARCAS.search(texto) is not None
+
+    def _traza(self, id, instancia, momento):
+        traza = self.abiertas.get(id)
+        if traza is None:
+            if len(self.abiertas) >= MAX_ABIERTAS:
+                self._cerrar(next(iter(self.abiertas)))
+            traza = self.abiertas[id] = _Traza(id, instancia)
+            notificacion = self.ultima_notificacion.get(instancia)
+            if notificacion is not None:
+                traza.marcar("notificacion", notificacion)
+        return traza
+
+    def _cerrar(self, id):
+        traza = self.abiertas.pop(id)
+        por_etapa, total = traza.latencias()
+        for etapa, segundos in por_etapa.items():
+            self.latencias[etapa].append(segundos)
+        if traza.error:
+            self.con_error += 1
+        if total is None:
+            self.incompletos += 1
+            return
+        self.completos += 1
+        self.extremo_a_extremo.append(total)
+        if self.al_cerrar is not None:
+            self.al_cerrar(traza, por_etapa, total)
+        detalle = {
+            "id": traza.id,
+            "instancia": traza.instancia,
+            "inicio": min(traza.etapas.values()).isoformat(),
+            "total": total,
+            "etapas": por_etapa,
+            "email_enviado": traza.enviado,
+            "hilo": traza.hilo,
+            "error": traza.error,
+        }
+        elemento = (total, traza.id, detalle)
+        if len(self._lentos) < self.max_lentos:
+            heapq.heappush(self._lentos, elemento)
+        elif self._lentos and total > self._lentos[0][0]:
+            heapq.heapreplace(self._lentos, elemento)
+
+    def acumular(self, entrada, texto, etiquetas):
+        instancia = entrada.get("labels", {}).get("instanceId", "")
+        momento = parsear_timestamp(entrada["timestamp"])
+
+        if _NOTIFICACION.search(texto):
+            self.ultima_notificacion[instancia] = momento
+            return
+        coincidencia = _IDS.search(texto)
+        if coincidencia:
+            for id in _ID_LISTA.findall(coincidencia.group(1)):
+                self._traza(id, instancia, momento).marcar("ids", momento)
+            return
+        coincidencia = _PROCESANDO.search(texto)
+        if coincidencia:
+            id = coincidencia.group(1) or coincidencia.group(2)
+            self._traza(id, instancia, momento).marcar("procesando", momento)
+            return
+        coincidencia = _AIRTABLE.search(texto)
+        if coincidencia:
+            id = coincidencia.group(1) or coincidencia.group(2)
+            self._traza(id, instancia, momento).marcar("airtable", momento)
+            return
+        coincidencia = _EMAIL_ID.search(texto)
+        if coincidencia:
+            id = coincidencia.group(1)
+            traza = self.abiertas.get(id)
+            if traza is not None and "email" in traza.etapas:
+                # Repetición del ID tras el envío (sendTestEmail lo vuelve a registrar)
+                return
+            anterior = self.email_pendiente.get(instancia)
+            if anterior is not None and anterior != id:
+                self.emails_sin_enlazar += 1
+            self.email_pendiente[instancia] = id
+            return
+        coincidencia = _MESSAGE_ID.search(texto)
+        if coincidencia:
+            id = self.email_pendiente.get(instancia)
+            if id:
+                traza = self._traza(id, instancia, momento)
+                traza.marcar("email", momento)
+                traza.enviado = coincidencia.group(1)
+            else:
+                self.emails_sin_enlazar += 1
+            return
+        coincidencia = _THREAD_ID.search(texto)
+        if coincidencia:
+            id = self.email_pendiente.pop(instancia, None)
+            if id in self.abiertas:
+                self.abiertas[id].hilo = coincidencia.group(1)
+            return
+        coincidencia = _ERROR.search(texto)
+        if coincidencia:
+            self._traza(coincidencia.group(1), instancia, momento).error = True
+            return
+        coincidencia = _FIN.search(texto)
+        if coincidencia and coincidencia.group(1) in self.abiertas:
+            traza = self.abiertas[coincidencia.group(1)]
+            traza.marcar("fin", momento)
+            self._cerrar(traza.id)
+
+    def cerrar_pendientes(self):
+        """Cierra las trazas que siguen abiertas al final de la ventana"""
+        for id in list(self.abiertas):
+            self._cerrar(id)
+
+    def lentos(self):
+        return [detalle for _, _, detalle in sorted(self._lentos, key=lambda e: e[0], reverse=True)]
+
+    def resumen(self):
+        self.cerrar_pendientes()
+        return {
+            **super().resumen(),
+            "mensajes": self.completos,
+            "incompletos": self.incompletos,
+            "con_error": self.con_error,
+            "emails_sin_enlazar": self.emails_sin_enlazar,
+            "etapas": {etapa: resumen_distribucion(valores) for etapa, valores in self.latencias.items()},
+            "extremo_a_extremo": resumen_distribucion(self.extremo_a_extremo),
+            "lentos": self.lentos(),
+        }
@@ -0,0 +1,269 @@
+"""Margen del límite de seguridad de ejecuciones por minuto de services/processor.js
+
+processor.js cuenta en memoria las ejecuciones (`rateLimitCount`, una por
+mensaje que llega a `incrementRateLimit`) en una ventana fija de
+RATE_LIMIT_WINDOW_MS que empieza al cargar el módulo y se reinicia en la
+primera ejecución tras caducar. Al llegar a RATE_LIMIT_MAX detiene todo el
+servicio. Como el contador es de cada instancia, lo que hace de verdad con
+varias instancias no se ve en ningún sitio; aquí se reconstruye con
+
+    Airtable: ✓ Registro creado exitosamente { emailId: '<id>' }   el mensaje va por el camino que incrementa
+    Airtable: Registro ya existe (duplicado), continuando normalmente { emailId: '<id>' }      (ídem)
+    ✓ Condición cumplida - Registro creado o duplicado … - ID: <id>                          (ídem)
+    Aplicando etiqueta "processed" (ID: …) al mensaje <id>     una ejecución, si antes hubo una de las anteriores
+    ⚠️ Límite de N ejecuciones por minuto alcanzado            la siguiente etiqueta no cuenta (sale del bucle)
+    PROCESAMIENTO DETENIDO: Límite de N ejecuciones …         lote rechazado entero por el límite
+    ✓ Contador de rate limit reseteado                         reactivación: contador a 0
+    LÍMITE DE SEGURIDAD ALCANZADO|SUPERADO: N ejecuciones …    disparos reales (contador y límite)
+    Servicio detenido automáticamente por límite de ejecuciones
+
+La etiqueta se aplica también al saltar un correo (⏭️ Saltando correo…),
+cuando el registro ya existía antes de crearlo o tras un 404, pero en esos
+caminos processor.js no llama a incrementRateLimit: solo cuenta la etiqueta
+de un mensaje que en la misma instancia creó (o encontró duplicado) su
+registro de Airtable, y se anota después de la etiqueta, justo antes del
+incremento. Las demás se cuentan aparte en "sin_registro".
+
+Con eso se simula qué habrían hecho otros límites y ventanas sobre el mismo
+tráfico, con el contador por instancia (como ahora) o compartido entre
+todas. Las ventanas de cada instancia empiezan en su primera entrada vista.
+"""
+import os
+import re
+from array import array
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+from diagnostico.config import REPO_PATH
+from diagnostico.estadistica import resumen_distribucion
+from diagnostico.logs import parsear_timestamp
+from diagnostico.motor import Analizador
+
+# Valores por defecto de processor.js, por si no se puede leer
+LIMITE = 7000
+VENTANA_SEGUNDOS = 60
+# Mensajes con registro creado a la espera de su etiqueta, por instancia
+MAX_REGISTRADOS = 1000
+
+_LIMITE_JS = re.compile(r"const RATE_LIMIT_MAX\s*=\s*([\d_]+)")
+_VENTANA_JS = re.compile(r"const RATE_LIMIT_WINDOW_MS\s*=\s*([\d_\s*]+?);")
+
+_EJECUCION = re.compile(r'Aplicando etiqueta "processed"[^\n]*? al mensaje (\S+)')
+_REGISTRO = re.compile(r"(?:Registro creado exitosamente|Registro ya existe \(duplicado\), continuando normalmente)"
+                       r"[\s\S]*?emailId:\s*'([^']+)'|Registro creado o duplicado[^\n]*?- ID: ([^\s,]+)")
+_SALIDA_BUCLE = re.compile(r"⚠\ufe0f? Límite de \d+ ejecuciones por minuto alcanzado")
+_RECHAZO = re.compile(r"PROCESAMIENTO DETENIDO: Límite de \d+ ejecuciones")
+_REINICIO = re.compile(r"Contador de rate limit reseteado")
+_DISPARO = re.compile(r"LÍMITE DE SEGURIDAD (ALCANZADO|SUPERADO): (\d+) ejecuciones[^\n]*?Límite: (\d+)")
+_PARADA = re.compile(r"Servicio detenido automáticamente por límite de ejecuciones")
+_MARCAS = re.compile(r'etiqueta "processed"|ejecuciones|rate limit reseteado|Registro creado|Registro ya existe \(dup')
+
+
+def _iso(segundos):
+    return datetime.fromtimestamp(segundos, timezone.utc).isoformat()
+
+
+def leer_processor_js(ruta=None):
+    """RATE_LIMIT_MAX y la ventana en segundos de services/processor.js"""
+    ruta = ruta or os.path.join(REPO_PATH, "services", "processor.js")
+    limite, ventana = LIMITE, VENTANA_SEGUNDOS
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            fuente = f.read()
+    except OSError:
+        return limite, ventana
+    coincidencia = _LIMITE_JS.search(fuente)
+    if coincidencia:
+        limite = int(coincidencia.group(1).replace("_", ""))
+    coincidencia = _VENTANA_JS.search(fuente)
+    if coincidencia:
+        milisegundos = 1
+        for factor in coincidencia.group(1).replace("_", "").split("*"):
+            milisegundos *= int(factor)
+        ventana = milisegundos / 1000
+    return limite, ventana
+
+
+def simular_contador(ejecuciones, inicio, reinicios, limite, ventana):
+    """Reproduce checkRateLimit/incrementRateLimit sobre instantes (segundos epoch) ordenados
+
+    Devuelve el mayor valor que alcanzó el contador y el instante de cada
+    ventana en la que habría llegado al límite. Tras un disparo se sigue
+    contando como si nadie hubiera parado el servicio, para ver cuántas
+    ventanas lo habrían disparado.
+    """
+    inicio_ventana = inicio
+    contador = 0
+    pico = 0
+    disparos = []
+    pendientes = iter(reinicios)
+    reinicio = next(pendientes, None)
+    for momento in ejecuciones:
+        while reinicio is not None and reinicio <= momento:
+            contador, inicio_ventana = 0, reinicio
+            reinicio = next(pendientes, None)
+        if momento - inicio_ventana >= ventana:
+            contador, inicio_ventana = 0, momento
+        contador += 1
+        pico = max(pico, contador)
+        if contador == limite:
+            disparos.append(momento)
+    return pico, disparos
+
+
+class _Instancia:
+    __slots__ = ("inicio", "ejecuciones", "reinicios", "saliendo", "registrados")
+
+    def __init__(self, inicio):
+        self.inicio = inicio
+        self.ejecuciones = array("d")
+        self.reinicios = []
+        self.saliendo = False
+        self.registrados = OrderedDict()  # ids con registro de Airtable cuya etiqueta aún no ha llegado
+
+
+class LimiteSeguridadAnalizador(Analizador):
+    """Ejecuciones por minuto por instancia y en total frente al RATE_LIMIT_MAX de processor.js"""
+
+    nombre = "limite"
+
+    def __init__(self, max_muestras=10, desde=None, limite=None, ventana=None, escenarios=None, processor_js=None):
+        super().__init__(max_muestras, desde)
+        leido_limite, leida_ventana = leer_processor_js(processor_js)
+        self.limite = limite or leido_limite
+        self.ventana = ventana or leida_ventana
+        # (límite, ventana en segundos) a simular además del configurado
+        self.escenarios = list(OrderedDict.fromkeys([(self.limite, self.ventana), *(escenarios or ())]))
+        self.instancias = {}
+        self.por_minuto = OrderedDict()  # "YYYY-MM-DDTHH:MM" -> Counter(instanceId -> ejecuciones)
+        self.disparos = []
+        self.paradas = 0
+        self.rechazos = 0
+        self.ignoradas = 0
+        self.sin_registro = 0
+
+    def coincide(self, entrada, texto, etiquetas):
+        # La ventana de cada instancia empieza al cargar processor.js: se anota su primera entrada sea cual sea
+        instancia = entrada.get("labels", {}).get("instanceId", "")
+        if instancia not in self.instancias and entrada.get("timestamp"):
+            self.instancias[instancia] = _Instancia(parsear_timestamp(entrada["timestamp"]).timestamp())
+        return _MARCAS.search(texto) is not None
+
+    def acumular(self, entrada, texto, etiquetas):
+        instancia = entrada.get("labels", {}).get("instanceId", "")
+        estado = self.instancias[instancia]
+        momento = parsear_timestamp(entrada["timestamp"])
+        coincidencia = _REGISTRO.search(texto)
+        if coincidencia:
+            estado.registrados[coincidencia.group(1) or coincidencia.group(2)] = None
+            if len(estado.registrados) > MAX_REGISTRADOS:
+                estado.registrados.popitem(last=False)
+            return
+        coincidencia = _EJECUCION.search(texto)
+        if coincidencia:
+            registrado = coincidencia.group(1) in estado.registrados
+            estado.registrados.pop(coincidencia.group(1), None)
+            if estado.saliendo:
+                # Etiqueta aplicada al salir del bucle por el límite: no pasa por incrementRateLimit
+                estado.saliendo = False
+                self.ignoradas += 1
+                return
+            if not registrado:
+                # Salto, registro ya existente o 404: la etiqueta se aplica sin incrementar el contador
+                self.sin_registro += 1
+                return
+            estado.ejecuciones.append(momento.timestamp())
+            self.por_minuto.setdefault(momento.strftime("%Y-%m-%dT%H:%M"), Counter())[instancia] += 1
+            return
+        if _SALIDA_BUCLE.search(texto):
+            estado.saliendo = True
+            return
+        if _REINICIO.search(texto):
+            estado.reinicios.append(momento.timestamp())
+            return
+        coincidencia = _DISPARO.search(texto)
+        if coincidencia:
+            self.disparos.append({
+                "momento": momento.isoformat(),
+                "instancia": instancia,
+                "tipo": coincidencia.group(1).lower(),
+                "contador": int(coincidencia.group(2)),
+                "limite": int(coincidencia.group(3)),
+            })
+            return
+        if _RECHAZO.search(texto):
+            self.rechazos += 1
+        elif _PARADA.search(texto):
+            self.paradas += 1
+
+    def _global(self):
+        """Instantes de todas las ejecuciones, primera entrada vista y reinicios de cualquier instancia"""
+        activas = [e for e in self.instancias.values() if e.ejecuciones]
+        if not activas:
+            return [], None, []
+        ejecuciones = sorted(t for e in activas for t in e.ejecuciones)
+        reinicios = sorted(t for e in self.instancias.values() for t in e.reinicios)
+        return ejecuciones, min(e.inicio for e in self.instancias.values()), reinicios
+
+    def simular(self, limite, ventana):
+        """Qué habría pasado con otro límite y ventana: contador por instancia (el actual) y compartido"""
+        por_instancia = {"pico": 0, "disparos": 0, "instancias_disparadas": 0, "primer_disparo": None}
+        for estado in self.instancias.values():
+            if not estado.ejecuciones:
+                continue
+            pico, disparos = simular_contador(estado.ejecuciones, estado.inicio, estado.reinicios, limite, ventana)
+            por_instancia["pico"] = max(por_instancia["pico"], pico)
+            if disparos:
+                por_instancia["disparos"] += len(disparos)
+                por_instancia["instancias_disparadas"] += 1
+                if por_instancia["primer_disparo"] is None or disparos[0] < por_instancia["primer_disparo"]:
+                    por_instancia["primer_disparo"] = disparos[0]
+        ejecuciones, inicio, reinicios = self._global()
+        pico, disparos = simular_contador(ejecuciones, inicio, reinicios, limite, ventana) if ejecuciones else (0, [])
+        compartido = {"pico": pico, "disparos": len(disparos), "primer_disparo": disparos[0] if disparos else None}
+        for resultado in (por_instancia, compartido):
+            if resultado["primer_disparo"] is not None:
+                resultado["primer_disparo"] = _iso(resultado["primer_disparo"])
+            resultado["margen"] = 1 - resultado["pico"] / limite
+        return {"limite": limite, "ventana_segundos": ventana, "por_instancia": por_instancia,
+                "compartido": compartido}
+
+    def resumen(self):
+        por_instancia = {}
+        for instancia, estado in self.instancias.items():
+            if not estado.ejecuciones:
+                continue
+            minutos = [c[instancia] for c in self.por_minuto.values() if instancia in c]
+            por_instancia[instancia] = {
+                "ejecuciones": len(estado.ejecuciones),
+                "primera": _iso(estado.ejecuciones[0]),
+                "ultima": _iso(estado.ejecuciones[-1]),
+                "minutos_activos": len(minutos),
+                "pico_minuto": max(minutos),
+                "reinicios": len(estado.reinicios),
+            }
+        por_minuto = OrderedDict(
+            (minuto, {"total": sum(c.values()), "instancias": len(c), "max_instancia": max(c.values())})
+            for minuto, c in self.por_minuto.items()
+        )
+        simulaciones = [self.simular(limite, ventana) for limite, ventana in self.escenarios]
+        actual = simulaciones[0]
+        return {
+            **super().resumen(),
+            "limite": self.limite,
+            "ventana_segundos": self.ventana,
+            "ejecuciones": sum(i["ejecuciones"] for i in por_instancia.values()),
+            "ignoradas": self.ignoradas,
+            "sin_registro": self.sin_registro,
+            "instancias": por_instancia,
+            "por_minuto": por_minuto,
+            "distribucion_instancia": resumen_distribucion(v for c in self.por_minuto.values() for v in c.values()),
+            "distribucion_global": resumen_distribucion(m["total"] for m in por_minuto.values()),
+            "disparos": list(self.disparos),
+            "paradas": self.paradas,
+            "rechazos": self.rechazos,
+            "simulaciones": simulaciones,
+            # Con el contador por instancia, cualquier límite por encima del pico real no habría disparado nunca
+            "limite_minimo_seguro": actual["por_instancia"]["pico"] + 1,
+            "limite_minimo_seguro_compartido": actual["compartido"]["pico"] + 1,
+        }
@@ -0,0 +1,201 @@
+"""Lectura paginada de logs de Cloud Run usando la API de Cloud Logging
+
+Las entradas se generan de forma perezosa, página a página, con el mismo
+formato de diccionario que devuelve `gcloud logging read --format=json`
+(textPayload, jsonPayload, timestamp, severity, labels, resource...).
+Solo se mantiene en memoria la página actual, así que la ventana puede ser
+de cualquier tamaño.
+"""
+import json
+import re
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from diagnostico.config import PROJECT, SERVICE
+from diagnostico.perfil import PERFIL
+
+TAM_PAGINA = 1000
+# Segundos que la API de tail retiene cada entrada para entregarla ordenada con las vecinas
+VENTANA_ORDEN_TAIL = 0.5
+
+# Orden numérico de las severidades de Cloud Logging, para poder comparar "severidad >= ERROR"
+SEVERIDADES = {
+    "DEFAULT": 0, "DEBUG": 100, "INFO": 200, "NOTICE": 300, "WARNING": 400,
+    "ERROR": 500, "CRITICAL": 600, "ALERT": 700, "EMERGENCY": 800,
+}
+
+_UNIDADES = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def _modulo_cloud_logging():
+    """Importa google-cloud-logging, instalándolo si no está disponible"""
+    try:
+        from google.cloud import logging as cloud_logging
+    except ImportError:
+        print("✗ Biblioteca google-cloud-logging no disponible")
+        print("Instalando...")
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "google-cloud-logging", "-q"])
+        from google.cloud import logging as cloud_logging
+        print("✓ Biblioteca instalada")
+    return cloud_logging
+
+
+@lru_cache(maxsize=None)
+def obtener_cliente(project=PROJECT):
+    """Devuelve un cliente de Cloud Logging reutilizable por proyecto"""
+    return _modulo_cloud_logging().Client(project=project)
+
+
+def parsear_duracion(texto):
+    """Convierte una duración al estilo de --freshness ("30m", "2h", "1d") en timedelta"""
+    match = re.fullmatch(r"\s*(\d+)\s*([smhd])\s*", str(texto).lower())
+    if not match:
+        raise ValueError(f"Duración no válida: {texto!r} (usa p. ej. 30m, 2h, 1d)")
+    return timedelta(**{_UNIDADES[match.group(2)]: int(match.group(1))})
+
+
+def parsear_timestamp(texto):
+    """Convierte un timestamp RFC 3339 de Cloud Logging (hasta nanosegundos) en datetime UTC"""
+    texto = texto.rstrip("Z")
+    if "+" in texto[10:]:
+        texto = texto[:10] + texto[10:].split("+", 1)[0]
+    if "." in texto:
+        base, fraccion = texto.split(".", 1)
+        texto = f"{base}.{fraccion[:6].ljust(6, '0')}"
+    else:
+        texto += ".000000"
+    return datetime.strptime(texto, "%Y-%m-%dT%H:%M:%S.%f").replace(tzinfo=timezone.utc)
+
+
+def formatear_timestamp(momento):
+    """Formatea un datetime como RFC 3339 en UTC, tal y como lo espera el filtro"""
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=timezone.utc)
+    return momento.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def inicio_ventana(freshness):
+    """Timestamp RFC 3339 del comienzo de una ventana relativa a ahora ("1h", "2h"...)"""
+    return formatear_timestamp(datetime.now(timezone.utc) - parsear_duracion(freshness))
+
+
+def filtro_servicio(service=SERVICE, extra=None):
+    """Filtro base de las entradas de un servicio de Cloud Run"""
+    filtro = f'resource.type="cloud_run_revision" AND resource.labels.service_name="{service}"'
+    if extra:
+        filtro += f" AND ({extra})"
+    return filtro
+
+
+def filtro_ventana(filtro, freshness=None, desde=None, hasta=None):
+    """Añade al filtro las restricciones de tiempo de la ventana pedida"""
+    if freshness and desde is None:
+        desde = datetime.now(timezone.utc) - parsear_duracion(freshness)
+    partes = [filtro] if filtro else []
+    if desde is not None:
+        partes.append(f'timestamp>="{formatear_timestamp(desde)}"')
+    if hasta is not None:
+        partes.append(f'timestamp<"{formatear_timestamp(hasta)}"')
+    return " AND ".join(partes)
+
+
+def texto_entrada(entrada):
+    """Texto legible de una entrada: textPayload o, si no hay, el jsonPayload serializado"""
+    texto = entrada.get("textPayload", "")
+    if not texto and entrada.get("jsonPayload"):
+        texto = json.dumps(entrada["jsonPayload"], ensure_ascii=False)
+    return texto or ""
+
+
+def iterar_entradas(filtro=None, project=PROJECT, freshness="1h", desde=None, hasta=None,
+                    orden="asc", tam_pagina=TAM_PAGINA, max_entradas=None, client=None):
+    """Genera las entradas de la ventana una a una, pidiendo páginas bajo demanda
+
+    Por defecto devuelve la última hora del servicio en orden cronológico.
+    El paginador de la API sigue los page tokens por nosotros y solo pide la
+    siguiente página cuando se consume la anterior; `max_entradas` corta la
+    lectura sin descargar más páginas de las necesarias. Sin `client`, si el
+    demonio local (diagnostico/demonio.py) está en marcha la consulta se le
+    delega; si falla antes de entregar la primera entrada se repite con un
+    cliente propio.
+    """
+    if filtro is None:
+        filtro = filtro_servicio()
+    if max_entradas is not None:
+        if max_entradas <= 0:
+            return
+        tam_pagina = min(tam_pagina, max_entradas)
+    if client is None:
+        # Con el demonio local en marcha se usa su cliente ya autenticado en vez de crear otro
+        from diagnostico import demonio
+
+        if demonio.disponible():
+            entregadas = 0
+            try:
+                for entrada in PERFIL.flujo("demonio", demonio.entradas(filtro, project, freshness, desde, hasta,
+                                                                        orden, max_entradas, tam_pagina)):
+                    yield entrada
+                    entregadas += 1
+                return
+            except (OSError, RuntimeError, ValueError):
+                # Con entradas ya entregadas no se puede repetir la consulta sin duplicarlas
+                if entregadas:
+                    raise
+                # Demonio en marcha pero fallando: se sigue con un cliente propio
+    cloud_logging = _modulo_cloud_logging()
+    client = client or obtener_cliente(project)
+    filtro = filtro_ventana(filtro, freshness, desde, hasta)
+    entries = client.list_entries(
+        resource_names=[f"projects/{project}"],
+        filter_=filtro,
+        order_by=cloud_logging.DESCENDING if orden == "desc" else cloud_logging.ASCENDING,
+        page_size=tam_pagina,
+    )
+    if PERFIL.activo:
+        entradas = PERFIL.consulta(filtro, project, entries)
+    else:
+        entradas = (entry.to_api_repr() for entry in entries)
+    total = 0
+    for entrada in entradas:
+        yield entrada
+        total += 1
+        if max_entradas is not None and total >= max_entradas:
+            return
+
+
+def seguir_entradas(filtro=None, project=PROJECT, ventana_orden=VENTANA_ORDEN_TAIL, client=None, al_abrir=None):
+    """Genera las entradas nuevas según Cloud Logging las ingiere, con la API de tail (streaming gRPC)
+
+    No hay sondeo: el servidor empuja cada entrada tras `ventana_orden`
+    segundos de espera para ordenarla con las vecinas. Bloquea entre
+    entradas y termina cuando el servidor cierra la sesión (dura como mucho
+    una hora). Lanza RuntimeError si el cliente usa la API HTTP, que no
+    tiene tail.
+
+    `al_abrir` recibe, nada más abrirse la sesión, una función que cancela el
+    stream; se puede llamar desde otro hilo para desbloquear al que lee.
+    """
+    _modulo_cloud_logging()
+    from google.cloud.logging_v2._gapic import _parse_log_entry
+    from google.cloud.logging_v2.types import LogEntry, TailLogEntriesRequest
+
+    client = client or obtener_cliente(project)
+    gapic = getattr(client.logging_api, "_gapic_api", None)
+    if gapic is None:
+        raise RuntimeError("El cliente de Cloud Logging no usa gRPC: la API de tail no está disponible")
+    peticion = TailLogEntriesRequest(resource_names=[f"projects/{project}"], filter=filtro or filtro_servicio(),
+                                     buffer_window=timedelta(seconds=ventana_orden))
+    respuestas = gapic.tail_log_entries(requests=iter([peticion]))
+    cancelar = getattr(respuestas, "cancel", None)
+    if al_abrir and cancelar:
+        al_abrir(cancelar)
+    try:
+        for respuesta in respuestas:
+            for entry in respuesta.entries:
+                yield _parse_log_entry(LogEntry.pb(entry))
+    finally:
+        # Cierra el stream si quien consume deja de leer antes de que acabe la sesión
+        if cancelar:
+            cancelar()
@@ -0,0 +1,259 @@
+"""Lectura de paquetes de diagnóstico grandes con mmap y decodificación perezosa
+
+Un paquete NDJSON sin comprimir se proyecta en memoria y solo se decodifican
+las líneas que una consulta necesita: los recuentos y filtros descartan por
+bytes antes de hacer json.loads, y `cola` lee desde el final del fichero
+sin recorrerlo desde el principio. El índice de desplazamientos (posición
+de cada entrada y su sección) se construye solo cuando se pide acceso
+aleatorio.
+
+Los paquetes comprimidos o en el formato JSON antiguo se convierten una vez
+a NDJSON plano en la caché local con `preparar_mapeo`.
+"""
+import json
+import mmap
+import os
+import shutil
+from array import array
+from itertools import groupby
+
+from diagnostico.bundle import FORMATO, VERSION, EscritorBundle, LectorBundle, abrir_bundle, abrir_texto
+from diagnostico.config import CACHE_DIR
+
+_SECCION = b'{"_seccion"'
+_FIN_SECCION = b'{"_fin_seccion"'
+_LARGO_MARCA = len(_FIN_SECCION)
+
+
+def preparar_mapeo(ruta, directorio=CACHE_DIR):
+    """Devuelve la ruta de un NDJSON plano equivalente a `ruta`, convirtiéndolo si hace falta"""
+    if not ruta.endswith((".gz", ".zst")):
+        try:
+            LectorBundle(ruta).cerrar()
+            return ruta
+        except ValueError:
+            pass
+    base = os.path.basename(ruta)
+    for extension in (".gz", ".zst"):
+        if base.endswith(extension):
+            base = base[:-len(extension)]
+    if not base.endswith(".ndjson"):
+        base += ".ndjson"
+    destino = os.path.join(directorio, base)
+    if os.path.exists(destino) and os.path.getmtime(destino) >= os.path.getmtime(ruta):
+        return destino
+
+    os.makedirs(directorio, exist_ok=True)
+    temporal = destino + ".tmp"
+    with abrir_bundle(ruta) as origen:
+        if isinstance(origen, LectorBundle):
+            # Ya es NDJSON: basta con descomprimir
+            origen.cerrar()
+            with abrir_texto(ruta, "r") as f, open(temporal, "w", encoding="utf-8") as g:
+                shutil.copyfileobj(f, g)
+        else:
+            metadatos = {k: v for k, v in origen.cabecera.items() if k not in ("formato", "version")}
+            with EscritorBundle(temporal, origen_legado=os.path.basename(ruta), **metadatos) as escritor:
+                for tipo, grupo in groupby(origen.registros(), key=lambda registro: registro[0]):
+                    info = origen.secciones[tipo]
+                    escritor.seccion(tipo, info["descripcion"], (entrada for _, entrada in grupo),
+                                     info.get("filtro"), info.get("error", ""))
+                for tipo, info in origen.secciones.items():
+                    if not info["total"]:
+                        escritor.seccion(tipo, info["descripcion"], [], info.get("filtro"), info.get("error", ""))
+    os.replace(temporal, destino)
+    return destino
+
+
+class BundleMapeado:
+    """Paquete NDJSON sin comprimir proyectado en memoria"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._f = open(ruta, "rb")
+        if os.fstat(self._f.fileno()).st_size == 0:
+            self._f.close()
+            raise ValueError(f"{ruta} está vacío")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        fin = self._fin_linea(0)
+        try:
+            self.cabecera = json.loads(self._mm[:fin])
+        except ValueError:
+            self.cerrar()
+            raise ValueError(f"{ruta} no es un paquete {FORMATO}")
+        if not isinstance(self.cabecera, dict) or self.cabecera.get("formato") != FORMATO:
+            self.cerrar()
+            raise ValueError(f"{ruta} no es un paquete {FORMATO}")
+        if self.cabecera.get("version", 0) > VERSION:
+            self.cerrar()
+            raise ValueError(f"Versión de paquete no soportada: {self.cabecera.get('version')}")
+        self._inicio_datos = fin + 1
+        self.secciones = {}
+        self._offsets = None
+        self._tipos = None
+        self._nombres_tipos = []
+
+    def cerrar(self):
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _fin_linea(self, inicio):
+        fin = self._mm.find(b"\n", inicio)
+        return len(self._mm) if fin == -1 else fin
+
+    def _lineas(self):
+        """Genera (inicio, fin) de cada línea tras la cabecera, de principio a fin"""
+        mm = self._mm
+        inicio = self._inicio_datos
+        total = len(mm)
+        while inicio < total:
+            fin = mm.find(b"\n", inicio)
+            if fin == -1:
+                fin = total
+            if fin > inicio:
+                yield inicio, fin
+            inicio = fin + 1
+
+    def _lineas_inversas(self):
+        """Genera (inicio, fin) de cada línea tras la cabecera, del final al principio"""
+        mm = self._mm
+        fin = len(mm)
+        while fin > self._inicio_datos:
+            inicio = mm.rfind(b"\n", self._inicio_datos, fin) + 1
+            if inicio == 0:
+                inicio = self._inicio_datos
+            if fin > inicio:
+                yield inicio, fin
+            fin = inicio - 1
+
+    def _marca(self, inicio, fin):
+        """Tipo de línea: 1 apertura de sección, -1 cierre de sección, 0 entrada"""
+        if fin - inicio < _LARGO_MARCA or self._mm[inicio + 2] != 0x5F:  # '{"_'
+            return 0
+        prefijo = self._mm[inicio:inicio + _LARGO_MARCA]
+        if prefijo.startswith(_SECCION):
+            return 1
+        if prefijo == _FIN_SECCION:
+            return -1
+        return 0
+
+    def _info_marca(self, inicio, fin, clave):
+        info = json.loads(self._mm[inicio:fin])[clave]
+        self.secciones.setdefault(info["tipo"], {}).update(info)
+        return info["tipo"]
+
+    def _recorrer(self, inverso=False):
+        """Genera (tipo, inicio, fin) de las entradas sin decodificarlas"""
+        tipo = None
+        if inverso:
+            for inicio, fin in self._lineas_inversas():
+                marca = self._marca(inicio, fin)
+                if marca == -1:
+                    tipo = self._info_marca(inicio, fin, "_fin_seccion")
+                elif marca == 1:
+                    self._info_marca(inicio, fin, "_seccion")
+                    tipo = None
+                else:
+                    yield tipo, inicio, fin
+        else:
+            for inicio, fin in self._lineas():
+                marca = self._marca(inicio, fin)
+                if marca == 1:
+                    tipo = self._info_marca(inicio, fin, "_seccion")
+                elif marca == -1:
+                    self._info_marca(inicio, fin, "_fin_seccion")
+                    tipo = None
+                else:
+                    yield tipo, inicio, fin
+
+    def _contiene(self, contiene, inicio, fin):
+        """¿La línea contiene alguno de los fragmentos de bytes? (None acepta todas)"""
+        if contiene is None:
+            return True
+        if isinstance(contiene, bytes):
+            return self._mm.find(contiene, inicio, fin) != -1
+        return any(self._mm.find(fragmento, inicio, fin) != -1 for fragmento in contiene)
+
+    def _seleccion(self, tipo, contiene, predicado, inverso):
+        """Genera (tipo, entrada) que cumplen el filtro
+
+        `contiene` (bytes o tupla de bytes) descarta líneas sin decodificarlas;
+        `predicado` se aplica después sobre la entrada ya decodificada.
+        """
+        mm = self._mm
+        for seccion, inicio, fin in self._recorrer(inverso):
+            if tipo is not None and seccion != tipo:
+                continue
+            if not self._contiene(contiene, inicio, fin):
+                continue
+            entrada = json.loads(mm[inicio:fin])
+            if predicado is None or predicado(entrada):
+                yield seccion, entrada
+
+    def registros(self, inverso=False):
+        """Genera (tipo_de_sección, entrada) decodificando cada entrada según se pide"""
+        return self._seleccion(None, None, None, inverso)
+
+    def entradas(self, tipo=None, contiene=None, predicado=None, inverso=False):
+        for _, entrada in self._seleccion(tipo, contiene, predicado, inverso):
+            yield entrada
+
+    def contar(self, tipo=None, contiene=None, predicado=None):
+        """Cuenta entradas; sin `predicado` no decodifica ninguna"""
+        if predicado is not None:
+            return sum(1 for _ in self._seleccion(tipo, contiene, predicado, False))
+        total = 0
+        for seccion, inicio, fin in self._recorrer():
+            if tipo is not None and seccion != tipo:
+                continue
+            if self._contiene(contiene, inicio, fin):
+                total += 1
+        return total
+
+    def cola(self, n, tipo=None, contiene=None, predicado=None):
+        """Las últimas `n` entradas que cumplen el filtro, en orden del fichero, leyendo desde el final"""
+        resultado = []
+        if n <= 0:
+            return resultado
+        for entrada in self.entradas(tipo, contiene, predicado, inverso=True):
+            resultado.append(entrada)
+            if len(resultado) >= n:
+                break
+        resultado.reverse()
+        return resultado
+
+    def indexar(self):
+        """Construye el índice de desplazamientos de todas las entradas (una sola pasada, sin decodificar)"""
+        if self._offsets is not None:
+            return len(self._offsets)
+        offsets = array("q")
+        tipos = array("H")
+        nombres = {}
+        for seccion, inicio, _ in self._recorrer():
+            offsets.append(inicio)
+            tipos.append(nombres.setdefault(seccion, len(nombres)))
+        self._offsets = offsets
+        self._tipos = tipos
+        self._nombres_tipos = list(nombres)
+        return len(offsets)
+
+    def __len__(self):
+        return self.indexar()
+
+    def __getitem__(self, i):
+        """Entrada i-ésima (admite índices negativos) decodificada bajo demanda"""
+        self.indexar()
+        inicio = self._offsets[i]
+        return json.loads(self._mm[inicio:self._fin_linea(inicio)])
+
+    def tipo(self, i):
+        self.indexar()
+        return self._nombres_tipos[self._tipos[i]]
@@ -0,0 +1,124 @@
+"""Motor de análisis de una sola pasada
+
+Descarga la ventana una vez y reparte cada entrada entre todos los
+analizadores registrados, en lugar de repetir la consulta por sección.
+Cada entrada se clasifica una sola vez y los analizadores reciben su texto
+y su conjunto de etiquetas ya calculados. Con `ensamblar=True` (flujos en
+orden cronológico) los console.log partidos en varias entradas se reúnen
+antes en un único evento.
+"""
+import time
+from collections import deque
+
+from diagnostico.clasificador import Clasificador
+from diagnostico.ensamblado import ensamblar as ensamblar_eventos
+from diagnostico.logs import texto_entrada
+from diagnostico.perfil import PERFIL
+
+
+class Analizador:
+    """Base de los analizadores: cuenta las entradas que coinciden y guarda las últimas de muestra"""
+
+    nombre = "analizador"
+
+    def __init__(self, max_muestras=10, desde=None):
+        self.max_muestras = max_muestras
+        # Timestamp RFC 3339 mínimo; permite que un analizador mire solo parte de la ventana
+        self.desde = desde
+        self.vistos = 0
+        self.total = 0
+        self.muestras = deque(maxlen=max_muestras)
+
+    def coincide(self, entrada, texto, etiquetas):
+        """Indica si la entrada interesa a este analizador"""
+        raise NotImplementedError
+
+    def acumular(self, entrada, texto, etiquetas):
+        """Gancho para acumular estadísticas propias de cada analizador"""
+
+    def consumir(self, entrada, texto, etiquetas):
+        if self.desde and entrada.get("timestamp", "") < self.desde:
+            return
+        self.vistos += 1
+        if not self.coincide(entrada, texto, etiquetas):
+            return
+        self.total += 1
+        self.muestras.append(entrada)
+        self.acumular(entrada, texto, etiquetas)
+
+    def recientes(self, muestras=None):
+        """Muestras de la más reciente a la más antigua (el flujo llega en orden cronológico)"""
+        return list(reversed(self.muestras if muestras is None else muestras))
+
+    def resumen(self):
+        return {"nombre": self.nombre, "vistos": self.vistos, "total": self.total}
+
+
+class Motor:
+    """Reparte un único flujo de entradas entre varios analizadores"""
+
+    def __init__(self, analizadores=None, clasificador=None, ensamblar=False):
+        self.analizadores = list(analizadores or [])
+        self.clasificador = clasificador or Clasificador()
+        self.ensamblar = ensamblar
+        self.total = 0
+        self.fragmentos = 0
+
+    def registrar(self, analizador):
+        self.analizadores.append(analizador)
+        return analizador
+
+    def ejecutar(self, entradas):
+        """Consume el generador de entradas en una sola pasada y devuelve cuántos eventos se procesaron"""
+        analizadores = self.analizadores
+        clasificar = self.clasificador.clasificar
+        if self.ensamblar:
+            entradas = PERFIL.flujo("ensamblado", ensamblar_eventos(PERFIL.flujo("lectura", entradas)))
+        if PERFIL.activo:
+            return self._ejecutar_medido(entradas)
+        for entrada in entradas:
+            self.total += 1
+            self.fragmentos += entrada.get("_fragmentos", 1)
+            texto = texto_entrada(entrada)
+            etiquetas = clasificar(entrada, texto)
+            for analizador in analizadores:
+                analizador.consumir(entrada, texto, etiquetas)
+        return self.total
+
+    def _ejecutar_medido(self, entradas):
+        """Igual que `ejecutar`, pero midiendo el texto + clasificación y cada analizador"""
+        clasificar = self.clasificador.clasificar
+        claves = []
+        for analizador in self.analizadores:
+            clave = analizador.nombre
+            while clave in claves:
+                clave += "+"
+            claves.append(clave)
+        tiempos = [0.0] * len(self.analizadores)
+        eventos = 0
+        segundos_clasificar = 0.0
+        reloj = time.perf_counter
+        for entrada in entradas:
+            eventos += 1
+            self.total += 1
+            self.fragmentos += entrada.get("_fragmentos", 1)
+            inicio = reloj()
+            texto = texto_entrada(entrada)
+            etiquetas = clasificar(entrada, texto)
+            segundos_clasificar += reloj() - inicio
+            for i, analizador in enumerate(self.analizadores):
+                inicio = reloj()
+                analizador.consumir(entrada, texto, etiquetas)
+                tiempos[i] += reloj() - inicio
+        PERFIL.motor["eventos"] += eventos
+        PERFIL.motor["clasificar_segundos"] += segundos_clasificar
+        for clave, analizador, segundos in zip(claves, self.analizadores, tiempos):
+            PERFIL.analizador(clave, segundos, analizador.vistos, analizador.total)
+        return self.total
+
+    def resumen(self):
+        return {
+            "total": self.total,
+            "fragmentos": self.fragmentos,
+            "analizadores": {a.nombre: a.resumen() for a in self.analizadores},
+        }
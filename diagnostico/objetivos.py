@@ -0,0 +1,216 @@
+"""Objetivos de diagnóstico (proyecto × servicio × región) y consulta concurrente de todos ellos
+
+Los objetivos se leen de diagnostico_objetivos.json en la raíz del repo (o
+del fichero que indique MFS_DIAG_OBJETIVOS), con una lista explícita, una
+matriz o ambas:
+
+    {
+      "objetivos": [{"nombre": "produccion", "project": "check-in-sf",
+                     "service": "mfs-lead-generation-ai", "region": "us-central1"}],
+      "matriz": {"projects": ["..."], "services": ["..."], "regions": ["..."]}
+    }
+
+Sin fichero el único objetivo es el de diagnostico/config.py. Hay un
+ejemplo en diagnostico_objetivos.ejemplo.json.
+
+`ConsultaObjetivos` lanza la misma consulta contra todos los objetivos a
+la vez y mezcla los resultados en un único flujo ordenado por timestamp.
+Cada objetivo lee sus páginas de forma perezosa en un hilo; un semáforo
+limita cuántas peticiones a la API hay en vuelo en total y una cola
+pequeña por objetivo frena al que va por delante de la mezcla. El error de
+un objetivo se anota y no corta el resto.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import os
+from collections import deque, namedtuple
+
+from diagnostico.config import OBJETIVOS_PATH, PROJECT, REGION, SERVICE
+from diagnostico.logs import filtro_servicio, iterar_entradas
+
+CONCURRENCIA = 4
+TAM_LOTE = 500
+LOTES_EN_COLA = 2
+
+Objetivo = namedtuple("Objetivo", "nombre project service region")
+
+_FIN = object()
+
+
+def objetivo_por_defecto():
+    return Objetivo("predeterminado", PROJECT, SERVICE, REGION)
+
+
+def cargar_objetivos(ruta=None):
+    """Lista de objetivos del fichero de configuración (sin repetidos, en el orden declarado)"""
+    ruta = ruta or os.environ.get("MFS_DIAG_OBJETIVOS") or OBJETIVOS_PATH
+    if not os.path.exists(ruta):
+        return [objetivo_por_defecto()]
+    with open(ruta, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    objetivos = []
+    for o in datos.get("objetivos", []):
+        project = o.get("project", PROJECT)
+        service = o.get("service", SERVICE)
+        region = o.get("region", REGION)
+        objetivos.append(Objetivo(o.get("nombre") or f"{project}/{service}/{region}", project, service, region))
+    matriz = datos.get("matriz")
+    if matriz:
+        for project, service, region in itertools.product(
+            matriz.get("projects", [PROJECT]), matriz.get("services", [SERVICE]), matriz.get("regions", [REGION])
+        ):
+            objetivos.append(Objetivo(f"{project}/{service}/{region}", project, service, region))
+    unicos = {}
+    for objetivo in objetivos:
+        unicos.setdefault((objetivo.project, objetivo.service, objetivo.region), objetivo)
+    return list(unicos.values()) or [objetivo_por_defecto()]
+
+
+def seleccionar_objetivos(nombres=None, ruta=None):
+    """Objetivos cuyo nombre, proyecto o servicio coincide con alguno de `nombres` (todos si no se indica)"""
+    objetivos = cargar_objetivos(ruta)
+    if not nombres or "todos" in nombres:
+        return objetivos
+    elegidos = [o for o in objetivos if {o.nombre, o.project, o.service} & set(nombres)]
+    if not elegidos:
+        disponibles = ", ".join(o.nombre for o in objetivos)
+        raise ValueError(f"Ningún objetivo coincide con {', '.join(nombres)} (disponibles: {disponibles})")
+    return elegidos
+
+
+def filtro_objetivo(objetivo, extra=None):
+    """Filtro del servicio del objetivo restringido a su región"""
+    filtro = filtro_servicio(objetivo.service, f'resource.labels.location="{objetivo.region}"')
+    if extra:
+        filtro += f" AND ({extra})"
+    return filtro
+
+
+def _siguiente_lote(iterador, tam):
+    return list(itertools.islice(iterador, tam))
+
+
+async def _producir(objetivo, cola, semaforo, extra, freshness, desde, hasta, tam_lote):
+    """Lee las páginas del objetivo bajo el semáforo global y las deja en su cola por lotes"""
+    try:
+        iterador = iter(iterar_entradas(filtro_objetivo(objetivo, extra), project=objetivo.project,
+                                        freshness=freshness, desde=desde, hasta=hasta, orden="asc"))
+        while True:
+            async with semaforo:
+                lote = await asyncio.to_thread(_siguiente_lote, iterador, tam_lote)
+            if not lote:
+                break
+            for entrada in lote:
+                entrada["_objetivo"] = objetivo.nombre
+            await cola.put(lote)
+        await cola.put(_FIN)
+    except Exception as e:
+        await cola.put(e)
+
+
+class ConsultaObjetivos:
+    """Misma consulta contra varios objetivos, mezclada en orden cronológico"""
+
+    def __init__(self, objetivos, extra=None, freshness="1h", desde=None, hasta=None,
+                 concurrencia=CONCURRENCIA, tam_lote=TAM_LOTE):
+        self.objetivos = list(objetivos)
+        self.extra = extra
+        self.freshness = freshness
+        self.desde = desde
+        self.hasta = hasta
+        self.concurrencia = concurrencia
+        self.tam_lote = tam_lote
+        self.totales = {o.nombre: 0 for o in self.objetivos}
+        self.errores = {}
+
+    async def lotes(self):
+        """Generador asíncrono de listas de entradas ya mezcladas en orden de timestamp"""
+        semaforo = asyncio.Semaphore(self.concurrencia)
+        colas = [asyncio.Queue(maxsize=LOTES_EN_COLA) for _ in self.objetivos]
+        tareas = [
+            asyncio.create_task(_producir(objetivo, cola, semaforo, self.extra, self.freshness, self.desde,
+                                          self.hasta, self.tam_lote))
+            for objetivo, cola in zip(self.objetivos, colas)
+        ]
+        buffers = [deque() for _ in self.objetivos]
+        monticulo = []
+        secuencia = itertools.count()
+
+        async def rellenar(i):
+            """Trae el siguiente lote del objetivo i; devuelve False si ya terminó"""
+            while not buffers[i]:
+                lote = await colas[i].get()
+                if lote is _FIN:
+                    return False
+                if isinstance(lote, Exception):
+                    self.errores[self.objetivos[i].nombre] = str(lote)
+                    return False
+                buffers[i].extend(lote)
+            entrada = buffers[i][0]
+            heapq.heappush(monticulo, (entrada.get("timestamp", ""), next(secuencia), i))
+            return True
+
+        try:
+            for i in range(len(self.objetivos)):
+                await rellenar(i)
+            salida = []
+            while monticulo:
+                _, _, i = heapq.heappop(monticulo)
+                salida.append(buffers[i].popleft())
+                self.totales[self.objetivos[i].nombre] += 1
+                if buffers[i]:
+                    heapq.heappush(monticulo, (buffers[i][0].get("timestamp", ""), next(secuencia), i))
+                    continue
+                # Hay que esperar al objetivo: se entrega antes lo ya mezclado
+                if salida:
+                    yield salida
+                    salida = []
+                await rellenar(i)
+            if salida:
+                yield salida
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+
+    def _comprobar_errores(self):
+        if self.errores and len(self.errores) == len(self.objetivos):
+            raise RuntimeError("; ".join(f"{nombre}: {error}" for nombre, error in self.errores.items()))
+
+    async def entradas_async(self):
+        """Generador asíncrono de las entradas mezcladas, para usar desde un bucle de eventos en marcha"""
+        async for lote in self.lotes():
+            for entrada in lote:
+                yield entrada
+        self._comprobar_errores()
+
+    def entradas(self):
+        """Versión síncrona para el Motor: las lecturas siguen solapándose en segundo plano
+
+        Avanza `lotes` lote a lote en un bucle de eventos propio, así que no
+        puede llamarse desde un bucle en marcha (ahí, `entradas_async`).
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("ConsultaObjetivos.entradas() dentro de un bucle de eventos: usa entradas_async()")
+        bucle = asyncio.new_event_loop()
+        lotes = self.lotes()
+        try:
+            while True:
+                try:
+                    lote = bucle.run_until_complete(lotes.__anext__())
+                except StopAsyncIteration:
+                    break
+                yield from lote
+            self._comprobar_errores()
+        finally:
+            bucle.run_until_complete(lotes.aclose())
+            bucle.close()
+
+    def resumen(self):
+        return {"totales": dict(self.totales), "errores": dict(self.errores)}
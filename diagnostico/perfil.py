@@ -0,0 +1,184 @@
+"""Instrumentación de los propios scripts de diagnóstico
+
+Cuando una ejecución va lenta no se sabe si el tiempo se va en arrancar
+`gcloud`, en las idas y vueltas a la API, en convertir las entradas o en
+los analizadores. Con el perfil activado se anota:
+
+    comandos       cada sonda (gcloud, git...): segundos, bytes de salida y si terminó bien
+    consultas      cada consulta a Cloud Logging: entradas, bytes, espera de la API y conversión
+    flujos         cada fuente de entradas (bundle, caché, objetivos): entradas y segundos produciéndolas
+    motor          texto + clasificación y tiempo de cada analizador
+    etapas         bloques con nombre medidos con `with PERFIL.etapa(...)`
+
+y al salir se guarda en auto_logs/perfil_<script>.json (junto a
+status.json) y, si se pidió, el volcado de cProfile en perfil_<script>.prof
+(`python -m pstats` o snakeviz para verlo).
+
+Se activa con --perfil / --cprofile en los scripts de análisis o con la
+variable de entorno MFS_DIAG_PERFIL=1 (o =cprofile) en cualquiera. Apagado,
+cada punto de medida es una comprobación de `PERFIL.activo` y nada más.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from diagnostico.config import LOGS_DIR
+
+_NULO = nullcontext()
+
+
+def _medida():
+    return {"entradas": 0, "segundos": 0.0}
+
+
+class Perfil:
+    """Acumulador de tiempos, bytes y recuentos de una ejecución"""
+
+    def __init__(self):
+        self.activo = False
+        self.script = None
+        self.directorio = LOGS_DIR
+        self._lock = threading.Lock()
+        self._perfilador = None
+        self._inicio = None
+        self._inicio_fecha = None
+        self.comandos = []
+        self.consultas = []
+        self.flujos = {}
+        self.etapas = {}
+        self.motor = {"eventos": 0, "clasificar_segundos": 0.0, "analizadores": {}}
+
+    def activar(self, script=None, cprofile=False, directorio=None):
+        """Empieza a medir y programa el guardado del perfil al terminar el proceso"""
+        if self.activo:
+            return
+        self.activo = True
+        self.script = script or os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+        self.directorio = directorio or self.directorio
+        self._inicio = time.perf_counter()
+        self._inicio_fecha = datetime.now(timezone.utc).isoformat()
+        if cprofile:
+            import cProfile
+
+            self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+        atexit.register(self.guardar)
+
+    def etapa(self, nombre):
+        """Context manager que suma la duración del bloque a la etapa `nombre`"""
+        return self._etapa(nombre) if self.activo else _NULO
+
+    @contextmanager
+    def _etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.etapas[nombre] = self.etapas.get(nombre, 0.0) + time.perf_counter() - inicio
+
+    def comando(self, cmd, resultado):
+        """Anota una sonda ya terminada (resultado con el formato de ejecutar_comando)"""
+        with self._lock:
+            self.comandos.append({
+                "comando": cmd if isinstance(cmd, str) else " ".join(cmd),
+                "segundos": resultado["duration"],
+                "bytes": len(resultado["output"].encode("utf-8")) + len(resultado["error"].encode("utf-8")),
+                "exito": resultado["success"],
+            })
+
+    def consulta(self, filtro, project, entries):
+        """Convierte las entradas de una consulta a Cloud Logging midiendo la API y la conversión"""
+        registro = {"project": project, "filtro": filtro, "entradas": 0, "bytes": 0, "paginas": 0,
+                    "api_segundos": 0.0, "conversion_segundos": 0.0, "segundos": 0.0}
+        with self._lock:
+            self.consultas.append(registro)
+        inicio = time.perf_counter()
+        iterador = iter(entries)
+        try:
+            while True:
+                marca = time.perf_counter()
+                try:
+                    entry = next(iterador)
+                except StopIteration:
+                    registro["api_segundos"] += time.perf_counter() - marca
+                    return
+                convertida = time.perf_counter()
+                registro["api_segundos"] += convertida - marca
+                entrada = entry.to_api_repr()
+                registro["conversion_segundos"] += time.perf_counter() - convertida
+                registro["entradas"] += 1
+                # Tamaño aproximado: el de la entrada serializada como la devuelve gcloud
+                registro["bytes"] += len(json.dumps(entrada, ensure_ascii=False, default=str).encode("utf-8"))
+                yield entrada
+        finally:
+            registro["segundos"] = time.perf_counter() - inicio
+            registro["paginas"] = getattr(entries, "page_number", 0)
+
+    def flujo(self, nombre, entradas):
+        """Envuelve un generador de entradas y suma el tiempo que pasa produciéndolas"""
+        if not self.activo:
+            return entradas
+        return self._flujo(nombre, entradas)
+
+    def _flujo(self, nombre, entradas):
+        with self._lock:
+            medida = self.flujos.setdefault(nombre, _medida())
+        iterador = iter(entradas)
+        while True:
+            marca = time.perf_counter()
+            try:
+                entrada = next(iterador)
+            except StopIteration:
+                medida["segundos"] += time.perf_counter() - marca
+                return
+            medida["segundos"] += time.perf_counter() - marca
+            medida["entradas"] += 1
+            yield entrada
+
+    def analizador(self, nombre, segundos, vistos, total):
+        medida = self.motor["analizadores"].setdefault(nombre, {"segundos": 0.0, "vistos": 0, "total": 0})
+        medida["segundos"] += segundos
+        medida["vistos"] = vistos
+        medida["total"] = total
+
+    def resumen(self):
+        return {
+            "script": self.script,
+            "inicio": self._inicio_fecha,
+            "segundos": time.perf_counter() - self._inicio if self._inicio is not None else None,
+            "comandos": self.comandos,
+            "consultas": self.consultas,
+            "flujos": self.flujos,
+            "motor": self.motor,
+            "etapas": self.etapas,
+        }
+
+    def guardar(self):
+        """Escribe perfil_<script>.json (y .prof con cProfile); devuelve la ruta del JSON"""
+        if not self.activo:
+            return None
+        base = os.path.join(self.directorio, f"perfil_{self.script}")
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            if self._perfilador is not None:
+                self._perfilador.disable()
+                self._perfilador.dump_stats(base + ".prof")
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump(self.resumen(), f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠ No se pudo guardar el perfil: {e}", file=sys.stderr)
+            return None
+        return base + ".json"
+
+
+PERFIL = Perfil()
+
+_modo = os.environ.get("MFS_DIAG_PERFIL", "").strip().lower()
+if _modo and _modo not in ("0", "no", "false"):
+    PERFIL.activar(cprofile=_modo == "cprofile")
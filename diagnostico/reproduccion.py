@@ -0,0 +1,209 @@
+"""Reproducción offline de logs guardados, a velocidad real, acelerada o máxima
+
+Para ajustar los analizadores durante una incidencia sin gastar cuota de
+Cloud Logging, las entradas de un paquete guardado se vuelven a emitir en
+orden de timestamp respetando (o comprimiendo) los huecos entre ellas:
+
+    velocidad=1      tiempo real: 10 minutos de logs tardan 10 minutos
+    velocidad=60     un minuto de reloj por hora de logs
+    velocidad=None   sin esperas (máxima velocidad)
+
+Admite los paquetes de diagnóstico (NDJSON o el JSON antiguo, con las
+mismas reglas que `entradas_bundle`), la salida de `gcloud logging read
+--format=json` (una lista de entradas), las exportaciones de sinks (una
+entrada JSON por línea, .gz incluido) y directorios con cualquiera de
+ellos. Varios ficheros se mezclan por timestamp y los insertId repetidos se
+descartan. La lista de gcloud viene de la más reciente a la más antigua y
+ya está entera en memoria, así que se ordena; en las exportaciones NDJSON
+un búfer acotado corrige el desorden local.
+
+`entradas()` es un generador síncrono como `iterar_entradas` y
+`entradas_async()` uno asíncrono como `Seguidor.entradas`, así que el
+Motor y seguir_logs.py los consumen sin cambios.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from datetime import timedelta
+
+from diagnostico.bundle import FORMATO, abrir_texto
+from diagnostico.fuentes import entradas_bundle
+from diagnostico.logs import formatear_timestamp, parsear_timestamp
+from diagnostico.seguimiento import IdsRecientes
+
+TAM_REORDEN = 10000
+_EXTENSIONES = (".json", ".ndjson", ".jsonl", ".json.gz", ".ndjson.gz", ".jsonl.gz", ".ndjson.zst")
+
+
+def _es_exportacion(ruta):
+    """True si el fichero es una lista de entradas o un NDJSON de entradas y no un paquete de diagnóstico"""
+    with abrir_texto(ruta, "r") as f:
+        primera = f.readline().strip()
+    if primera.startswith("["):
+        return True
+    try:
+        registro = json.loads(primera)
+    except ValueError:
+        # El JSON antiguo ocupa varias líneas: su primera no se puede decodificar sola
+        return False
+    return isinstance(registro, dict) and registro.get("formato") != FORMATO and "logs" not in registro
+
+
+def _clave_orden(entrada):
+    return entrada.get("timestamp", ""), entrada.get("insertId", "")
+
+
+def _entradas_exportadas(ruta, tam_reorden=TAM_REORDEN, contador=None):
+    """Entradas en orden de timestamp de una lista JSON (gcloud logging read) o de un NDJSON de entradas (sinks)
+
+    La lista se ordena entera por (timestamp, insertId): gcloud la devuelve
+    de la más reciente a la más antigua, un desorden que ningún búfer
+    acotado puede corregir. El NDJSON se lee en streaming con `_reordenar`.
+    Sin `seek`: el flujo descomprimido de un .zst no lo admite, así que el
+    primer carácter leído para distinguir el formato se vuelve a anteponer.
+    """
+    with abrir_texto(ruta, "r") as f:
+        inicio = f.read(1)
+        while inicio.isspace():
+            inicio = f.read(1)
+        if inicio == "[":
+            yield from sorted(json.loads(inicio + f.read()), key=_clave_orden)
+            return
+        lineas = itertools.chain([inicio + f.readline()], f)
+        yield from _reordenar((json.loads(linea) for linea in lineas if linea.strip()), tam_reorden, contador)
+
+
+def _reordenar(entradas, tam=TAM_REORDEN, contador=None):
+    """Corrige el desorden local con un montículo de `tam` entradas; `contador` anota las que llegan tarde"""
+    monticulo = []
+    secuencia = itertools.count()
+    ultimo = ""
+    for entrada in entradas:
+        heapq.heappush(monticulo, (entrada.get("timestamp", ""), next(secuencia), entrada))
+        if len(monticulo) > tam:
+            timestamp, _, salida = heapq.heappop(monticulo)
+            if timestamp < ultimo and contador is not None:
+                contador["desordenadas"] += 1
+            ultimo = max(ultimo, timestamp)
+            yield salida
+    while monticulo:
+        yield heapq.heappop(monticulo)[2]
+
+
+def ficheros(ruta):
+    """La ruta si es un fichero, o los ficheros de logs de un directorio (recursivo) en orden de nombre"""
+    if not os.path.isdir(ruta):
+        return [ruta]
+    encontrados = []
+    for raiz, _, nombres in os.walk(ruta):
+        encontrados.extend(os.path.join(raiz, n) for n in nombres if n.lower().endswith(_EXTENSIONES))
+    return sorted(encontrados)
+
+
+class Reproductor:
+    """Reemite entradas guardadas en orden de timestamp a la velocidad pedida"""
+
+    def __init__(self, rutas, velocidad=None, max_espera=None, reestampar=False, tam_reorden=TAM_REORDEN):
+        self.rutas = [rutas] if isinstance(rutas, str) else list(rutas)
+        self.velocidad = velocidad or None
+        # Huecos de logs más largos que esto (en segundos de reloj) se acortan: noches sin tráfico...
+        self.max_espera = max_espera
+        # Desplaza los timestamps para que la primera entrada parezca de ahora (para el seguimiento en vivo)
+        self.reestampar = reestampar
+        self.tam_reorden = tam_reorden
+        self.contador = {"emitidas": 0, "duplicadas": 0, "desordenadas": 0}
+        self.primera = None
+        self.ultima = None
+        self.segundos = 0.0
+
+    def _fuente(self, ruta):
+        if _es_exportacion(ruta):
+            return _entradas_exportadas(ruta, self.tam_reorden, self.contador)
+        return entradas_bundle(ruta)
+
+    def _ordenadas(self):
+        fuentes = [self._fuente(ruta) for ruta in itertools.chain.from_iterable(ficheros(r) for r in self.rutas)]
+        mezcla = fuentes[0] if len(fuentes) == 1 else heapq.merge(*fuentes, key=lambda e: e.get("timestamp", ""))
+        vistos = IdsRecientes()
+        for entrada in mezcla:
+            insert_id = entrada.get("insertId")
+            if insert_id and not vistos.anadir(insert_id):
+                self.contador["duplicadas"] += 1
+                continue
+            yield entrada
+
+    def _programadas(self):
+        """(segundos de reloj desde el inicio en que toca emitirla, entrada)"""
+        medir = self.velocidad is not None or self.reestampar
+        reloj = 0.0
+        anterior = None
+        desplazamiento = None
+        for entrada in self._ordenadas():
+            timestamp = entrada.get("timestamp")
+            if timestamp:
+                if self.primera is None:
+                    self.primera = timestamp
+                self.ultima = timestamp
+            if medir and timestamp:
+                momento = parsear_timestamp(timestamp)
+                if anterior is None:
+                    anterior = momento
+                    if self.reestampar:
+                        desplazamiento = timedelta(seconds=time.time() - momento.timestamp())
+                if self.velocidad:
+                    hueco = max(0.0, (momento - anterior).total_seconds()) / self.velocidad
+                    reloj += hueco if self.max_espera is None else min(hueco, self.max_espera)
+                anterior = max(anterior, momento)
+                if desplazamiento is not None:
+                    entrada = dict(entrada, timestamp=formatear_timestamp(momento + desplazamiento))
+            yield reloj, entrada
+
+    def entradas(self):
+        """Generador síncrono (interfaz de `iterar_entradas`)"""
+        inicio = time.monotonic()
+        try:
+            for objetivo, entrada in self._programadas():
+                if self.velocidad:
+                    espera = objetivo - (time.monotonic() - inicio)
+                    if espera > 0:
+                        time.sleep(espera)
+                self.contador["emitidas"] += 1
+                yield entrada
+        finally:
+            self.segundos = time.monotonic() - inicio
+
+    async def entradas_async(self):
+        """Generador asíncrono (interfaz de `Seguidor.entradas`)"""
+        inicio = time.monotonic()
+        try:
+            for objetivo, entrada in self._programadas():
+                if self.velocidad:
+                    espera = objetivo - (time.monotonic() - inicio)
+                    if espera > 0:
+                        await asyncio.sleep(espera)
+                self.contador["emitidas"] += 1
+                yield entrada
+        finally:
+            self.segundos = time.monotonic() - inicio
+
+    def resumen(self):
+        duracion_log = None
+        if self.primera and self.ultima:
+            duracion_log = (parsear_timestamp(self.ultima) - parsear_timestamp(self.primera)).total_seconds()
+        return {
+            **self.contador,
+            "primera": self.primera,
+            "ultima": self.ultima,
+            "segundos_log": duracion_log,
+            "segundos_reales": self.segundos,
+            "aceleracion": duracion_log / self.segundos if duracion_log and self.segundos else None,
+            "entradas_por_segundo": self.contador["emitidas"] / self.segundos if self.segundos else None,
+        }
+
+
+def reproducir(rutas, velocidad=None, **opciones):
+    """Atajo: generador de las entradas guardadas en `rutas` a la velocidad pedida"""
+    return Reproductor(rutas, velocidad, **opciones).entradas()
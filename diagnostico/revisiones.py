@@ -0,0 +1,217 @@
+"""Comparación de rendimiento entre revisiones (despliegues) del servicio
+
+Cada entrada lleva resource.labels.revision_name y las etiquetas commit-sha
+y gcb-build-id del build que la desplegó. Este analizador reparte el flujo
+por revisión y, para cada una, reutiliza los analizadores de latencia por
+etapa y de eficiencia de Pub/Sub, además de contar entradas y errores:
+
+    tasa de errores             entradas con severidad >= ERROR / entradas
+    entradas por mensaje        entradas / mensajes procesados (IDs de _pubsub)
+    Pub/Sub vacías              ejecuciones sin mensajes / notificaciones
+    latencias por etapa         las de diagnostico/latencia.py
+
+`comparar` contrasta la revisión actual con la anterior y marca como
+regresión solo las diferencias que empeoran al menos `MIN_EMPEORAMIENTO` y
+son significativas (p < `ALFA`): prueba z de proporciones para las tasas,
+prueba de tasas de Poisson para las entradas por mensaje y Mann-Whitney
+para las latencias.
+"""
+import json
+import re
+
+from diagnostico.eficiencia import EficienciaPubSubAnalizador
+from diagnostico.estadistica import (
+    prueba_mann_whitney,
+    prueba_proporciones,
+    prueba_tasas,
+    resumen_distribucion,
+)
+from diagnostico.latencia import ETAPAS, LatenciaAnalizador
+from diagnostico.motor import Analizador
+
+ALFA = 0.01
+MIN_EMPEORAMIENTO = 0.10
+MIN_MUESTRAS = 20
+MAX_REVISIONES = 20
+
+_NUMERO = re.compile(r"-(\d{5})-[a-z0-9]+$")
+
+
+class _Revision:
+    """Métricas acumuladas de una revisión"""
+
+    def __init__(self, nombre, entrada):
+        etiquetas = entrada.get("labels", {})
+        self.nombre = nombre
+        self.commit = etiquetas.get("commit-sha")
+        self.build = etiquetas.get("gcb-build-id")
+        self.primera = entrada.get("timestamp")
+        self.ultima = entrada.get("timestamp")
+        self.entradas = 0
+        self.errores = 0
+        self.latencia = LatenciaAnalizador(max_muestras=0, max_lentos=0)
+        self.eficiencia = EficienciaPubSubAnalizador(max_muestras=0, ventanas=())
+
+    def consumir(self, entrada, texto, etiquetas):
+        self.entradas += 1
+        self.ultima = entrada.get("timestamp") or self.ultima
+        if "grave" in etiquetas:
+            self.errores += 1
+        self.latencia.consumir(entrada, texto, etiquetas)
+        self.eficiencia.consumir(entrada, texto, etiquetas)
+
+    def metricas(self):
+        self.latencia.cerrar_pendientes()
+        self.eficiencia.cerrar_pendientes()
+        g = self.eficiencia.global_
+        return {
+            "entradas": self.entradas,
+            "errores": self.errores,
+            "mensajes": g["mensajes"],
+            "notificaciones": g["notificaciones"],
+            "vacias": g["vacias"],
+            "latencias": {**self.latencia.latencias, "extremo_a_extremo": self.latencia.extremo_a_extremo},
+        }
+
+    def resumen(self):
+        m = self.metricas()
+        return {
+            "revision": self.nombre,
+            "commit": self.commit,
+            "build": self.build,
+            "primera": self.primera,
+            "ultima": self.ultima,
+            "entradas": m["entradas"],
+            "errores": m["errores"],
+            "tasa_errores": m["errores"] / m["entradas"] if m["entradas"] else None,
+            "mensajes": m["mensajes"],
+            "entradas_por_mensaje": m["entradas"] / m["mensajes"] if m["mensajes"] else None,
+            "notificaciones": m["notificaciones"],
+            "ratio_vacias": m["vacias"] / m["notificaciones"] if m["notificaciones"] else None,
+            "etapas": {etapa: resumen_distribucion(valores) for etapa, valores in m["latencias"].items()},
+        }
+
+
+def _clave_orden(revision):
+    """Número de revisión de Cloud Run (…-00103-j8x) y, si no lo hay, la primera entrada vista"""
+    numero = _NUMERO.search(revision.nombre)
+    return (int(numero.group(1)) if numero else -1, revision.primera or "")
+
+
+class RevisionesAnalizador(Analizador):
+    """Métricas por revisión de Cloud Run y regresiones entre despliegues consecutivos"""
+
+    nombre = "revisiones"
+
+    def __init__(self, max_muestras=10, desde=None, max_revisiones=MAX_REVISIONES, actual=None, anterior=None,
+                 alfa=ALFA, min_empeoramiento=MIN_EMPEORAMIENTO):
+        super().__init__(max_muestras, desde)
+        self.max_revisiones = max_revisiones
+        self.actual = actual
+        self.anterior = anterior
+        self.alfa = alfa
+        self.min_empeoramiento = min_empeoramiento
+        self.revisiones = {}
+
+    def coincide(self, entrada, texto, etiquetas):
+        return True
+
+    def acumular(self, entrada, texto, etiquetas):
+        nombre = entrada.get("resource", {}).get("labels", {}).get("revision_name") or "desconocida"
+        revision = self.revisiones.get(nombre)
+        if revision is None:
+            if len(self.revisiones) >= self.max_revisiones:
+                # Se descarta la revisión más antigua para acotar la memoria
+                del self.revisiones[min(self.revisiones.values(), key=_clave_orden).nombre]
+            revision = self.revisiones[nombre] = _Revision(nombre, entrada)
+        revision.consumir(entrada, texto, etiquetas)
+
+    def ordenadas(self):
+        return sorted(self.revisiones.values(), key=_clave_orden)
+
+    def comparar(self, actual=None, anterior=None, alfa=ALFA, min_empeoramiento=MIN_EMPEORAMIENTO,
+                 min_muestras=MIN_MUESTRAS):
+        """Compara dos revisiones (por defecto las dos últimas) y devuelve las métricas con su prueba"""
+        nombres = [revision.nombre for revision in self.ordenadas()]
+        if actual is None and nombres:
+            actual = nombres[-1]
+        if actual not in self.revisiones:
+            return None
+        if anterior is None:
+            posicion = nombres.index(actual)
+            anterior = nombres[posicion - 1] if posicion > 0 else None
+        if anterior not in self.revisiones:
+            return None
+        a = self.revisiones[anterior].metricas()
+        b = self.revisiones[actual].metricas()
+
+        comparaciones = []
+
+        def anadir(metrica, valor_a, valor_b, prueba, suficiente):
+            empeora = (valor_a is not None and valor_b is not None
+                       and valor_b > valor_a * (1 + min_empeoramiento) and valor_b > 0)
+            comparaciones.append({
+                "metrica": metrica,
+                "anterior": valor_a,
+                "actual": valor_b,
+                "cambio": (valor_b - valor_a) / valor_a if valor_a and valor_b is not None else None,
+                "p": prueba["p"] if prueba else None,
+                "regresion": bool(suficiente and prueba and empeora and prueba["p"] < alfa),
+            })
+
+        anadir("tasa_errores",
+               a["errores"] / a["entradas"] if a["entradas"] else None,
+               b["errores"] / b["entradas"] if b["entradas"] else None,
+               prueba_proporciones(a["errores"], a["entradas"], b["errores"], b["entradas"]),
+               min(a["entradas"], b["entradas"]) >= min_muestras)
+        anadir("entradas_por_mensaje",
+               a["entradas"] / a["mensajes"] if a["mensajes"] else None,
+               b["entradas"] / b["mensajes"] if b["mensajes"] else None,
+               prueba_tasas(a["entradas"], a["mensajes"], b["entradas"], b["mensajes"]),
+               min(a["mensajes"], b["mensajes"]) >= min_muestras)
+        anadir("ratio_vacias",
+               a["vacias"] / a["notificaciones"] if a["notificaciones"] else None,
+               b["vacias"] / b["notificaciones"] if b["notificaciones"] else None,
+               prueba_proporciones(a["vacias"], a["notificaciones"], b["vacias"], b["notificaciones"]),
+               min(a["notificaciones"], b["notificaciones"]) >= min_muestras)
+        for etapa in (*ETAPAS[1:], "extremo_a_extremo"):
+            valores_a = a["latencias"][etapa]
+            valores_b = b["latencias"][etapa]
+            mediana_a = resumen_distribucion(valores_a).get("p50")
+            mediana_b = resumen_distribucion(valores_b).get("p50")
+            anadir(f"latencia_{etapa}_p50", mediana_a, mediana_b, prueba_mann_whitney(valores_a, valores_b),
+                   min(len(valores_a), len(valores_b)) >= min_muestras)
+        return {
+            "actual": actual,
+            "anterior": anterior,
+            "alfa": alfa,
+            "comparaciones": comparaciones,
+            "regresiones": [c["metrica"] for c in comparaciones if c["regresion"]],
+        }
+
+    def resumen(self):
+        return {
+            **super().resumen(),
+            "revisiones": [revision.resumen() for revision in self.ordenadas()],
+            "comparacion": self.comparar(self.actual, self.anterior, self.alfa, self.min_empeoramiento),
+        }
+
+
+def revisiones_desplegadas(ruta_status):
+    """Revisiones de `gcloud run revisions list` guardadas por obtener_estado.py (nombre -> metadatos)"""
+    try:
+        with open(ruta_status, "r", encoding="utf-8") as f:
+            estado = json.load(f)
+        revisiones = json.loads(estado["gcloud"]["revisions"]["output"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+    desplegadas = {}
+    for revision in revisiones if isinstance(revisiones, list) else []:
+        metadata = revision.get("metadata", {})
+        etiquetas = metadata.get("labels", {})
+        desplegadas[metadata.get("name")] = {
+            "creada": metadata.get("creationTimestamp"),
+            "commit": etiquetas.get("commit-sha"),
+            "build": etiquetas.get("gcb-build-id"),
+        }
+    return desplegadas
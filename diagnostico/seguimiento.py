@@ -0,0 +1,235 @@
+"""Seguimiento en vivo de los logs de un servicio (equivalente a `tail --follow`)
+
+Si el cliente de Cloud Logging usa gRPC (lo habitual) se abre una sesión de
+la API de tail (`logs.seguir_entradas`): el servidor empuja cada entrada
+según se ingiere y se muestra en menos de un segundo tras la ingesta
+(VENTANA_ORDEN_TAIL de espera para ordenarla, más la red). La sesión caduca
+como mucho en una hora; al cerrarse se rellena el hueco con una consulta
+desde el cursor y se abre otra.
+
+Sin tail (API HTTP, permisos, o si falla al abrirse) se sondea: cada
+consulta pide solo lo posterior al cursor (el timestamp más reciente visto,
+o la consulta anterior si es más reciente) menos SOLAPE, que cubre las
+entradas que Cloud Logging ingiere con retraso. En este modo la latencia es
+de al menos `intervalo_min` (INTERVALO_MIN por defecto, ajustable por debajo
+de un segundo a costa de la cuota de lectura) más lo que tarde la consulta,
+y crece hasta `intervalo_max` mientras no llega nada.
+
+En los dos modos las entradas ya entregadas se descartan por insertId con
+un conjunto LRU acotado. Las lecturas bloqueantes van en hilos y el bucle
+de eventos queda libre para mostrar las entradas en cuanto llegan.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from diagnostico.config import PROJECT
+from diagnostico.logs import filtro_servicio, iterar_entradas, parsear_timestamp, seguir_entradas
+
+INTERVALO_MIN = 2.0
+INTERVALO_MAX = 30.0
+FACTOR_ESPERA = 1.5
+# Cubre el retraso habitual de ingesta de Cloud Logging; lo repetido lo descarta IdsRecientes
+SOLAPE = timedelta(seconds=45)
+CAPACIDAD_IDS = 20000
+
+
+class IdsRecientes:
+    """Conjunto LRU de insertId con capacidad fija"""
+
+    def __init__(self, capacidad=CAPACIDAD_IDS):
+        self.capacidad = capacidad
+        self._ids = OrderedDict()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, insert_id):
+        return insert_id in self._ids
+
+    def anadir(self, insert_id):
+        """Registra el id y devuelve True si es nuevo"""
+        if insert_id in self._ids:
+            self._ids.move_to_end(insert_id)
+            return False
+        self._ids[insert_id] = None
+        if len(self._ids) > self.capacidad:
+            self._ids.popitem(last=False)
+        return True
+
+
+class Seguidor:
+    """Sigue Cloud Logging con la API de tail o, sin ella, sondeando con un cursor de timestamp
+
+    Solo entrega las entradas no vistas.
+    """
+
+    def __init__(self, filtro=None, project=PROJECT, intervalo_min=INTERVALO_MIN, intervalo_max=INTERVALO_MAX,
+                 solape=SOLAPE, capacidad=CAPACIDAD_IDS, client=None, al_error=None, tail=True):
+        self.filtro = filtro or filtro_servicio()
+        self.project = project
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.solape = solape
+        self.client = client
+        self.al_error = al_error
+        self.tail = tail
+        self.vistos = IdsRecientes(capacidad)
+        self.cursor = None
+        self.ultima_consulta = None
+        self.intervalo = intervalo_min
+        self.consultas = 0
+        self.sesiones_tail = 0
+        self.recibidas_tail = 0
+        self.recibidas = 0
+        self.duplicadas = 0
+        self.errores = 0
+
+    def _nueva(self, entrada):
+        """Avanza el cursor y descarta los insertId ya entregados"""
+        insert_id = entrada.get("insertId")
+        if insert_id and not self.vistos.anadir(insert_id):
+            self.duplicadas += 1
+            return False
+        if entrada.get("timestamp"):
+            momento = parsear_timestamp(entrada["timestamp"])
+            if self.cursor is None or momento > self.cursor:
+                self.cursor = momento
+        return True
+
+    def iniciales(self, freshness="5m", lineas=20):
+        """Últimas `lineas` entradas de la ventana, en orden cronológico, para arrancar como `tail -n`"""
+        recientes = list(iterar_entradas(self.filtro, project=self.project, freshness=freshness, orden="desc",
+                                         max_entradas=lineas, client=self.client))
+        return [entrada for entrada in reversed(recientes) if self._nueva(entrada)]
+
+    def _consultar(self, desde):
+        return list(iterar_entradas(self.filtro, project=self.project, freshness=None, desde=desde, orden="asc",
+                                    client=self.client))
+
+    async def sondear(self):
+        """Una consulta desde el cursor; devuelve las entradas nuevas en orden cronológico"""
+        ahora = datetime.now(timezone.utc)
+        if self.cursor is None:
+            # Sin entradas previas se sigue desde ahora, nunca desde el principio del histórico
+            self.cursor = ahora
+        desde = self.cursor - self.solape
+        if self.ultima_consulta is not None:
+            # Lo anterior a la consulta previa menos el solape ya estaba ingerido y se descargó entonces
+            desde = max(desde, self.ultima_consulta - self.solape)
+        self.ultima_consulta = ahora
+        self.consultas += 1
+        entradas = await asyncio.to_thread(self._consultar, desde)
+        self.recibidas += len(entradas)
+        return [entrada for entrada in entradas if self._nueva(entrada)]
+
+    async def _entradas_tail(self):
+        """Entradas nuevas de una sesión de tail, leída en un hilo y entregada al bucle en cuanto llega cada una"""
+        bucle = asyncio.get_running_loop()
+        cola = asyncio.Queue()
+        fin = object()
+        # Se activa cuando el consumidor deja de leer; cancelar guarda cómo desbloquear el stream
+        parada = threading.Event()
+        cancelar = []
+
+        def poner(elemento):
+            try:
+                bucle.call_soon_threadsafe(cola.put_nowait, elemento)
+                return True
+            except RuntimeError:  # el bucle ya se cerró (Ctrl+C)
+                return False
+
+        def abierto(cancelar_stream):
+            cancelar.append(cancelar_stream)
+            # El consumidor pudo irse mientras se abría la sesión
+            if parada.is_set():
+                cancelar_stream()
+
+        def leer():
+            flujo = seguir_entradas(self.filtro, self.project, client=self.client, al_abrir=abierto)
+            try:
+                for entrada in flujo:
+                    if parada.is_set() or not poner(entrada):
+                        return
+                poner(fin)
+            except Exception as e:
+                # Tras la parada, el error es la propia cancelación del stream
+                if not parada.is_set():
+                    poner(e)
+            finally:
+                flujo.close()
+
+        # Hilo daemon: el stream bloquea y no debe impedir salir del programa
+        threading.Thread(target=leer, daemon=True).start()
+        self.sesiones_tail += 1
+        try:
+            # Lo ingerido entre el cursor y la apertura de la sesión no llega por el tail
+            for entrada in await self.sondear():
+                yield entrada
+            while True:
+                elemento = await cola.get()
+                if elemento is fin:
+                    return
+                if isinstance(elemento, Exception):
+                    raise elemento
+                self.recibidas += 1
+                self.recibidas_tail += 1
+                if self._nueva(elemento):
+                    yield elemento
+        finally:
+            # Si el consumidor para antes de que acabe la sesión, el hilo y el stream terminan con él
+            parada.set()
+            for cancelar_stream in cancelar:
+                cancelar_stream()
+
+    async def entradas(self):
+        """Generador asíncrono infinito de entradas nuevas, por tail o con espera adaptativa entre consultas"""
+        while self.tail:
+            recibidas = self.recibidas_tail
+            apertura = time.monotonic()
+            flujo = self._entradas_tail()
+            try:
+                async for entrada in flujo:
+                    yield entrada
+            except Exception as e:
+                self.errores += 1
+                # Si falla al abrirse sin entregar nada, tail no está disponible y se sigue sondeando
+                self.tail = self.recibidas_tail > recibidas or time.monotonic() - apertura >= self.intervalo_max
+                if self.al_error:
+                    self.al_error(e)
+                if self.tail:
+                    await asyncio.sleep(self.intervalo_min)
+            finally:
+                # Cierra la sesión en cuanto el consumidor deja de leer, sin esperar al recolector
+                await flujo.aclose()
+        while True:
+            try:
+                nuevas = await self.sondear()
+            except Exception as e:
+                # Cuota agotada, red caída...: se sigue intentando al ritmo más lento
+                self.errores += 1
+                self.intervalo = self.intervalo_max
+                if self.al_error:
+                    self.al_error(e)
+                nuevas = []
+            for entrada in nuevas:
+                yield entrada
+            if nuevas:
+                self.intervalo = self.intervalo_min
+            else:
+                self.intervalo = min(self.intervalo * FACTOR_ESPERA, self.intervalo_max)
+            await asyncio.sleep(self.intervalo)
+
+    def resumen(self):
+        return {
+            "modo": "tail" if self.tail else "sondeo",
+            "sesiones_tail": self.sesiones_tail,
+            "consultas": self.consultas,
+            "recibidas": self.recibidas,
+            "duplicadas": self.duplicadas,
+            "errores": self.errores,
+            "redundancia": self.duplicadas / self.recibidas if self.recibidas else 0.0,
+            "cursor": self.cursor.isoformat() if self.cursor else None,
+        }
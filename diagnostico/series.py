@@ -0,0 +1,307 @@
+"""Series temporales vectorizadas (NumPy) de volumen, errores y categorías
+
+Contar con diccionarios y listas por comprensión deja de ser viable a
+partir de ~10^5 entradas. Aquí cada entrada se reduce, al pasar por el
+Motor, a unas pocas columnas compactas (`array` de la biblioteca estándar,
+sin NumPy):
+
+    segundos     int64   segundos epoch (sin fracción)
+    severidad    int16   valor de SEVERIDADES (0..800)
+    combinacion  uint16  código de la combinación de etiquetas del clasificador (`combinaciones`,
+                         máscaras de bits sobre ETIQUETAS)
+    revision     uint16  código de resource.labels.revision_name (diccionario `revisiones`)
+    instancia    uint32  código de labels.instanceId (diccionario `instancias`)
+
+y al resumir se ven como arrays de NumPy sin copiarlas. Histogramas por
+minuto u hora, tasas móviles y agrupaciones por revisión, instancia o
+categoría son entonces un `bincount`, una suma acumulada o una máscara de
+bits. Como las combinaciones de etiquetas distintas son pocas, todas las
+categorías de todas las cubetas (o grupos) salen de un único `bincount`
+sobre (cubeta, combinación) multiplicado por la tabla de bits: una semana
+con millones de entradas se resume en décimas de segundo.
+
+NumPy es opcional: solo se importa al resumir (pip install numpy).
+"""
+from array import array
+from datetime import datetime, timezone
+
+from diagnostico.clasificador import CATEGORIAS
+from diagnostico.logs import SEVERIDADES, formatear_timestamp, parsear_timestamp
+from diagnostico.motor import Analizador
+
+ETIQUETAS = (*CATEGORIAS, "grave", "advertencia")
+BITS = {etiqueta: 1 << i for i, etiqueta in enumerate(ETIQUETAS)}
+RESOLUCION = 60
+VENTANA_MOVIL = 15
+MAX_GRUPOS = 20
+MAX_CELDAS = 1 << 25  # tamaño máximo de las matrices auxiliares de bincount
+
+
+def _modulo_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Para las series vectorizadas instala numpy: pip install numpy")
+    return numpy
+
+
+class Columnas:
+    """Entradas reducidas a columnas compactas, listas para verse como arrays de NumPy"""
+
+    def __init__(self):
+        self.segundos = array("q")
+        self.severidad = array("h")
+        self.combinacion = array("H")
+        self.revision = array("H")
+        self.instancia = array("I")
+        self.revisiones = {}  # nombre -> código
+        self.instancias = {}  # instanceId -> código
+        self.combinaciones = []  # código -> máscara de bits
+        self.sin_timestamp = 0
+        self._minutos = {}  # "YYYY-MM-DDTHH:MM" -> segundos epoch del inicio del minuto
+        self._codigos = {}  # frozenset de etiquetas -> código de combinación
+
+    def __len__(self):
+        return len(self.segundos)
+
+    def anadir(self, entrada, etiquetas):
+        timestamp = entrada.get("timestamp")
+        if not timestamp:
+            self.sin_timestamp += 1
+            return
+        # Solo se parsea un timestamp por minuto distinto; los segundos se leen de la cadena
+        prefijo = timestamp[:16]
+        minuto = self._minutos.get(prefijo)
+        if minuto is None:
+            minuto = self._minutos[prefijo] = int(parsear_timestamp(prefijo + ":00Z").timestamp())
+        self.segundos.append(minuto + int(timestamp[17:19]))
+        self.severidad.append(SEVERIDADES.get(entrada.get("severity", "DEFAULT"), 0))
+        codigo = self._codigos.get(etiquetas)
+        if codigo is None:
+            mascara = sum(BITS[e] for e in etiquetas if e in BITS)
+            if mascara in self.combinaciones:
+                codigo = self.combinaciones.index(mascara)
+            else:
+                codigo = len(self.combinaciones)
+                self.combinaciones.append(mascara)
+            self._codigos[etiquetas] = codigo
+        self.combinacion.append(codigo)
+        revision = entrada.get("resource", {}).get("labels", {}).get("revision_name") or ""
+        codigo = self.revisiones.get(revision)
+        if codigo is None:
+            codigo = self.revisiones[revision] = len(self.revisiones)
+        self.revision.append(codigo)
+        instancia = entrada.get("labels", {}).get("instanceId") or ""
+        codigo = self.instancias.get(instancia)
+        if codigo is None:
+            codigo = self.instancias[instancia] = len(self.instancias)
+        self.instancia.append(codigo)
+
+    def arrays(self):
+        """Las columnas como arrays de NumPy (vistas sobre la misma memoria, sin copia)"""
+        np = _modulo_numpy()
+        return {
+            "segundos": np.frombuffer(self.segundos, dtype=np.int64),
+            "severidad": np.frombuffer(self.severidad, dtype=np.int16),
+            "combinacion": np.frombuffer(self.combinacion, dtype=np.uint16),
+            "revision": np.frombuffer(self.revision, dtype=np.uint16),
+            "instancia": np.frombuffer(self.instancia, dtype=np.uint32),
+        }
+
+
+class Series:
+    """Agregaciones por cubetas de `resolucion` segundos sobre unas Columnas"""
+
+    def __init__(self, columnas, resolucion=RESOLUCION):
+        np = self.np = _modulo_numpy()
+        self.columnas = columnas
+        self.resolucion = resolucion
+        self.a = columnas.arrays()
+        # Combinación de etiquetas -> pertenece (0/1) a cada etiqueta: combinaciones × ETIQUETAS
+        tabla = np.array(columnas.combinaciones or [0], dtype=np.int64)
+        self.bits = ((tabla[:, None] & np.array([BITS[e] for e in ETIQUETAS])) != 0).astype(np.int64)
+        segundos = self.a["segundos"]
+        if len(segundos):
+            self.desde, self.hasta = int(segundos.min()), int(segundos.max())
+            self.inicio = self.desde // resolucion * resolucion
+            self.cubeta = (segundos - self.inicio) // resolucion
+            self.cubetas = (self.hasta - self.inicio) // resolucion + 1
+        else:
+            self.desde = self.hasta = self.inicio = self.cubetas = 0
+            self.cubeta = np.zeros(0, dtype=np.int64)
+
+    def mascara(self, etiqueta):
+        """Array booleano de las entradas con la etiqueta del clasificador"""
+        return self.bits[:, ETIQUETAS.index(etiqueta)].astype(bool)[self.a["combinacion"]]
+
+    def conteos(self, mascara=None):
+        """Entradas por cubeta (solo las de la máscara, si se da)"""
+        cubeta = self.cubeta if mascara is None else self.cubeta[mascara]
+        return self.np.bincount(cubeta, minlength=self.cubetas)
+
+    def movil(self, conteos, ventana=VENTANA_MOVIL):
+        """Suma de las últimas `ventana` cubetas en cada cubeta (las primeras, con las que haya)"""
+        acumulado = self.np.cumsum(conteos)
+        resultado = acumulado.copy()
+        resultado[ventana:] -= acumulado[:-ventana]
+        return resultado
+
+    def por_etiqueta(self, codigos=None, grupos=None):
+        """Entradas y entradas con cada etiqueta por cubeta (o por código de grupo)
+
+        Devuelve (total, matriz de grupos × ETIQUETAS) con un solo bincount
+        sobre los pares (grupo, combinación).
+        """
+        np = self.np
+        if codigos is None:
+            codigos, grupos = self.cubeta, self.cubetas
+        combinaciones = len(self.bits)
+        if grupos * combinaciones > MAX_CELDAS:
+            total = np.bincount(codigos, minlength=grupos)
+            return total, np.stack([np.bincount(codigos[self.mascara(e)], minlength=grupos) for e in ETIQUETAS],
+                                   axis=1)
+        indices = codigos.astype(np.int64) * combinaciones + self.a["combinacion"]
+        matriz = np.bincount(indices, minlength=grupos * combinaciones).reshape(grupos, combinaciones)
+        return matriz.sum(axis=1), matriz @ self.bits
+
+    def matriz(self, codigos, grupos, mascara=None):
+        """Entradas por grupo y cubeta: array de grupos × cubetas"""
+        indices = codigos.astype(self.np.int64) * self.cubetas + self.cubeta
+        if mascara is not None:
+            indices = indices[mascara]
+        return self.np.bincount(indices, minlength=grupos * self.cubetas).reshape(grupos, self.cubetas)
+
+    def cubetas_activas(self, codigos, grupos):
+        """Cubetas con alguna entrada de cada grupo"""
+        np = self.np
+        indices = codigos.astype(np.int64) * self.cubetas + self.cubeta
+        if grupos * self.cubetas > MAX_CELDAS:
+            return np.bincount(np.unique(indices) // self.cubetas, minlength=grupos)
+        ocupadas = np.zeros(grupos * self.cubetas, dtype=bool)
+        ocupadas[indices] = True
+        return ocupadas.reshape(grupos, self.cubetas).sum(axis=1)
+
+    def extremos(self, codigos, grupos):
+        """Primer y último segundo de cada código (-1 en los que no aparecen)"""
+        np = self.np
+        segundos = self.a["segundos"]
+        primeras = np.full(grupos, np.iinfo(np.int64).max)
+        ultimas = np.full(grupos, -1)
+        np.minimum.at(primeras, codigos, segundos)
+        np.maximum.at(ultimas, codigos, segundos)
+        primeras[ultimas < 0] = -1
+        return primeras, ultimas
+
+    def fecha(self, segundos):
+        return formatear_timestamp(datetime.fromtimestamp(segundos, timezone.utc))
+
+    def grupos(self, nombre, max_grupos=MAX_GRUPOS):
+        """Resumen por revisión o instancia, de más a menos entradas"""
+        diccionario = self.columnas.revisiones if nombre == "revision" else self.columnas.instancias
+        codigos = self.a[nombre]
+        grupos = len(diccionario)
+        entradas, etiquetas = self.por_etiqueta(codigos, grupos)
+        errores = etiquetas[:, ETIQUETAS.index("grave")]
+        advertencias = etiquetas[:, ETIQUETAS.index("advertencia")]
+        activas = self.cubetas_activas(codigos, grupos)
+        primeras, ultimas = self.extremos(codigos, grupos)
+        nombres = {codigo: clave for clave, codigo in diccionario.items()}
+        resultado = {}
+        for codigo in self.np.argsort(-entradas, kind="stable")[:max_grupos].tolist():
+            if not entradas[codigo]:
+                break
+            resultado[nombres[codigo] or "(sin valor)"] = {
+                "entradas": int(entradas[codigo]),
+                "errores": int(errores[codigo]),
+                "advertencias": int(advertencias[codigo]),
+                "tasa_error": float(errores[codigo] / entradas[codigo]),
+                "cubetas_activas": int(activas[codigo]),
+                "primera": self.fecha(int(primeras[codigo])),
+                "ultima": self.fecha(int(ultimas[codigo])),
+            }
+        return resultado
+
+    def resumen(self, ventana=VENTANA_MOVIL, max_grupos=MAX_GRUPOS):
+        np = self.np
+        total = len(self.cubeta)
+        if not total:
+            return {"entradas": 0, "sin_timestamp": self.columnas.sin_timestamp,
+                    "resolucion_segundos": self.resolucion}
+        entradas, etiquetas = self.por_etiqueta()
+        errores = etiquetas[:, ETIQUETAS.index("grave")]
+        advertencias = etiquetas[:, ETIQUETAS.index("advertencia")]
+        entradas_movil = self.movil(entradas, ventana)
+        errores_movil = self.movil(errores, ventana)
+        minutos_ventana = np.minimum(np.arange(1, self.cubetas + 1), ventana) * self.resolucion / 60
+        ritmo_movil = entradas_movil / minutos_ventana
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tasa_movil = np.where(entradas_movil > 0, errores_movil / entradas_movil, 0.0)
+        categorias = [(etiqueta, j) for j, etiqueta in enumerate(ETIQUETAS[:len(CATEGORIAS)])]
+        activas = [(etiqueta, j) for etiqueta, j in categorias if etiquetas[:, j].any()]
+        ocupadas = np.flatnonzero(entradas)
+        # Las cubetas con entradas se convierten a listas de Python de una vez, no elemento a elemento
+        filas = zip(ocupadas.tolist(), entradas[ocupadas].tolist(), errores[ocupadas].tolist(),
+                    advertencias[ocupadas].tolist(), ritmo_movil[ocupadas].tolist(), tasa_movil[ocupadas].tolist(),
+                    etiquetas[ocupadas][:, [j for _, j in activas]].tolist())
+        cubetas = []
+        for i, n, e, a, ritmo, tasa, cuentas in filas:
+            cubetas.append({
+                "inicio": self.fecha(self.inicio + i * self.resolucion),
+                "entradas": n,
+                "errores": e,
+                "advertencias": a,
+                "entradas_por_minuto_movil": ritmo,
+                "tasa_error_movil": tasa,
+                "categorias": {etiqueta: c for (etiqueta, _), c in zip(activas, cuentas) if c},
+            })
+        pico = int(np.argmax(entradas))
+        pico_error = int(np.argmax(tasa_movil))
+        por_etiqueta = etiquetas.sum(axis=0)
+        return {
+            "entradas": total,
+            "sin_timestamp": self.columnas.sin_timestamp,
+            "desde": self.fecha(self.desde),
+            "hasta": self.fecha(self.hasta),
+            "resolucion_segundos": self.resolucion,
+            "ventana_movil": ventana,
+            "cubetas": self.cubetas,
+            "cubetas_vacias": int(self.cubetas - len(ocupadas)),
+            "errores": int(errores.sum()),
+            "advertencias": int(advertencias.sum()),
+            "tasa_error": float(errores.sum() / total),
+            "entradas_por_cubeta": {"media": float(entradas.mean()), "p50": float(np.percentile(entradas, 50)),
+                                    "p95": float(np.percentile(entradas, 95)), "max": int(entradas[pico])},
+            "pico": {"inicio": self.fecha(self.inicio + pico * self.resolucion), "entradas": int(entradas[pico])},
+            "pico_tasa_error_movil": {"inicio": self.fecha(self.inicio + pico_error * self.resolucion),
+                                      "tasa": float(tasa_movil[pico_error])},
+            "por_categoria": {etiqueta: int(por_etiqueta[j]) for etiqueta, j in categorias},
+            "por_revision": self.grupos("revision", max_grupos),
+            "por_instancia": self.grupos("instancia", max_grupos),
+            "por_cubeta": cubetas,
+        }
+
+
+class SeriesAnalizador(Analizador):
+    """Acumula las columnas compactas de todas las entradas para resumirlas con NumPy"""
+
+    nombre = "series"
+
+    def __init__(self, max_muestras=10, desde=None, resolucion=RESOLUCION, ventana=VENTANA_MOVIL,
+                 max_grupos=MAX_GRUPOS):
+        super().__init__(max_muestras, desde)
+        self.resolucion = resolucion
+        self.ventana = ventana
+        self.max_grupos = max_grupos
+        self.columnas = Columnas()
+
+    def coincide(self, entrada, texto, etiquetas):
+        return True
+
+    def acumular(self, entrada, texto, etiquetas):
+        self.columnas.anadir(entrada, etiquetas)
+
+    def series(self, resolucion=None):
+        return Series(self.columnas, resolucion or self.resolucion)
+
+    def resumen(self):
+        return {**super().resumen(), **self.series().resumen(self.ventana, self.max_grupos)}
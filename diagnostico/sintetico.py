@@ -0,0 +1,210 @@
+"""Generador de logs sintéticos de mfs-lead-generation-ai para pruebas de rendimiento
+
+Produce, en streaming y en orden cronológico, entradas con la misma forma
+que devuelve Cloud Logging (labels de Cloud Build, resource de Cloud Run,
+logName de stdout/stderr/requests) y con los mismos textos que emite el
+servicio, partidos en una entrada por línea como hace Cloud Run:
+
+    petición POST /_pubsub con httpRequest.latency
+    _pubsub: notificación recibida de Gmail / [history] Delta INBOX / IDs que voy a procesar
+    Lock adquirido / Procesando correo / [classify] / Llamando a Vertex / Resultado final de clasificación
+    Airtable: ✓ Registro creado exitosamente / Email ID procesado / Message ID / Thread ID
+    Aplicando etiqueta "processed" / Lock liberado
+    correos saltados (⏭️ Saltando correo…) y ya registrados, etiquetados sin pasar por Airtable
+    ráfagas de errores con stack trace (severidad ERROR, stderr)
+
+Con la misma semilla la secuencia es idéntica, así que distintas ejecuciones
+de un benchmark ven exactamente los mismos datos.
+"""
+import random
+from datetime import datetime, timezone
+
+from diagnostico.bundle import EscritorBundle
+from diagnostico.config import PROJECT, REGION, SERVICE
+from diagnostico.logs import formatear_timestamp
+
+INICIO = datetime(2025, 12, 2, 0, 0, tzinfo=timezone.utc)
+INSTANCIAS = 4
+REVISIONES = 2
+TASA_ERRORES = 0.01
+MENSAJES_MAX = 3
+PROBABILIDAD_VACIA = 0.6
+# Mensajes que processor.js etiqueta sin incrementar el contador de ejecuciones
+PROBABILIDAD_SALTO = 0.05
+PROBABILIDAD_DUPLICADO = 0.05
+
+_URL_PUBSUB = f"https://{SERVICE}-abc123-uc.a.run.app/_pubsub"
+
+
+class GeneradorLogs:
+    """Fuente determinista de entradas sintéticas; `entradas(n)` genera exactamente n"""
+
+    def __init__(self, semilla=0, inicio=INICIO, instancias=INSTANCIAS, revisiones=REVISIONES,
+                 tasa_errores=TASA_ERRORES):
+        self.azar = random.Random(semilla)
+        self.momento = inicio.timestamp()
+        self.contador = 0
+        self.history_id = 35638000
+        # Distintos también al final: los informes muestran los últimos 8 caracteres del instanceId
+        self.instancias = [f"00{semilla:02d}{i:02d}" + "a1b2c3d4e5f6" * 12 + f"{semilla:04x}{i:04x}"
+                           for i in range(instancias)]
+        self.revisiones = [
+            (f"{SERVICE}-{103 + i:05d}-{'abcdefghij'[i % 10] * 3}", f"{(semilla + i):02x}" * 20, f"build-{i:04d}")
+            for i in range(revisiones)
+        ]
+        self.tasa_errores = tasa_errores
+
+    def _entrada(self, texto, instancia, revision, severidad="DEFAULT", log="stdout"):
+        nombre, commit, build = revision
+        self.contador += 1
+        self.momento += 0.000001
+        return {
+            "insertId": f"{self.contador:016x}",
+            "timestamp": formatear_timestamp(datetime.fromtimestamp(self.momento, timezone.utc)),
+            "severity": severidad,
+            "textPayload": texto,
+            "labels": {
+                "instanceId": instancia,
+                "commit-sha": commit,
+                "gcb-build-id": build,
+                "managed-by": "gcp-cloud-build-deploy-cloud-run",
+            },
+            "logName": f"projects/{PROJECT}/logs/run.googleapis.com%2F{log}",
+            "resource": {
+                "type": "cloud_run_revision",
+                "labels": {
+                    "configuration_name": SERVICE,
+                    "location": REGION,
+                    "project_id": PROJECT,
+                    "revision_name": nombre,
+                    "service_name": SERVICE,
+                },
+            },
+        }
+
+    def _lineas(self, texto, instancia, revision, severidad="DEFAULT", log="stdout"):
+        """Un console.log: una entrada por línea, separadas por microsegundos"""
+        for linea in texto.split("\n"):
+            yield self._entrada(linea, instancia, revision, severidad, log)
+
+    def _peticion(self, instancia, revision, latencia):
+        entrada = self._entrada("", instancia, revision, "INFO", "requests")
+        del entrada["textPayload"]
+        entrada["httpRequest"] = {
+            "requestMethod": "POST",
+            "requestUrl": _URL_PUBSUB,
+            "status": 200,
+            "latency": f"{latencia:.9f}s",
+            "userAgent": "APIs-Google; (+https://developers.google.com/webmasters/APIs-Google.html)",
+        }
+        return entrada
+
+    def _avanzar(self, segundos):
+        self.momento += segundos
+
+    def _etiquetar(self, id, instancia, revision):
+        yield from self._lineas(f'[mfs] Aplicando etiqueta "processed" (ID: Label_7) al mensaje {id}',
+                                instancia, revision)
+        yield from self._lineas(f"[mfs] Lock liberado para mensaje {id}", instancia, revision)
+
+    def _mensaje(self, id, instancia, revision):
+        azar = self.azar
+        yield from self._lineas(f"[mfs] Lock adquirido para mensaje {id}", instancia, revision)
+        if azar.random() < PROBABILIDAD_SALTO:
+            yield from self._lineas(f"[mfs] ⏭️ Saltando correo sin from o to válido - ID: {id}, From: empty, "
+                                    "To: empty", instancia, revision)
+            yield from self._etiquetar(id, instancia, revision)
+            return
+        yield from self._lineas(f"[mfs] Procesando correo de lead - ID: {id}", instancia, revision)
+        self._avanzar(azar.uniform(0.05, 0.3))
+        if azar.random() < 0.3:
+            yield from self._lineas("[mfs] [classify] ⚡ Verificación rápida detectó Discard: newsletter - "
+                                    "Saltando llamada a API", instancia, revision)
+        else:
+            yield from self._lineas("[mfs] Llamando a Vertex con modelo: gemini-2.5-flash fallbacks: [ "
+                                    "'gemini-2.5-flash', 'gemini-2.5-flash-001' ]", instancia, revision)
+            self._avanzar(azar.uniform(0.8, 3.0))
+        intencion = azar.choice(("Low", "Medium", "High", "Discard"))
+        yield from self._lineas("[mfs] [classify] Resultado final de clasificación: {\n"
+                                f"  intent: '{intencion}',\n  confidence: {azar.random():.2f},\n"
+                                "  finalFreeCoverage: false,\n  finalBarter: false\n}", instancia, revision)
+        self._avanzar(azar.uniform(0.2, 1.5))
+        if azar.random() < PROBABILIDAD_DUPLICADO:
+            yield from self._lineas(f"[mfs] Registro ya existe en Airtable para {id}, saltando y aplicando etiqueta "
+                                    "processed", instancia, revision)
+            yield from self._etiquetar(id, instancia, revision)
+            return
+        yield from self._lineas("[mfs] Airtable: ✓ Registro creado exitosamente {\n"
+                                f"  recordId: 'rec{azar.getrandbits(40):010x}',\n  emailId: '{id}'\n}}",
+                                instancia, revision)
+        if intencion in ("Medium", "High"):
+            self._avanzar(azar.uniform(0.3, 1.0))
+            yield from self._lineas(f"[mfs] Email ID procesado: {id}", instancia, revision)
+            yield from self._lineas(f"[mfs] Message ID: {azar.getrandbits(64):016x}", instancia, revision)
+            yield from self._lineas(f"[mfs] Thread ID: {azar.getrandbits(64):016x}", instancia, revision)
+        yield from self._etiquetar(id, instancia, revision)
+
+    def _error(self, id, instancia, revision):
+        texto = (f"[mfs] ✗ Error procesando mensaje {id}: Error: Request failed with status code 503\n"
+                 "    at createError (/app/node_modules/axios/lib/core/createError.js:16:15)\n"
+                 "    at settle (/app/node_modules/axios/lib/core/settle.js:17:12)\n"
+                 "    at IncomingMessage.handleStreamEnd (/app/node_modules/axios/lib/adapters/http.js:269:11)")
+        yield from self._lineas(texto, instancia, revision, "ERROR", "stderr")
+
+    def _ciclo(self, revision):
+        """Una notificación de Pub/Sub completa en una instancia"""
+        azar = self.azar
+        instancia = azar.choice(self.instancias)
+        self.history_id += azar.randint(1, 40)
+        vacia = azar.random() < PROBABILIDAD_VACIA
+        ids = [] if vacia else [f"19ad{azar.getrandbits(48):012x}" for _ in range(azar.randint(1, MENSAJES_MAX))]
+        latencia = azar.uniform(0.2, 0.8) + 3.5 * len(ids)
+        yield self._peticion(instancia, revision, latencia)
+        yield from self._lineas(f"[mfs] _pubsub: notificación recibida de Gmail: {{\n"
+                                f"  emailAddress: 'secretmedia@feverup.com',\n  historyId: '{self.history_id}'\n}}",
+                                instancia, revision)
+        for sender in ("false", "true"):
+            yield from self._lineas(f"[mfs] [history] Delta INBOX: {{\n  nuevosMensajes: {len(ids)},\n"
+                                    f"  startHistoryId: '{self.history_id - 5}',\n"
+                                    f"  notifHistoryId: '{self.history_id}',\n  useSenderState: {sender}\n}}",
+                                    instancia, revision)
+        lista = ", ".join(f"'{id}'" for id in ids)
+        yield from self._lineas(f"[mfs] _pubsub: IDs que voy a procesar ahora (cuenta principal): {{\n"
+                                f"  count: {len(ids)},\n  ids: [ {lista} ],\n  usedFallback: false\n}}",
+                                instancia, revision)
+        for id in ids:
+            yield from self._mensaje(id, instancia, revision)
+        yield from self._lineas(f"[mfs] _pubsub: actualizo historyId guardado (cuenta principal) → {self.history_id}",
+                                instancia, revision)
+        yield from self._lineas(f"[mfs] _pubsub: actualizo historyId guardado (cuenta SENDER) → {self.history_id}",
+                                instancia, revision)
+        if azar.random() < self.tasa_errores:
+            id = ids[0] if ids else f"19ad{azar.getrandbits(48):012x}"
+            for _ in range(azar.randint(3, 20)):
+                yield from self._error(id, instancia, revision)
+                self._avanzar(azar.uniform(0.01, 0.2))
+        self._avanzar(azar.expovariate(1 / 20))
+
+    def entradas(self, n):
+        """Genera exactamente n entradas; la revisión cambia a intervalos regulares (despliegues)"""
+        emitidas = 0
+        por_revision = max(1, n // len(self.revisiones))
+        while emitidas < n:
+            revision = self.revisiones[min(emitidas // por_revision, len(self.revisiones) - 1)]
+            for entrada in self._ciclo(revision):
+                yield entrada
+                emitidas += 1
+                if emitidas >= n:
+                    return
+
+
+def generar_entradas(n, semilla=0, **opciones):
+    """n entradas sintéticas en orden cronológico"""
+    return GeneradorLogs(semilla, **opciones).entradas(n)
+
+
+def escribir_bundle(ruta, n, semilla=0, **opciones):
+    """Guarda n entradas sintéticas como paquete de diagnóstico (sección principal)"""
+    with EscritorBundle(ruta, generado=formatear_timestamp(INICIO), project=PROJECT, service=SERVICE,
+                        sintetico={"entradas": n, "semilla": semilla}) as bundle:
+        return bundle.seccion("cloud_run_recent", f"{n} entradas sintéticas", generar_entradas(n, semilla, **opciones))
@@ -0,0 +1,149 @@
+"""Ejecución concurrente de comandos de estado (gcloud, git...)
+
+Las sondas son independientes entre sí, así que se lanzan en un pool de
+hilos acotado: una instantánea completa tarda más o menos lo que la sonda
+más lenta. Cada sonda conserva su propio timeout, Ctrl+C mata los procesos
+en curso y cancela los pendientes, y los resultados se devuelven en el
+mismo orden en que se declararon.
+"""
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from diagnostico import demonio
+from diagnostico.perfil import PERFIL
+
+MAX_WORKERS = 6
+TIMEOUT = 60
+
+
+def _matar(proceso):
+    """Mata el proceso y sus hijos (con shell=True el comando real es hijo de la shell)"""
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proceso.pid)], capture_output=True)
+        else:
+            os.killpg(proceso.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        proceso.kill()
+
+
+class _Procesos:
+    """Registro de procesos vivos para poder matarlos al cancelar"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procesos = set()
+        self.cancelado = False
+
+    def lanzar(self, cmd, cwd):
+        with self._lock:
+            if self.cancelado:
+                return None
+            proceso = subprocess.Popen(
+                cmd,
+                shell=isinstance(cmd, str),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                cwd=cwd,
+                start_new_session=os.name != "nt",
+            )
+            self._procesos.add(proceso)
+            return proceso
+
+    def terminar(self, proceso):
+        with self._lock:
+            self._procesos.discard(proceso)
+
+    def cancelar(self):
+        with self._lock:
+            self.cancelado = True
+            for proceso in self._procesos:
+                _matar(proceso)
+
+
+def _resultado(success, output, error, exit_code, inicio):
+    return {
+        "success": success,
+        "output": output,
+        "error": error,
+        "exitCode": exit_code,
+        "duration": round(time.monotonic() - inicio, 3),
+    }
+
+
+def ejecutar_comando(cmd, timeout=TIMEOUT, cwd=None, procesos=None):
+    """Ejecuta un comando y retorna el resultado con el formato de run_command
+
+    Los comandos gcloud que tienen equivalente en el demonio local se le
+    piden a él si está en marcha, sin arrancar un proceso.
+    """
+    if demonio.disponible():
+        resultado = demonio.comando(cmd, timeout)
+        if resultado is not None:
+            return resultado
+    procesos = procesos or _Procesos()
+    inicio = time.monotonic()
+    try:
+        proceso = procesos.lanzar(cmd, cwd)
+        if proceso is None:
+            return _resultado(False, "", "Cancelado", -1, inicio)
+        try:
+            stdout, stderr = proceso.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _matar(proceso)
+            proceso.communicate()
+            return _resultado(False, "", "Timeout expired", -1, inicio)
+        finally:
+            procesos.terminar(proceso)
+        if procesos.cancelado and proceso.returncode != 0:
+            return _resultado(False, stdout.strip(), "Cancelado", proceso.returncode, inicio)
+        return _resultado(proceso.returncode == 0, stdout.strip(), stderr.strip(), proceso.returncode, inicio)
+    except Exception as e:
+        return _resultado(False, "", str(e), -1, inicio)
+
+
+def ejecutar_sondas(sondas, max_workers=MAX_WORKERS, timeout=TIMEOUT, cwd=None, al_terminar=None):
+    """Ejecuta en paralelo una lista de sondas (clave, comando, descripción)
+
+    Devuelve un dict clave -> resultado en el orden de `sondas`. `al_terminar`
+    se llama con (clave, descripción, resultado) según va acabando cada una.
+    """
+    procesos = _Procesos()
+    resultados = {}
+
+    def ejecutar(clave, cmd, descripcion):
+        resultado = ejecutar_comando(cmd, timeout, cwd, procesos)
+        if PERFIL.activo:
+            PERFIL.comando(cmd, resultado)
+        if al_terminar:
+            al_terminar(clave, descripcion, resultado)
+        return resultado
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futuros = [(clave, pool.submit(ejecutar, clave, cmd, descripcion)) for clave, cmd, descripcion in sondas]
+        # Espera con timeout corto para que Ctrl+C llegue también en Windows
+        pendientes = {futuro for _, futuro in futuros}
+        while pendientes:
+            _, pendientes = wait(pendientes, timeout=0.25)
+        for clave, futuro in futuros:
+            resultados[clave] = futuro.result()
+    except KeyboardInterrupt:
+        procesos.cancelar()
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return resultados
+
+
+def imprimir_progreso(clave, descripcion, resultado):
+    """Callback de `ejecutar_sondas` que muestra cada sonda al terminar"""
+    marca = "✓" if resultado["success"] else "✗"
+    print(f"  {marca} {descripcion} ({resultado['duration']:.1f}s)")
@@ -3,13 +3,15 @@
 Script Python para obtener estado de Google Cloud y GitHub
 Este script puede ejecutarse automáticamente y guarda la salida en archivos JSON
 """
-import subprocess
 import json
 import os
 from datetime import datetime
 
-repo_path = r"C:\Users\fever\Media Fees Lead Automation\mfs-lead-generation-ai"
-logs_dir = os.path.join(repo_path, "auto_logs")
+from diagnostico.config import LOGS_DIR, REPO_PATH
+from diagnostico.perfil import PERFIL
+from diagnostico.sondas import ejecutar_sondas, imprimir_progreso
+
+logs_dir = LOGS_DIR
 
 # Asegurar que el directorio existe
 try:
@@ -17,44 +19,7 @@ try:
 except Exception as e:
     print(f"Error creando directorio: {e}")
     # Fallback: usar directorio raíz
-    logs_dir = repo_path
-
-# Crear directorio si no existe
-os.makedirs(logs_dir, exist_ok=True)
-os.chdir(repo_path)
-
-def run_command(cmd, description):
-    """Ejecuta un comando y retorna el resultado"""
-    print(f"  → {description}...")
-    try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=60,
-            cwd=repo_path
-        )
-        return {
-            "success": result.returncode == 0,
-            "output": result.stdout.strip(),
-            "error": result.stderr.strip(),
-            "exitCode": result.returncode
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            "success": False,
-            "output": "",
-            "error": "Timeout expired",
-            "exitCode": -1
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "output": "",
-            "error": str(e),
-            "exitCode": -1
-        }
+    logs_dir = REPO_PATH
 
 print("\n=== Generando logs automáticos ===")
 print(f"Directorio de logs: {logs_dir}")
@@ -66,21 +31,24 @@ results = {
     "github": {}
 }
 
-# Google Cloud
-print("\n[Google Cloud]")
-results["gcloud"]["project"] = run_command("gcloud config get-value project", "Proyecto actual")
-results["gcloud"]["builds"] = run_command("gcloud builds list --project=check-in-sf --limit=5 --format=json", "Builds recientes")
-results["gcloud"]["ongoing"] = run_command("gcloud builds list --project=check-in-sf --ongoing --format=json", "Builds en progreso")
-results["gcloud"]["triggers"] = run_command("gcloud builds triggers list --project=check-in-sf --format=json", "Triggers")
-results["gcloud"]["service"] = run_command("gcloud run services describe mfs-lead-generation-ai --region=us-central1 --project=check-in-sf --format=json", "Servicio Cloud Run")
-results["gcloud"]["revisions"] = run_command("gcloud run revisions list --service=mfs-lead-generation-ai --region=us-central1 --project=check-in-sf --limit=3 --format=json", "Revisiones")
+# Las sondas son independientes: se ejecutan en paralelo y se guardan en el orden declarado
+sondas = [
+    (("gcloud", "project"), "gcloud config get-value project", "Proyecto actual"),
+    (("gcloud", "builds"), "gcloud builds list --project=check-in-sf --limit=5 --format=json", "Builds recientes"),
+    (("gcloud", "ongoing"), "gcloud builds list --project=check-in-sf --ongoing --format=json", "Builds en progreso"),
+    (("gcloud", "triggers"), "gcloud builds triggers list --project=check-in-sf --format=json", "Triggers"),
+    (("gcloud", "service"), "gcloud run services describe mfs-lead-generation-ai --region=us-central1 --project=check-in-sf --format=json", "Servicio Cloud Run"),
+    (("gcloud", "revisions"), "gcloud run revisions list --service=mfs-lead-generation-ai --region=us-central1 --project=check-in-sf --limit=3 --format=json", "Revisiones"),
+    (("github", "remote"), "git remote -v", "Remoto configurado"),
+    (("github", "status"), "git status", "Estado del repositorio"),
+    (("github", "log"), "git log --oneline -5", "Últimos 5 commits"),
+    (("github", "connection"), "git ls-remote origin HEAD", "Conexión con GitHub"),
+]
 
-# GitHub
-print("\n[GitHub]")
-results["github"]["remote"] = run_command("git remote -v", "Remoto configurado")
-results["github"]["status"] = run_command("git status", "Estado del repositorio")
-results["github"]["log"] = run_command("git log --oneline -5", "Últimos 5 commits")
-results["github"]["connection"] = run_command("git ls-remote origin HEAD", "Conexión con GitHub")
+print("\n[Google Cloud + GitHub]")
+with PERFIL.etapa("sondas"):
+    for (grupo, nombre), resultado in ejecutar_sondas(sondas, cwd=REPO_PATH, al_terminar=imprimir_progreso).items():
+        results[grupo][nombre] = resultado
 
 # Guardar en archivo JSON
 output_file = os.path.join(logs_dir, "status.json")
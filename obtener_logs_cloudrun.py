@@ -2,147 +2,179 @@
 """
 Script para obtener logs de Cloud Run y diagnosticar por qué no se procesan emails
 """
-import subprocess
 import json
 import os
-from datetime import datetime, timedelta
-
-repo_path = r"C:\Users\fever\Media Fees Lead Automation\mfs-lead-generation-ai"
-os.chdir(repo_path)
-
-def run_command(cmd, description):
-    """Ejecuta un comando y retorna el resultado"""
-    print(f"  → {description}...")
-    try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=120,
-            cwd=repo_path
-        )
-        return {
-            "success": result.returncode == 0,
-            "output": result.stdout.strip(),
-            "error": result.stderr.strip(),
-            "exitCode": result.returncode
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "output": "",
-            "error": str(e),
-            "exitCode": -1
-        }
+import tempfile
+from collections import deque
+from datetime import datetime, timezone
+
+from diagnostico.bundle import EscritorBundle, abrir_bundle, metadato_comando
+from diagnostico.config import REPO_PATH
+from diagnostico.filtros import O, PlanConsultas, Severidad, Texto, Tiempo
+from diagnostico.logs import parsear_duracion
+from diagnostico.objetivos import ConsultaObjetivos, cargar_objetivos, filtro_objetivo
+from diagnostico.perfil import PERFIL
+from diagnostico.sondas import ejecutar_sondas, imprimir_progreso
+
+FRESHNESS = "2h"
+# Los errores son pocos: se miran más atrás sin apenas aumentar la descarga
+FRESHNESS_ERRORES = "24h"
+MUESTRAS_RESUMEN = 5
 
 print("\n=== Obteniendo logs de Cloud Run ===")
 print("Buscando logs relacionados con procesamiento de emails...\n")
 
-# Obtener logs recientes (últimas 2 horas)
 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-results = {
-    "timestamp": timestamp,
-    "logs": []
-}
-
-# 1. Logs de Cloud Run (últimas 100 líneas)
-print("[1] Obteniendo logs recientes de Cloud Run...")
-logs_cmd = 'gcloud logging read "resource.type=cloud_run_revision AND resource.labels.service_name=mfs-lead-generation-ai" --project=check-in-sf --limit=100 --format=json --freshness=2h'
-result = run_command(logs_cmd, "Logs de Cloud Run")
-results["logs"].append({
-    "type": "cloud_run_recent",
-    "description": "Logs recientes de Cloud Run (últimas 2 horas)",
-    "result": result
-})
-
-# 2. Logs específicos de procesamiento de emails
-print("\n[2] Buscando logs de procesamiento de emails...")
-email_logs_cmd = 'gcloud logging read "resource.type=cloud_run_revision AND resource.labels.service_name=mfs-lead-generation-ai AND (textPayload=~\"mfs.*procesar\" OR textPayload=~\"mfs.*email\" OR textPayload=~\"mfs.*pubsub\" OR textPayload=~\"mfs.*_pubsub\")" --project=check-in-sf --limit=50 --format=json --freshness=2h'
-result = run_command(email_logs_cmd, "Logs de procesamiento de emails")
-results["logs"].append({
-    "type": "email_processing",
-    "description": "Logs específicos de procesamiento de emails",
-    "result": result
-})
-
-# 3. Logs de errores
-print("\n[3] Buscando errores...")
-error_logs_cmd = 'gcloud logging read "resource.type=cloud_run_revision AND resource.labels.service_name=mfs-lead-generation-ai AND severity>=ERROR" --project=check-in-sf --limit=30 --format=json --freshness=2h'
-result = run_command(error_logs_cmd, "Logs de errores")
-results["logs"].append({
-    "type": "errors",
-    "description": "Errores recientes",
-    "result": result
-})
-
-# 4. Estado del servicio
-print("\n[4] Verificando estado del servicio...")
-service_cmd = 'gcloud run services describe mfs-lead-generation-ai --region=us-central1 --project=check-in-sf --format=json'
-result = run_command(service_cmd, "Estado del servicio")
-results["service_status"] = result
-
-# 5. Verificar Pub/Sub
-print("\n[5] Verificando configuración de Pub/Sub...")
-pubsub_cmd = 'gcloud pubsub subscriptions list --project=check-in-sf --format=json'
-result = run_command(pubsub_cmd, "Suscripciones de Pub/Sub")
-results["pubsub"] = result
-
-# Guardar en archivo JSON
-output_file = os.path.join(repo_path, "cloud_run_logs_diagnostico.json")
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(results, f, indent=2, ensure_ascii=False)
+
+# Objetivos de diagnostico_objetivos.json (por defecto, el servicio de diagnostico/config.py)
+objetivos = cargar_objetivos()
+principal = objetivos[0]
+if len(objetivos) > 1:
+    print(f"Objetivos: {', '.join(o.nombre for o in objetivos)}\n")
+
+# 1. Estado del servicio y Pub/Sub (metadatos de la cabecera del paquete)
+print("[1] Verificando estado del servicio y configuración de Pub/Sub...")
+sondas = []
+for objetivo in objetivos:
+    sondas.append((
+        ("service_status", objetivo.nombre),
+        f"gcloud run services describe {objetivo.service} --region={objetivo.region} --project={objetivo.project} --format=json",
+        f"Estado del servicio ({objetivo.nombre})",
+    ))
+for project in dict.fromkeys(o.project for o in objetivos):
+    sondas.append((("pubsub", project), f"gcloud pubsub subscriptions list --project={project} --format=json",
+                   f"Suscripciones de Pub/Sub ({project})"))
+with PERFIL.etapa("sondas"):
+    sondas = ejecutar_sondas(sondas, cwd=REPO_PATH, al_terminar=imprimir_progreso)
+
+# (tipo, descripción, predicado adicional al servicio y región de cada objetivo; None = todo)
+ahora = datetime.now(timezone.utc)
+desde = ahora - parsear_duracion(FRESHNESS)
+desde_errores = ahora - parsear_duracion(FRESHNESS_ERRORES)
+consultas = [
+    ("cloud_run_recent", f"Logs recientes de Cloud Run (últimas {FRESHNESS})", Tiempo(desde)),
+    ("email_processing", "Logs específicos de procesamiento de emails",
+     O(Texto("mfs.*procesar", regex=True), Texto("mfs.*email", regex=True), Texto("mfs.*pubsub", regex=True))
+     & Tiempo(desde)),
+    ("errors", f"Errores recientes (últimas {FRESHNESS_ERRORES})", Severidad("ERROR") & Tiempo(desde_errores)),
+]
+descripciones = {tipo: descripcion for tipo, descripcion, _ in consultas}
+predicados = {tipo: predicado for tipo, _, predicado in consultas}
+# Una sola consulta OR: todo lo de la ventana corta (lo leen los analizadores) más los errores anteriores,
+# filtrados en Cloud Logging; cada entrada se reparte después a sus secciones en local
+plan = PlanConsultas(predicados)
+
+
+def filtro_seccion(tipo):
+    predicado = predicados[tipo]
+    return filtro_objetivo(principal, predicado.filtro() if predicado else None)
+
+
+def repartir(entradas, tipos, apartados):
+    """Entrega las entradas de la primera sección y guarda en `apartados` las del resto"""
+    for entrada in entradas:
+        etiquetas = plan.etiquetar(entrada, tipos)
+        for tipo in etiquetas:
+            if tipo in apartados:
+                apartados[tipo].write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        if tipos[0] in etiquetas:
+            yield entrada
+
+
+def informar(numero, tipo, resumen):
+    print(f"\n[{numero}] {descripciones[tipo]}...")
+    if resumen["success"]:
+        print(f"  ✓ {resumen['total']} entradas")
+    else:
+        print(f"  ✗ {resumen['error']} ({resumen['total']} entradas guardadas)")
+
+
+# 2. Logs, volcados entrada a entrada al paquete (NDJSON comprimido)
+output_file = os.path.join(REPO_PATH, "cloud_run_logs_diagnostico.ndjson.gz")
+with EscritorBundle(
+    output_file,
+    generado=timestamp,
+    project=principal.project,
+    service=principal.service,
+    freshness=FRESHNESS,
+    objetivos=[objetivo._asdict() for objetivo in objetivos],
+    service_status=metadato_comando(sondas[("service_status", principal.nombre)]),
+    pubsub=metadato_comando(sondas[("pubsub", principal.project)]),
+    estados={objetivo.nombre: metadato_comando(sondas[("service_status", objetivo.nombre)])
+             for objetivo in objetivos[1:]},
+) as bundle:
+    numero = 2
+    for extra, tipos in plan.filtros():
+        print(f"\nDescargando {', '.join(tipos)} en una sola consulta...")
+        # Todos los objetivos a la vez, mezclados por timestamp (cada entrada lleva su "_objetivo")
+        # Cada predicado lleva su ventana; la de la consulta es la más amplia
+        consulta = ConsultaObjetivos(objetivos, extra=extra, freshness=None, desde=min(desde, desde_errores))
+        apartados = {tipo: tempfile.TemporaryFile("w+", encoding="utf-8") for tipo in tipos[1:]}
+        try:
+            with PERFIL.etapa(f"descarga:{','.join(tipos)}"):
+                resumen = bundle.seccion(tipos[0], descripciones[tipos[0]],
+                                         repartir(consulta.entradas(), tipos, apartados), filtro_seccion(tipos[0]))
+            for nombre, error in consulta.errores.items():
+                print(f"  ⚠ {nombre}: {error}")
+            informar(numero, tipos[0], resumen)
+            for tipo, apartado in apartados.items():
+                numero += 1
+                apartado.seek(0)
+                # Si la descarga falló, las secciones derivadas quedan con el mismo error
+                informar(numero, tipo, bundle.seccion(tipo, descripciones[tipo], (json.loads(l) for l in apartado),
+                                                      filtro_seccion(tipo), error=resumen["error"]))
+        finally:
+            for apartado in apartados.values():
+                apartado.close()
+        numero += 1
 
 print(f"\n✓ Logs guardados en: {output_file}")
 
-# Crear resumen legible
-summary_file = os.path.join(repo_path, "cloud_run_logs_resumen.txt")
-with open(summary_file, 'w', encoding='utf-8') as f:
+# Crear resumen legible leyendo el paquete en streaming
+summary_file = os.path.join(REPO_PATH, "cloud_run_logs_resumen.txt")
+with abrir_bundle(output_file) as bundle, open(summary_file, 'w', encoding='utf-8') as f:
     f.write("=== DIAGNÓSTICO: POR QUÉ NO SE PROCESAN EMAILS ===\n")
     f.write(f"Generado: {timestamp}\n\n")
-    
-    for log_entry in results["logs"]:
+
+    ultimas = {tipo: deque(maxlen=MUESTRAS_RESUMEN) for tipo, _, _ in consultas}
+    for tipo, entrada in bundle.registros():
+        ultimas.setdefault(tipo, deque(maxlen=MUESTRAS_RESUMEN)).append(entrada)
+
+    for tipo, seccion in bundle.secciones.items():
         f.write(f"\n{'='*80}\n")
-        f.write(f"{log_entry['description']}\n")
+        f.write(f"{seccion.get('descripcion', tipo)}\n")
         f.write(f"{'='*80}\n")
-        if log_entry["result"]["success"]:
-            if log_entry["result"]["output"]:
-                # Intentar parsear JSON si es posible
-                try:
-                    logs = json.loads(log_entry["result"]["output"])
-                    f.write(f"Total de logs encontrados: {len(logs)}\n\n")
-                    # Mostrar los primeros 5 logs
-                    for i, log in enumerate(logs[:5], 1):
-                        f.write(f"\n--- Log {i} ---\n")
-                        if "textPayload" in log:
-                            f.write(f"Texto: {log['textPayload']}\n")
-                        if "jsonPayload" in log:
-                            f.write(f"JSON: {json.dumps(log['jsonPayload'], indent=2)}\n")
-                        if "timestamp" in log:
-                            f.write(f"Timestamp: {log['timestamp']}\n")
-                        if "severity" in log:
-                            f.write(f"Severidad: {log['severity']}\n")
-                except:
-                    f.write(log_entry["result"]["output"][:2000] + "\n")
-            else:
-                f.write("No hay logs en este período\n")
-        else:
-            f.write(f"Error: {log_entry['result']['error']}\n")
-    
+        if not seccion.get("success"):
+            f.write(f"Error: {seccion.get('error')}\n")
+        if not seccion.get("total"):
+            f.write("No hay logs en este período\n")
+            continue
+        f.write(f"Total de logs encontrados: {seccion['total']}\n\n")
+        # Mostrar los 5 logs más recientes
+        for i, log in enumerate(reversed(ultimas[tipo]), 1):
+            f.write(f"\n--- Log {i} ---\n")
+            if "textPayload" in log:
+                f.write(f"Texto: {log['textPayload']}\n")
+            if "jsonPayload" in log:
+                f.write(f"JSON: {json.dumps(log['jsonPayload'], indent=2)}\n")
+            if "timestamp" in log:
+                f.write(f"Timestamp: {log['timestamp']}\n")
+            if "severity" in log:
+                f.write(f"Severidad: {log['severity']}\n")
+
     f.write(f"\n\n{'='*80}\n")
     f.write("ESTADO DEL SERVICIO\n")
     f.write(f"{'='*80}\n")
-    if results["service_status"]["success"]:
+    service_status = bundle.cabecera["service_status"]
+    if service_status["success"]:
         f.write("Servicio accesible\n")
-        if results["service_status"]["output"]:
-            try:
-                service_info = json.loads(results["service_status"]["output"])
-                f.write(f"Estado: {service_info.get('status', {}).get('conditions', [{}])[0].get('status', 'Unknown')}\n")
-                f.write(f"Última revisión: {service_info.get('status', {}).get('latestReadyRevisionName', 'Unknown')}\n")
-            except:
-                f.write(results["service_status"]["output"][:500] + "\n")
+        service_info = service_status["datos"]
+        if isinstance(service_info, dict):
+            f.write(f"Estado: {service_info.get('status', {}).get('conditions', [{}])[0].get('status', 'Unknown')}\n")
+            f.write(f"Última revisión: {service_info.get('status', {}).get('latestReadyRevisionName', 'Unknown')}\n")
+        elif service_info:
+            f.write(str(service_info)[:500] + "\n")
     else:
-        f.write(f"Error obteniendo estado: {results['service_status']['error']}\n")
+        f.write(f"Error obteniendo estado: {service_status['error']}\n")
 
 print(f"✓ Resumen guardado en: {summary_file}")
-
@@ -1,181 +1,108 @@
 #!/usr/bin/env python3
 """Script para obtener y analizar logs de errores de Cloud Run"""
-import subprocess
-import json
-import sys
-from datetime import datetime, timedelta
+import argparse
 
-project = "check-in-sf"
-service = "mfs-lead-generation-ai"
+from diagnostico.analizadores import (
+    AirtableAnalizador,
+    ErroresAnalizador,
+    ProcesamientoAnalizador,
+    PubSubAnalizador,
+)
+from diagnostico.fuentes import anadir_argumentos_fuente, entradas_fuente
+from diagnostico.logs import inicio_ventana, texto_entrada
+from diagnostico.motor import Motor
+
+parser = argparse.ArgumentParser(description="Obtiene y analiza los logs de errores de Cloud Run")
+anadir_argumentos_fuente(parser, freshness="2h")
+args = parser.parse_args()
 
 print("=== Diagnóstico de Errores en Cloud Run ===\n")
 
-# 1. Obtener errores recientes
-print("[1] Obteniendo errores recientes (últimas 2 horas)...")
-cmd = [
-    "gcloud", "logging", "read",
-    f'resource.type="cloud_run_revision" AND resource.labels.service_name="{service}" AND (severity="ERROR" OR severity="CRITICAL")',
-    "--limit=20",
-    "--format=json",
-    f"--project={project}",
-    "--freshness=2h"
-]
+# Una sola lectura de la ventana pedida; las secciones de la última hora filtran localmente
+ultima_hora = inicio_ventana("1h")
+motor = Motor(ensamblar=True)
+errores_graves = motor.registrar(ErroresAnalizador(max_muestras=10, solo_severidad=True))
+pubsub = motor.registrar(PubSubAnalizador(max_muestras=5, desde=ultima_hora))
+airtable = motor.registrar(AirtableAnalizador(max_muestras=5, desde=ultima_hora))
+procesamiento = motor.registrar(ProcesamientoAnalizador(max_muestras=5, desde=ultima_hora))
+general = motor.registrar(ErroresAnalizador(max_muestras=5, desde=ultima_hora))
 
+print(f"Obteniendo logs de las últimas {args.freshness}...")
 try:
-    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-    if result.returncode == 0 and result.stdout.strip():
-        errors = json.loads(result.stdout)
-        if errors:
-            print(f"  ✓ Se encontraron {len(errors)} errores:\n")
-            for i, error in enumerate(errors[:10], 1):
-                timestamp = error.get("timestamp", "N/A")
-                text = error.get("textPayload", "")
-                if not text and error.get("jsonPayload"):
-                    text = json.dumps(error["jsonPayload"])
-                print(f"  [{i}] [{timestamp}]")
-                print(f"      {text[:300]}")
-                print()
-        else:
-            print("  ✓ No se encontraron errores recientes\n")
-    else:
-        print("  ⚠️ No se encontraron errores o hubo un problema al obtenerlos\n")
+    # --cache descarga solo el delta desde la última ejecución; --bundle lee un paquete guardado
+    motor.ejecutar(entradas_fuente(args))
+    print(f"  ✓ {motor.fragmentos} logs leídos ({motor.total} eventos)\n")
 except Exception as e:
-    print(f"  ✗ Error al obtener errores: {e}\n")
-
-# 2. Obtener logs de Pub/Sub
-print("[2] Obteniendo logs de Pub/Sub (última hora)...")
-cmd = [
-    "gcloud", "logging", "read",
-    f'resource.type="cloud_run_revision" AND resource.labels.service_name="{service}" AND textPayload=~"_pubsub"',
-    "--limit=10",
-    "--format=json",
-    f"--project={project}",
-    "--freshness=1h"
-]
+    print(f"  ✗ Error al obtener logs: {e}\n")
 
-try:
-    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-    if result.returncode == 0 and result.stdout.strip():
-        logs = json.loads(result.stdout)
-        if logs:
-            print(f"  ✓ Se encontraron {len(logs)} logs de Pub/Sub:\n")
-            for log in logs[:5]:
-                timestamp = log.get("timestamp", "N/A")
-                text = log.get("textPayload", "")
-                if not text and log.get("jsonPayload"):
-                    text = json.dumps(log["jsonPayload"])
-                print(f"  [{timestamp}] {text[:150]}")
-            print()
-        else:
-            print("  ⚠️ No se encontraron logs de Pub/Sub\n")
-    else:
-        print("  ⚠️ No se encontraron logs de Pub/Sub\n")
-except Exception as e:
-    print(f"  ✗ Error al obtener logs de Pub/Sub: {e}\n")
+# 1. Errores recientes
+print(f"[1] Errores recientes (últimas {args.freshness})...")
+if errores_graves.total:
+    print(f"  ✓ Se encontraron {errores_graves.total} errores:\n")
+    for i, error in enumerate(errores_graves.recientes(), 1):
+        timestamp = error.get("timestamp", "N/A")
+        text = texto_entrada(error)
+        print(f"  [{i}] [{timestamp}]")
+        print(f"      {text[:300]}")
+        print()
+else:
+    print("  ✓ No se encontraron errores recientes\n")
 
-# 3. Obtener logs de Airtable
-print("[3] Obteniendo logs de Airtable (última hora)...")
-cmd = [
-    "gcloud", "logging", "read",
-    f'resource.type="cloud_run_revision" AND resource.labels.service_name="{service}" AND textPayload=~"Airtable"',
-    "--limit=20",
-    "--format=json",
-    f"--project={project}",
-    "--freshness=1h"
-]
+# 2. Logs de Pub/Sub
+print("[2] Logs de Pub/Sub (última hora)...")
+if pubsub.total:
+    print(f"  ✓ Se encontraron {pubsub.total} logs de Pub/Sub:\n")
+    for log in pubsub.recientes():
+        timestamp = log.get("timestamp", "N/A")
+        text = texto_entrada(log)
+        print(f"  [{timestamp}] {text[:150]}")
+    print()
+else:
+    print("  ⚠️ No se encontraron logs de Pub/Sub\n")
 
-try:
-    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-    if result.returncode == 0 and result.stdout.strip():
-        logs = json.loads(result.stdout)
-        if logs:
-            success = [l for l in logs if "creado" in l.get("textPayload", "").lower() or "exitoso" in l.get("textPayload", "").lower()]
-            failed = [l for l in logs if "error" in l.get("textPayload", "").lower() or "fallo" in l.get("textPayload", "").lower()]
-            print(f"  Logs encontrados: {len(logs)}")
-            print(f"    Exitosos: {len(success)}")
-            print(f"    Fallidos: {len(failed)}\n")
-            if failed:
-                print("  Errores de Airtable:")
-                for log in failed[:5]:
-                    timestamp = log.get("timestamp", "N/A")
-                    text = log.get("textPayload", "")
-                    print(f"    [{timestamp}] {text[:200]}")
-                print()
-        else:
-            print("  ⚠️ No se encontraron logs de Airtable\n")
-    else:
-        print("  ⚠️ No se encontraron logs de Airtable\n")
-except Exception as e:
-    print(f"  ✗ Error al obtener logs de Airtable: {e}\n")
+# 3. Logs de Airtable
+print("[3] Logs de Airtable (última hora)...")
+if airtable.total:
+    print(f"  Logs encontrados: {airtable.total}")
+    print(f"    Exitosos: {airtable.exitosos}")
+    print(f"    Fallidos: {airtable.fallidos}\n")
+    if airtable.muestras_fallidos:
+        print("  Errores de Airtable:")
+        for log in airtable.recientes(airtable.muestras_fallidos):
+            timestamp = log.get("timestamp", "N/A")
+            text = log.get("textPayload", "")
+            print(f"    [{timestamp}] {text[:200]}")
+        print()
+else:
+    print("  ⚠️ No se encontraron logs de Airtable\n")
 
-# 4. Obtener logs de procesamiento
-print("[4] Obteniendo logs de procesamiento (última hora)...")
-cmd = [
-    "gcloud", "logging", "read",
-    f'resource.type="cloud_run_revision" AND resource.labels.service_name="{service}" AND (textPayload=~"procesando mensaje" OR textPayload=~"IDs que voy a procesar" OR textPayload=~"Delta INBOX")',
-    "--limit=10",
-    "--format=json",
-    f"--project={project}",
-    "--freshness=1h"
-]
+# 4. Logs de procesamiento
+print("[4] Logs de procesamiento (última hora)...")
+if procesamiento.total:
+    print(f"  ✓ Se encontraron {procesamiento.total} logs de procesamiento:\n")
+    for log in procesamiento.recientes():
+        timestamp = log.get("timestamp", "N/A")
+        text = texto_entrada(log)
+        print(f"  [{timestamp}] {text[:150]}")
+    print()
+else:
+    print("  ⚠️ No se encontraron logs de procesamiento\n")
 
-try:
-    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-    if result.returncode == 0 and result.stdout.strip():
-        logs = json.loads(result.stdout)
-        if logs:
-            print(f"  ✓ Se encontraron {len(logs)} logs de procesamiento:\n")
-            for log in logs[:5]:
-                timestamp = log.get("timestamp", "N/A")
-                text = log.get("textPayload", "")
-                if not text and log.get("jsonPayload"):
-                    text = json.dumps(log["jsonPayload"])
-                print(f"  [{timestamp}] {text[:150]}")
-            print()
-        else:
-            print("  ⚠️ No se encontraron logs de procesamiento\n")
-    else:
-        print("  ⚠️ No se encontraron logs de procesamiento\n")
-except Exception as e:
-    print(f"  ✗ Error al obtener logs de procesamiento: {e}\n")
-
-# 5. Obtener todos los logs recientes para análisis general
+# 5. Análisis general de la última hora
 print("[5] Análisis general de logs (última hora)...")
-cmd = [
-    "gcloud", "logging", "read",
-    f'resource.type="cloud_run_revision" AND resource.labels.service_name="{service}"',
-    "--limit=100",
-    "--format=json",
-    f"--project={project}",
-    "--freshness=1h"
-]
-
-try:
-    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-    if result.returncode == 0 and result.stdout.strip():
-        logs = json.loads(result.stdout)
-        if logs:
-            print(f"  Total de logs: {len(logs)}")
-            errors = [l for l in logs if l.get("severity") in ["ERROR", "CRITICAL"] or "error" in l.get("textPayload", "").lower()]
-            warnings = [l for l in logs if l.get("severity") == "WARNING"]
-            print(f"  Errores: {len(errors)}")
-            print(f"  Advertencias: {len(warnings)}\n")
-            
-            if errors:
-                print("  Últimos errores encontrados:")
-                for error in errors[:5]:
-                    timestamp = error.get("timestamp", "N/A")
-                    text = error.get("textPayload", "")
-                    if not text and error.get("jsonPayload"):
-                        text = json.dumps(error["jsonPayload"])
-                    print(f"    [{timestamp}] {text[:200]}")
-                print()
-        else:
-            print("  ⚠️ No se encontraron logs recientes\n")
-    else:
-        print("  ⚠️ No se encontraron logs o hubo un problema\n")
-except Exception as e:
-    print(f"  ✗ Error al obtener logs: {e}\n")
+if general.vistos:
+    print(f"  Total de logs: {general.vistos}")
+    print(f"  Errores: {general.total}")
+    print(f"  Advertencias: {general.advertencias}\n")
+    
+    if general.muestras:
+        print("  Últimos errores encontrados:")
+        for error in general.recientes():
+            timestamp = error.get("timestamp", "N/A")
+            text = texto_entrada(error)
+            print(f"    [{timestamp}] {text[:200]}")
+        print()
+else:
+    print("  ⚠️ No se encontraron logs recientes\n")
 
 print("=== Diagnóstico completado ===")
-
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Logs del servicio en vivo, como `tail --follow`, con cada línea clasificada
+
+Sustituye a volver a ejecutar ver_logs_tiempo_real.ps1 / `gcloud logging read`
+en bucle: con la API de tail de Cloud Logging cada entrada se muestra en
+menos de un segundo tras su ingesta; sin ella (o con --sin-tail) se sondea
+pidiendo solo lo posterior a la última mostrada, con la latencia de
+--intervalo-min más la consulta.
+
+Ejemplos:
+  python seguir_logs.py
+  python seguir_logs.py --lineas 50 --etiqueta error --etiqueta email
+  python seguir_logs.py --severidad WARNING --buscar "Airtable|Salesforce"
+  python seguir_logs.py --reproducir cloud_run_logs_diagnostico.json --velocidad 60
+"""
+import argparse
+import asyncio
+import re
+import sys
+
+from diagnostico.clasificador import Clasificador
+from diagnostico.filtros import O, Severidad, Texto, Y, predicado_categoria
+from diagnostico.logs import SEVERIDADES, filtro_servicio, texto_entrada
+from diagnostico.reproduccion import Reproductor
+from diagnostico.seguimiento import INTERVALO_MAX, INTERVALO_MIN, Seguidor
+
+
+def marca(etiquetas):
+    if "grave" in etiquetas or "error" in etiquetas or "fallo" in etiquetas:
+        return "✗"
+    if "advertencia" in etiquetas:
+        return "⚠"
+    if "exito" in etiquetas or "envio_ok" in etiquetas:
+        return "✓"
+    return "·"
+
+
+def reproducir(args, predicado, mostrar):
+    """Igual que el seguimiento en vivo pero con las entradas de un paquete guardado, al ritmo pedido"""
+    reproductor = Reproductor(args.reproducir, args.velocidad, max_espera=args.max_espera)
+    print(f"--- reproduciendo {args.reproducir} a {f'{args.velocidad:g}×' if args.velocidad else 'máxima velocidad'} "
+          f"(Ctrl+C para salir) ---", flush=True)
+
+    async def seguir():
+        async for entrada in reproductor.entradas_async():
+            if not predicado.partes or predicado.coincide(entrada):
+                mostrar(entrada)
+
+    try:
+        asyncio.run(seguir())
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"✗ Error al leer {args.reproducir}: {e}")
+        return 1
+    finally:
+        r = reproductor.resumen()
+        ritmo = f", {r['entradas_por_segundo']:.0f} entradas/s" if r["entradas_por_segundo"] else ""
+        print(f"\n✓ {r['emitidas']} entradas reproducidas en {r['segundos_reales']:.1f}s{ritmo}, "
+              f"{r['duplicadas']} repetidas descartadas, {r['desordenadas']} fuera de orden")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sigue los logs de Cloud Run en vivo sin volver a descargar lo ya visto")
+    parser.add_argument("--freshness", default="10m", help="Ventana de la que tomar las líneas iniciales")
+    parser.add_argument("--lineas", type=int, default=20, help="Líneas iniciales a mostrar (0 para empezar desde ahora)")
+    parser.add_argument("--etiqueta", action="append", help="Mostrar solo estas categorías (error, pubsub, email...)")
+    parser.add_argument("--severidad", help="Severidad mínima (WARNING, ERROR...)")
+    parser.add_argument("--buscar", help="Expresión regular que debe aparecer en el texto")
+    parser.add_argument("--intervalo-min", type=float, default=INTERVALO_MIN,
+                        help="Sin tail, segundos entre consultas con actividad (admite menos de 1)")
+    parser.add_argument("--intervalo-max", type=float, default=INTERVALO_MAX,
+                        help="Sin tail, segundos entre consultas en reposo")
+    parser.add_argument("--sin-tail", action="store_true",
+                        help="Sondear con consultas en vez de usar la API de tail de Cloud Logging")
+    parser.add_argument("--ancho", type=int, default=300, help="Caracteres de texto por línea (0 sin límite)")
+    parser.add_argument("--reproducir", metavar="PAQUETE",
+                        help="Reproducir un paquete o exportación guardada en vez de consultar Cloud Logging")
+    parser.add_argument("--velocidad", type=float, default=1.0,
+                        help="Con --reproducir, veces el ritmo original (0 sin esperas)")
+    parser.add_argument("--max-espera", type=float, help="Con --reproducir, segundos máximos de espera entre líneas")
+    args = parser.parse_args()
+
+    clasificador = Clasificador()
+    etiquetas_pedidas = set(args.etiqueta or ())
+    severidad_min = SEVERIDADES.get(args.severidad.upper(), 0) if args.severidad else 0
+    buscar = re.compile(args.buscar, re.IGNORECASE) if args.buscar else None
+
+    def mostrar(entrada):
+        if SEVERIDADES.get(entrada.get("severity", "DEFAULT"), 0) < severidad_min:
+            return
+        texto = texto_entrada(entrada)
+        if buscar and not buscar.search(texto):
+            return
+        etiquetas = clasificador.clasificar(entrada, texto)
+        if etiquetas_pedidas and not etiquetas_pedidas & etiquetas:
+            return
+        instancia = entrada.get("labels", {}).get("instanceId", "")[-8:]
+        if args.ancho:
+            texto = texto[:args.ancho]
+        categorias = ",".join(sorted(etiquetas - {"grave", "advertencia"}))
+        print(f"[{entrada.get('timestamp', 'N/A')}] {marca(etiquetas)} [{instancia}] "
+              f"{f'[{categorias}] ' if categorias else ''}{texto.rstrip()}", flush=True)
+
+    def al_error(e):
+        siguiente = "con la API de tail" if seguidor.tail else "sondeando más despacio"
+        print(f"⚠ Error siguiendo los logs, se sigue {siguiente}: {e}", file=sys.stderr, flush=True)
+
+    # Los mismos criterios se envían a Cloud Logging para no descargar lo que no se va a mostrar
+    try:
+        predicados = [
+            Severidad(args.severidad) if args.severidad else None,
+            Texto(f"(?i){args.buscar}", regex=True) if args.buscar else None,
+            O(*(predicado_categoria(etiqueta) for etiqueta in etiquetas_pedidas)) if etiquetas_pedidas else None,
+        ]
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    predicado = Y(*predicados)
+    if args.reproducir:
+        return reproducir(args, predicado, mostrar)
+    filtro = filtro_servicio(extra=predicado.filtro() if predicado.partes else None)
+    seguidor = Seguidor(filtro, intervalo_min=args.intervalo_min, intervalo_max=args.intervalo_max,
+                        al_error=al_error, tail=not args.sin_tail)
+
+    async def seguir():
+        if args.lineas > 0:
+            for entrada in await asyncio.to_thread(seguidor.iniciales, args.freshness, args.lineas):
+                mostrar(entrada)
+        print("--- siguiendo (Ctrl+C para salir) ---", flush=True)
+        async for entrada in seguidor.entradas():
+            mostrar(entrada)
+
+    try:
+        asyncio.run(seguir())
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"✗ Error al obtener logs: {e}")
+        return 1
+    finally:
+        r = seguidor.resumen()
+        print(f"\n✓ {r['modo']}: {r['sesiones_tail']} sesiones de tail, {r['consultas']} consultas, "
+              f"{r['recibidas']} entradas recibidas, "
+              f"{r['duplicadas']} repetidas descartadas ({100 * r['redundancia']:.0f}%), {r['errores']} errores")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
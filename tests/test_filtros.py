@@ -0,0 +1,39 @@
+from diagnostico.filtros import O, PlanConsultas, Severidad, Texto
+
+
+def test_dos_categorias_de_texto_en_una_sola_consulta():
+    plan = PlanConsultas({"airtable": Texto("Airtable"), "pubsub": Texto("mfs.*pubsub", regex=True)})
+
+    consultas = plan.filtros()
+
+    assert len(consultas) == 1
+    filtro, tipos = consultas[0]
+    assert tipos == ["airtable", "pubsub"]
+    assert 'textPayload:"Airtable"' in filtro and 'textPayload=~"mfs.*pubsub"' in filtro
+    entrada = {"textPayload": "[mfs] _pubsub: Airtable: ✓ Registro creado"}
+    assert plan.etiquetar(entrada, tipos) == ["airtable", "pubsub"]
+    assert plan.etiquetar({"textPayload": "[mfs] Lock liberado"}, tipos) == []
+
+
+def test_filtro_demasiado_largo_se_parte():
+    categorias = {f"c{i}": Texto("x" * 50 + str(i)) for i in range(4)}
+    largo = len(categorias["c0"].filtro()) + len(" OR ()")
+
+    plan = PlanConsultas(categorias, largo_max=2 * largo)
+
+    assert [tipos for _, tipos in plan.filtros()] == [["c0", "c1"], ["c2", "c3"]]
+
+
+def test_categoria_sin_filtro_absorbe_las_demas():
+    plan = PlanConsultas({"todo": None, "errores": Severidad("ERROR")})
+
+    assert plan.filtros() == [(None, ["todo", "errores"])]
+
+
+def test_texto_en_json_payload():
+    entrada = {"jsonPayload": {"message": "Error procesando mensaje 19ad"}}
+
+    assert Texto("error procesando").coincide(entrada)
+    assert Texto(r"mensaje \w+", regex=True).coincide(entrada)
+    assert not Texto("error procesando", campo="textPayload").coincide(entrada)
+    assert (O(Texto("nada"), Texto("19ad")) & Severidad("DEFAULT")).coincide(entrada)
@@ -0,0 +1,26 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from diagnostico.logs import formatear_timestamp
+from diagnostico.reproduccion import TAM_REORDEN, Reproductor
+
+
+def _entradas(n):
+    inicio = datetime(2025, 12, 2, tzinfo=timezone.utc)
+    return [{"insertId": f"{i:016x}", "timestamp": formatear_timestamp(inicio + timedelta(milliseconds=i)),
+             "textPayload": f"linea {i}"} for i in range(n)]
+
+
+def test_exportacion_gcloud_invertida_sale_en_orden(tmp_path):
+    # gcloud logging read --format=json devuelve la más reciente primero
+    n = 25000
+    assert n > TAM_REORDEN
+    ruta = tmp_path / "gcloud.json"
+    ruta.write_text(json.dumps(list(reversed(_entradas(n)))), encoding="utf-8")
+
+    reproductor = Reproductor(str(ruta))
+    timestamps = [entrada["timestamp"] for entrada in reproductor.entradas()]
+
+    assert len(timestamps) == n
+    assert sum(1 for anterior, actual in zip(timestamps, timestamps[1:]) if actual < anterior) == 0
+    assert reproductor.contador["desordenadas"] == 0
@@ -1,54 +1,30 @@
 #!/usr/bin/env python3
 """Ver logs usando la API de Google Cloud directamente"""
-import os
-import sys
+import json
 
-# Intentar importar la biblioteca de Google Cloud
-try:
-    from google.cloud import logging as cloud_logging
-    print("✓ Biblioteca google-cloud-logging disponible")
-except ImportError:
-    print("✗ Biblioteca google-cloud-logging no disponible")
-    print("Instalando...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "google-cloud-logging", "-q"])
-    from google.cloud import logging as cloud_logging
-    print("✓ Biblioteca instalada")
+from diagnostico.config import PROJECT, SERVICE
+from diagnostico.logs import filtro_servicio, iterar_entradas
 
 def get_logs():
     """Obtener logs de Cloud Run"""
-    project_id = "check-in-sf"
-    service_name = "mfs-lead-generation-ai"
-    
     print(f"\nConectando a Google Cloud Logging...")
-    print(f"Proyecto: {project_id}")
-    print(f"Servicio: {service_name}\n")
+    print(f"Proyecto: {PROJECT}")
+    print(f"Servicio: {SERVICE}\n")
     
     try:
-        client = cloud_logging.Client(project=project_id)
-        
         # Filtrar logs
-        filter_str = f"""
-        resource.type=cloud_run_revision
-        AND resource.labels.service_name={service_name}
-        """
+        filter_str = filtro_servicio(SERVICE)
         
-        print(f"Filtro: {filter_str.strip()}\n")
+        print(f"Filtro: {filter_str}\n")
         print("Obteniendo logs...\n")
         print("="*80)
         
-        entries = client.list_entries(
-            filter_=filter_str,
-            max_results=30,
-            order_by=cloud_logging.DESCENDING
-        )
-        
         count = 0
-        for entry in entries:
+        for entry in iterar_entradas(filter_str, project=PROJECT, freshness=None, orden="desc", max_entradas=30):
             count += 1
-            timestamp = entry.timestamp.strftime("%Y-%m-%d %H:%M:%S") if entry.timestamp else "N/A"
-            severity = entry.severity or "INFO"
-            payload = entry.payload
+            timestamp = entry.get("timestamp", "N/A")
+            severity = entry.get("severity", "INFO")
+            payload = entry.get("textPayload", entry.get("jsonPayload", entry.get("protoPayload", "")))
             
             if isinstance(payload, dict):
                 payload_str = json.dumps(payload, indent=2)
@@ -58,9 +34,6 @@ def get_logs():
             print(f"\n[{count}] {timestamp} [{severity}]")
             print(f"{payload_str[:400]}")
             print("-"*80)
-            
-            if count >= 30:
-                break
         
         if count == 0:
             print("No se encontraron logs")
@@ -73,6 +46,4 @@ def get_logs():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    import json
     get_logs()
-
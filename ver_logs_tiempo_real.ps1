@@ -86,6 +86,9 @@ if ($logs -and $logs.Count -gt 0) {
     Write-Host "2. Hay un problema con la consulta de logs" -ForegroundColor White
 }
 
+Write-Host ""
+Write-Host "Para seguir los logs en vivo sin volver a descargar los ya vistos:" -ForegroundColor Cyan
+Write-Host "python seguir_logs.py --etiqueta email --etiqueta error" -ForegroundColor White
 Write-Host ""
 Write-Host "Para actualizar los logs, ejecuta este script de nuevo" -ForegroundColor Cyan
 Write-Host "O usa el comando:" -ForegroundColor Cyan
@@ -2,9 +2,11 @@
 """
 Script para verificar si los emails se están enviando correctamente
 """
-import subprocess
-import json
-from datetime import datetime, timedelta
+
+from diagnostico.analizadores import EmailAnalizador, ErroresAnalizador
+from diagnostico.config import PROJECT, SERVICE
+from diagnostico.logs import filtro_servicio, iterar_entradas
+from diagnostico.motor import Motor
 
 def obtener_logs_recientes():
     """Obtiene los logs más recientes del servicio"""
@@ -13,34 +15,21 @@ def obtener_logs_recientes():
     print("=" * 70)
     print()
     
-    # Obtener logs de las últimas 10 minutos
-    cmd = [
-        "gcloud", "logging", "read",
-        f'resource.type="cloud_run_revision" AND resource.labels.service_name="mfs-lead-generation-ai"',
-        "--limit=100",
-        "--format=json",
-        "--project=check-in-sf"
-    ]
+    # Obtener logs de la última hora en orden cronológico, reensamblando los multilínea
+    filtro = filtro_servicio(SERVICE)
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        logs = json.loads(result.stdout)
-        
-        # Filtrar logs relacionados con emails
-        email_logs = []
-        error_logs = []
-        
-        for log in logs:
-            text = log.get('textPayload', '') or log.get('jsonPayload', {}).get('message', '')
-            
-            if 'email' in text.lower() or 'sendLeadEmail' in text or 'EMAIL' in text:
-                email_logs.append(log)
-            
-            if 'ERROR' in text or 'Error' in text or 'error' in text:
-                error_logs.append(log)
+        # Una sola pasada para los logs de email y los de error
+        motor = Motor(ensamblar=True)
+        email = motor.registrar(EmailAnalizador(max_muestras=20))
+        errores = motor.registrar(ErroresAnalizador(max_muestras=10))
+        motor.ejecutar(iterar_entradas(filtro, project=PROJECT, freshness="1h", orden="asc"))
+        email_logs, email_count = email.recientes(email.muestras_relevantes), email.total
+        error_logs, error_count = errores.recientes(), errores.total
+        exitosos, exitosos_count = email.recientes(email.muestras_exitosos), email.exitosos
         
-        print(f"[1] Encontrados {len(email_logs)} logs relacionados con emails")
-        print(f"[2] Encontrados {len(error_logs)} logs de error")
+        print(f"[1] Encontrados {email_count} logs relacionados con emails")
+        print(f"[2] Encontrados {error_count} logs de error")
         print()
         
         # Mostrar logs de email más recientes
@@ -50,17 +39,11 @@ def obtener_logs_recientes():
             print("=" * 70)
             print()
             
-            # Ordenar por timestamp
-            email_logs.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            
-            for log in email_logs[:20]:
+            for log in email_logs:
                 timestamp = log.get('timestamp', 'N/A')
                 text = log.get('textPayload', '') or str(log.get('jsonPayload', {}))
-                
-                # Filtrar solo logs relevantes
-                if any(keyword in text for keyword in ['sendLeadEmail', 'Email de lead enviado', 'ERROR enviando email', 'EMAIL_FROM', 'EMAIL_TO']):
-                    print(f"[{timestamp}] {text[:200]}")
-                    print()
+                print(f"[{timestamp}] {text[:200]}")
+                print()
         
         # Mostrar errores recientes
         if error_logs:
@@ -69,9 +52,7 @@ def obtener_logs_recientes():
             print("=" * 70)
             print()
             
-            error_logs.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            
-            for log in error_logs[:10]:
+            for log in error_logs:
                 timestamp = log.get('timestamp', 'N/A')
                 text = log.get('textPayload', '') or str(log.get('jsonPayload', {}))
                 print(f"[{timestamp}] {text[:300]}")
@@ -83,11 +64,9 @@ def obtener_logs_recientes():
         print("=" * 70)
         print()
         
-        exitosos = [log for log in email_logs if 'Email de lead enviado' in str(log.get('textPayload', '')) or 'exitosamente' in str(log.get('textPayload', '')).lower()]
-        
         if exitosos:
-            print(f"✓ Se encontraron {len(exitosos)} envíos exitosos")
-            for log in exitosos[:5]:
+            print(f"✓ Se encontraron {exitosos_count} envíos exitosos")
+            for log in exitosos:
                 timestamp = log.get('timestamp', 'N/A')
                 text = log.get('textPayload', '') or str(log.get('jsonPayload', {}))
                 print(f"  [{timestamp}] {text[:150]}")
@@ -98,10 +77,6 @@ def obtener_logs_recientes():
             print("  - Hay un error en el proceso de envío")
             print("  - Los logs no están apareciendo aún")
         
-    except subprocess.CalledProcessError as e:
-        print(f"Error ejecutando comando: {e}")
-        print(f"Salida: {e.stdout}")
-        print(f"Error: {e.stderr}")
     except Exception as e:
         print(f"Error: {e}")
 
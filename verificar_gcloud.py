@@ -1,14 +1,13 @@
 #!/usr/bin/env python3
 """Script para verificar Google Cloud y capturar salida"""
-import subprocess
 import sys
 import os
 from datetime import datetime
 
-repo_path = r"C:\Users\fever\Media Fees Lead Automation\mfs-lead-generation-ai"
-output_file = os.path.join(repo_path, "gcloud_output.txt")
+from diagnostico.config import REPO_PATH
+from diagnostico.sondas import ejecutar_sondas, imprimir_progreso
 
-os.chdir(repo_path)
+output_file = os.path.join(REPO_PATH, "gcloud_output.txt")
 
 commands = [
     ("gcloud config get-value project", "Proyecto actual de Google Cloud"),
@@ -19,42 +18,43 @@ commands = [
     ("gcloud builds list --project=check-in-sf --ongoing --format=json", "Builds en progreso (JSON)"),
 ]
 
+# Los comandos son independientes: se lanzan en paralelo y se escriben en el orden de la lista
+resultados = ejecutar_sondas(
+    [(i, cmd.split(), description) for i, (cmd, description) in enumerate(commands)],
+    cwd=REPO_PATH,
+    al_terminar=imprimir_progreso,
+)
+
 with open(output_file, 'w', encoding='utf-8') as f:
     f.write(f"=== Verificación de Google Cloud ===\n")
     f.write(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     f.write(f"{'='*80}\n\n")
     
-    for cmd, description in commands:
+    for i, (cmd, description) in enumerate(commands):
+        result = resultados[i]
         f.write(f"\n{'='*80}\n")
         f.write(f"=== {description} ===\n")
         f.write(f"Comando: {cmd}\n")
         f.write(f"{'='*80}\n")
         
-        try:
-            result = subprocess.run(
-                cmd.split(),
-                capture_output=True,
-                text=True,
-                timeout=60,
-                cwd=repo_path
-            )
-            
-            if result.stdout:
-                f.write("STDOUT:\n")
-                f.write(result.stdout)
-                f.write("\n")
-            
-            if result.stderr:
-                f.write("STDERR:\n")
-                f.write(result.stderr)
-                f.write("\n")
-            
-            f.write(f"Exit code: {result.returncode}\n")
-            
-        except subprocess.TimeoutExpired:
+        if result["error"] == "Timeout expired":
             f.write("ERROR: Comando expiró (timeout)\n")
-        except Exception as e:
-            f.write(f"ERROR: {str(e)}\n")
+            continue
+        if result["exitCode"] == -1:
+            f.write(f"ERROR: {result['error']}\n")
+            continue
+        
+        if result["output"]:
+            f.write("STDOUT:\n")
+            f.write(result["output"])
+            f.write("\n")
+        
+        if result["error"]:
+            f.write("STDERR:\n")
+            f.write(result["error"])
+            f.write("\n")
+        
+        f.write(f"Exit code: {result['exitCode']}\n")
 
 print(f"Salida guardada en: {output_file}")
 